@@ -36,4 +36,16 @@ assert any(app in INSTALLED_APPS for app in ['posts.apps.PostsConfig', 'posts'])
 pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
+    'tests.fixtures.fixture_queries',
 ]
+
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    """Загруженные в тестах картинки и миниатюры пишутся во временный
+    каталог, а не в MEDIA_ROOT проекта.
+    """
+    settings.MEDIA_ROOT = str(tmp_path)
@@ -0,0 +1,95 @@
+import os
+
+import pytest
+from django.test import override_settings
+
+from core.querydetector import queries_detected
+
+# Известные N+1, которые не роняют прогон с --n-plus-one:
+# по одному отпечатку SQL на строку, # - комментарий.
+N_PLUS_ONE_BASELINE = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), 'n_plus_one_baseline.txt'
+)
+
+# Максимальное число SQL-запросов на одну страницу по имени URL из
+# posts.urls. Запросы сессии и пользователя авторизованного клиента
+# входят в бюджет, как и запросы метаданных для ETag (posts.conditional).
+QUERY_BUDGETS = {
+    'posts:index': 4,
+    'posts:index_feed': 4,
+    'posts:group_list': 5,
+    'posts:group_feed': 5,
+    'posts:profile': 7,
+    'posts:profile_feed': 5,
+    'posts:post_detail': 5,
+    'posts:post_comments': 3,
+    'posts:post_create': 3,
+    'posts:post_edit': 4,
+    'posts:add_comment': 3,
+    'posts:search': 5,
+    'posts:follow_index': 5,
+    'posts:profile_follow': 10,
+    'posts:profile_unfollow': 10,
+}
+
+
+@pytest.fixture
+def query_budget(django_assert_max_num_queries):
+    """Контекстный менеджер, проверяющий бюджет запросов страницы.
+
+    Пример::
+
+        with query_budget('posts:index'):
+            client.get(reverse('posts:index'))
+    """
+    def check(url_name):
+        assert url_name in QUERY_BUDGETS, (
+            f'Для `{url_name}` не задан бюджет запросов в QUERY_BUDGETS'
+        )
+        return django_assert_max_num_queries(QUERY_BUDGETS[url_name])
+    return check
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--n-plus-one', action='store_true',
+        help='Падать, если страница выполняет новый N+1 запрос',
+    )
+
+
+def load_baseline(path=N_PLUS_ONE_BASELINE):
+    if not os.path.exists(path):
+        return set()
+    with open(path) as baseline:
+        return {line.strip() for line in baseline
+                if line.strip() and not line.startswith('#')}
+
+
+@pytest.fixture(autouse=True)
+def n_plus_one_guard(request):
+    """С опцией --n-plus-one включает QueryDetectorMiddleware и валит
+    тест, если найден N+1, которого нет в n_plus_one_baseline.txt.
+    """
+    if not request.config.getoption('--n-plus-one'):
+        yield
+        return
+    found = []
+
+    def collect(sender, issues, **kwargs):
+        found.extend(issue for issue in issues
+                     if issue['kind'] == 'n_plus_one')
+
+    queries_detected.connect(collect, weak=False)
+    try:
+        with override_settings(QUERY_DETECTOR_ENABLED=True):
+            yield
+    finally:
+        queries_detected.disconnect(collect)
+    baseline = load_baseline()
+    new = [issue for issue in found if issue['fingerprint'] not in baseline]
+    if new:
+        pytest.fail('Новые N+1 запросы:\n' + '\n'.join(
+            f"{issue['view']}: {issue['count']} x {issue['fingerprint']}"
+            f"\n  {issue['python']} / {issue['template']}"
+            for issue in new
+        ), pytrace=False)
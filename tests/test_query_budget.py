@@ -0,0 +1,69 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow
+from posts.urls import urlpatterns
+from tests.fixtures.fixture_queries import QUERY_BUDGETS
+
+pytestmark = [pytest.mark.django_db]
+
+
+def url_kwargs(post):
+    return {
+        'slug_name': post.group.slug,
+        'username': post.author.username,
+        'post_id': post.id,
+        'feed_format': 'rss',
+    }
+
+
+def reverse_url(name, post):
+    pattern = next(p for p in urlpatterns if p.name == name)
+    kwargs = {
+        key: value for key, value in url_kwargs(post).items()
+        if key in pattern.pattern.converters
+    }
+    return reverse(f'posts:{name}', kwargs=kwargs)
+
+
+class TestQueryBudget:
+
+    def test_every_url_has_budget(self):
+        names = {f'posts:{pattern.name}' for pattern in urlpatterns
+                 if pattern.name}
+        assert names <= set(QUERY_BUDGETS), (
+            'Задайте бюджет запросов для каждого URL из `posts.urls`'
+        )
+
+    @pytest.mark.parametrize('name', [p.name for p in urlpatterns if p.name])
+    def test_url_within_budget(self, name, user_client, user,
+                               few_posts_with_group, mixer, query_budget):
+        author = mixer.blend('auth.User')
+        mixer.cycle(5).blend('posts.Post', author=author, image='')
+        Follow.objects.create(user=user, author=author)
+        url = reverse_url(name, few_posts_with_group)
+        # Первый запрос прогревает кэши миниатюр sorl-thumbnail.
+        user_client.get(url)
+        with query_budget(f'posts:{name}'):
+            response = user_client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+
+    @pytest.mark.parametrize('name', ['index', 'group_list', 'profile'])
+    def test_queries_do_not_grow_with_page(self, name, client, user, group,
+                                           mixer, django_assert_num_queries,
+                                           post_with_group):
+        url = reverse_url(name, post_with_group)
+        with CaptureQueriesContext(connection) as one_post:
+            client.get(url)
+        mixer.cycle(20).blend('posts.Post', author=user, group=group,
+                              image='')
+        with django_assert_num_queries(len(one_post)):
+            client.get(url)
+
+    def test_search_within_budget(self, user_client, mixer, query_budget):
+        mixer.cycle(20).blend('posts.Post', text='Пост про кошек', image='')
+        with query_budget('posts:search'):
+            user_client.get(reverse('posts:search'), {'q': 'пост'})
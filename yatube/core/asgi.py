@@ -0,0 +1,56 @@
+"""ASGI-приложение поверх WSGI-обработчика Django 2.2.
+
+В Django 2.2 нет ни django.core.asgi, ни асинхронных представлений,
+поэтому под ASGI-сервером работают те же синхронные представления.
+WsgiToAsgi из asgiref выполняет их через sync_to_async
+в thread_sensitive-режиме, то есть все запросы процесса шли бы
+по очереди в одном потоке. PooledWsgiToAsgi отдает запросы в пул
+из ASGI_THREADS потоков: цикл событий принимает соединения и читает
+тела запросов, а пул ограничивает число одновременно работающих
+представлений и, значит, соединений с базой (у каждого потока свое).
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+# Сам метод без обертки sync_to_async из asgiref.
+_run_wsgi_app = WsgiToAsgiInstance.run_wsgi_app.__wrapped__
+
+
+class _PooledInstance(WsgiToAsgiInstance):
+    def __init__(self, wsgi_application, executor):
+        super().__init__(wsgi_application)
+        self.executor = executor
+
+    async def run_wsgi_app(self, body):
+        await sync_to_async(_run_wsgi_app, thread_sensitive=False,
+                            executor=self.executor)(self, body)
+
+
+class PooledWsgiToAsgi(WsgiToAsgi):
+    """WsgiToAsgi, выполняющий запросы в пуле из threads потоков."""
+
+    def __init__(self, wsgi_application, threads):
+        super().__init__(wsgi_application)
+        self.executor = ThreadPoolExecutor(max_workers=threads,
+                                           thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        await _PooledInstance(self.wsgi_application, self.executor)(
+            scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        # Запуск ничего не требует; при остановке сервера пул
+        # дожидается начатых запросов.
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
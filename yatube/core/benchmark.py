@@ -0,0 +1,66 @@
+"""Помощники для нагрузочных замеров: перцентили, память, окружение."""
+import math
+import platform
+import resource
+import subprocess
+import sys
+
+import django
+
+
+def percentile(values, percent):
+    """Перцентиль методом ближайшего ранга; для пустого списка - None."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summary(values):
+    """p50/p95/p99, среднее и максимум серии замеров."""
+    return {
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+        'mean': sum(values) / len(values) if values else None,
+        'max': max(values) if values else None,
+    }
+
+
+def peak_rss_kb():
+    """Пиковый размер резидентной памяти процесса в килобайтах."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # На macOS ru_maxrss в байтах, на Linux - в килобайтах.
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def current_rss_kb():
+    """Текущий RSS по /proc; там, где его нет, - пиковый."""
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+    except OSError:
+        return peak_rss_kb()
+    return pages * resource.getpagesize() // 1024
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            check=True, universal_newlines=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    """Что нужно знать, чтобы сравнивать отчеты между коммитами."""
+    return {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'platform': platform.platform(),
+    }
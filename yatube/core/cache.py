@@ -0,0 +1,131 @@
+import math
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .performance import count_cache_event
+
+GENERATION_KEY = 'generation:{}'
+LOCK_KEY = 'lock:{}'
+LOCK_POLL_INTERVAL = 0.05
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _new_generation():
+    # Случайное значение, а не счетчик: incr атомарен не во всех
+    # бэкендах (у файлового это get и set), и два одновременных bump
+    # могли бы записать одно и то же поколение. Новое значение к тому же
+    # не совпадет с тем, что было до вытеснения ключа из кэша.
+    return uuid.uuid4().hex
+
+
+def get_generation(name='posts'):
+    """Текущее поколение данных, входит в ключи кэша фрагментов."""
+    key = GENERATION_KEY.format(name)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, _new_generation(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def get_generations(names):
+    """Поколения нескольких имен за один cache.get_many."""
+    keys = {GENERATION_KEY.format(name): name for name in names}
+    found = cache.get_many(keys)
+    generations = {}
+    for key, name in keys.items():
+        if key not in found:
+            cache.add(key, _new_generation(), None)
+            found[key] = cache.get(key)
+        generations[name] = found[key]
+    return generations
+
+
+def bump_generation(name='posts'):
+    """Делает недействительными все фрагменты прошлого поколения."""
+    generation = _new_generation()
+    cache.set(GENERATION_KEY.format(name), generation, None)
+    return generation
+
+
+def record(event, amount=1):
+    with _stats_lock:
+        _stats[event] += amount
+    count_cache_event(event, amount)
+
+
+def cache_stats():
+    """Счетчики процесса: hits, misses, recomputes, stale."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def _should_refresh(delta, expiry, beta):
+    # XFetch: чем ближе срок и дороже пересчет, тем выше шанс обновить
+    # значение заранее, пока остальные процессы еще получают попадания.
+    return time.time() - delta * beta * math.log(1 - random.random()) >= expiry
+
+
+def _wait_for(key, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+def get_or_compute(key, compute, timeout=None, beta=None):
+    """Значение из кэша или compute() с защитой от stampede.
+
+    Пересчитывает только процесс, захвативший блокировку cache.add;
+    остальные отдают устаревшее значение или ждут нового не дольше
+    CACHE_LOCK_TIMEOUT секунд. Значение обновляется с вероятностным
+    опережением срока (beta из CACHE_EARLY_EXPIRY_BETA).
+    """
+    if beta is None:
+        beta = settings.CACHE_EARLY_EXPIRY_BETA
+    lock_timeout = settings.CACHE_LOCK_TIMEOUT
+    lock_key = LOCK_KEY.format(key)
+    entry = cache.get(key)
+    if entry is not None:
+        value, delta, expiry = entry
+        if not _should_refresh(delta, expiry, beta):
+            record('hits')
+            return value
+        locked = cache.add(lock_key, 1, lock_timeout)
+        if not locked:
+            record('stale')
+            return value
+    else:
+        record('misses')
+        locked = cache.add(lock_key, 1, lock_timeout)
+        if not locked:
+            entry = _wait_for(key, lock_timeout)
+            if entry is not None:
+                return entry[0]
+    try:
+        started = time.monotonic()
+        value = compute()
+        delta = time.monotonic() - started
+        expiry = math.inf if timeout is None else time.time() + timeout
+        cache.set(key, (value, delta, expiry), timeout)
+        record('recomputes')
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return value
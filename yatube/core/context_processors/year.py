@@ -1,5 +1,19 @@
+import time
 from datetime import datetime
 
+# Год запоминается в процессе до его смены: на запрос остается одно
+# сравнение с time.time() вместо datetime.now().
+_year = None
+_next_year = 0.0
+
+
+def current_year():
+    global _year, _next_year
+    if time.time() >= _next_year:
+        _year = datetime.now().year
+        _next_year = datetime(_year + 1, 1, 1).timestamp()
+    return _year
+
 
 def year(request):
-    return {'year': datetime.now().year}
+    return {'year': current_year()}
@@ -0,0 +1,60 @@
+"""Настройка соединений SQLite и повтор записи при блокировке базы.
+
+SQLite пускает только одного писателя: остальные ждут busy_timeout,
+а при переходе открытой транзакции от чтения к записи получают
+"database is locked" сразу. retry_on_locked повторяет такую запись
+целиком в новой транзакции. Оборачивать стоит только саму запись:
+повтор всего представления заново сохранил бы загруженные файлы.
+"""
+import functools
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+
+logger = logging.getLogger('core.db')
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Обработчик connection_created: PRAGMA из SQLITE_PRAGMAS."""
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PRAGMAS:
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def is_locked(error):
+    return isinstance(error, OperationalError) and 'locked' in str(error)
+
+
+def retry_on_locked(function=None, attempts=None, delay=None):
+    """Повторяет функцию в транзакции, если база заблокирована.
+
+    Каждая попытка - отдельный transaction.atomic, поэтому неудачная
+    не оставляет половины записей. Внутри чужой транзакции повторять
+    бессмысленно: ошибка пробрасывается сразу. Пауза между попытками
+    растет вдвое и слегка случайна, чтобы писатели не столкнулись снова.
+    """
+    if function is None:
+        return functools.partial(retry_on_locked, attempts=attempts,
+                                 delay=delay)
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        tries = attempts or settings.DB_WRITE_RETRIES
+        pause = delay if delay is not None else settings.DB_WRITE_RETRY_DELAY
+        for attempt in range(1, tries + 1):
+            try:
+                with transaction.atomic():
+                    return function(*args, **kwargs)
+            except OperationalError as error:
+                if (not is_locked(error) or attempt == tries
+                        or connection.in_atomic_block):
+                    raise
+                logger.info('%s: база заблокирована, попытка %s из %s',
+                            function.__name__, attempt, tries)
+                time.sleep(pause * 2 ** (attempt - 1) * random.uniform(1, 2))
+    return wrapper
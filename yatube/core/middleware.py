@@ -0,0 +1,144 @@
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.sessions.middleware import \
+    SessionMiddleware as DjangoSessionMiddleware
+from django.db import connections
+from django.utils.functional import empty
+
+from . import performance, routers
+from .querydetector import QueryDetector, log_issues, queries_detected
+
+
+class PerformanceMiddleware:
+    """Замеряет время ответа, базы и шаблонов, запросы и кэш.
+
+    Метрики складываются в гистограмму по request.resolver_match.view_name
+    и, если включено PERFORMANCE_SERVER_TIMING или пользователь - staff,
+    отдаются клиенту в заголовке Server-Timing.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        performance.install()
+
+    def __call__(self, request):
+        metrics, token = performance.start()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(performance.query_wrapper)
+                    )
+                response = self.get_response(request)
+        finally:
+            performance.stop(token)
+        metrics.finish()
+        match = request.resolver_match
+        performance.histogram.observe(
+            match.view_name if match else '<unresolved>', metrics
+        )
+        if settings.PERFORMANCE_SERVER_TIMING or _is_staff(request):
+            response['Server-Timing'] = metrics.server_timing()
+        return response
+
+
+class QueryDetectorMiddleware:
+    """Ищет N+1 и медленные запросы, если QUERY_DETECTOR_ENABLED.
+
+    Находки пишутся в лог core.queries и рассылаются сигналом
+    core.querydetector.queries_detected.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.QUERY_DETECTOR_ENABLED:
+            return self.get_response(request)
+        with QueryDetector() as detector:
+            response = self.get_response(request)
+        issues = detector.issues()
+        if issues:
+            match = request.resolver_match
+            view_name = match.view_name if match else None
+            for issue in issues:
+                issue.update(view=view_name, path=request.path)
+            log_issues(issues)
+            queries_detected.send(
+                sender=self.__class__, request=request, issues=issues
+            )
+        return response
+
+
+class ReplicaPinMiddleware:
+    """Пускает безопасные запросы читать с реплик.
+
+    После небезопасного запроса (или core.routers.pin в представлении)
+    ставит cookie REPLICA_PIN_COOKIE на REPLICA_PIN_SECONDS секунд:
+    пока она есть, пользователь читает основную базу и видит свои
+    изменения, даже если реплика отстает. Cookie, а не сессия: сессия
+    сама читается из базы.
+    """
+
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        safe = request.method in self.SAFE_METHODS
+        with routers.replica_reads(safe and not routers.is_pinned(request)):
+            response = self.get_response(request)
+        if not safe or getattr(request, routers.PIN_ATTRIBUTE, False):
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS, httponly=True,
+            )
+        return response
+
+
+class SessionMiddleware(DjangoSessionMiddleware):
+    """SessionMiddleware, который не сохраняет сессию без изменений.
+
+    Django сохраняет сессию после любой записи в нее, даже если
+    записано то же значение. Здесь при загрузке запоминаются ключ
+    и данные сессии, и если к концу запроса они не изменились,
+    сохранения (запроса к базе или кэшу) нет.
+    """
+
+    def process_request(self, request):
+        super().process_request(request)
+        session = request.session
+        load = session.load
+
+        def load_and_remember():
+            data = load()
+            session._loaded_state = _session_state(session, data)
+            return data
+        session.load = load_and_remember
+
+    def process_response(self, request, response):
+        session = getattr(request, 'session', None)
+        if (session is not None and session.modified
+                and not settings.SESSION_SAVE_EVERY_REQUEST
+                and getattr(session, '_loaded_state', None)
+                == _session_state(session, session._session)):
+            session.modified = False
+        return super().process_response(request, response)
+
+
+def _session_state(session, data):
+    # После входа ключ сессии меняется и при тех же данных.
+    return session.session_key, session.serializer().dumps(data)
+
+
+def _is_staff(request):
+    user = getattr(request, 'user', None)
+    # Пользователь не загружается ради заголовка: для анонимных
+    # страниц это были бы лишние запросы сессии к базе.
+    if user is None or getattr(user, '_wrapped', None) is empty:
+        return False
+    return user.is_staff
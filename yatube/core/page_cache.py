@@ -0,0 +1,114 @@
+"""Кэш целых страниц для гостей с инвалидацией по суррогатным ключам.
+
+Представление помечает ответ ключами вида post:<id>, group:<slug>,
+author:<username> или index (tag), запись в кэше хранит поколения этих
+ключей на момент сохранения. purge меняет поколение ключа: все страницы
+с ним перестают совпадать и пересобираются при следующем запросе.
+
+Кэшируются только GET и HEAD без cookie сессии: ответ без Set-Cookie
+и без CSRF-токена не может унести чужие данные, а пользователь
+с сессией всегда получает страницу из представления.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_vary_headers
+
+from .cache import bump_generation, get_generations, record
+
+PAGE_KEY = 'page-response:{}'
+TAG_GENERATION = 'page:{}'
+TAGS_ATTRIBUTE = '_page_cache_tags'
+# Ключ всех страниц: пользователи и группы выводятся почти везде.
+SITE_TAG = 'site'
+
+
+def tag(request, *tags):
+    """Добавляет суррогатные ключи к ответу на request.
+
+    Вне cache_anonymous_page и для запросов мимо кэша ничего не делает.
+    """
+    current = getattr(request, TAGS_ATTRIBUTE, None)
+    if current is not None:
+        current.update(tags)
+
+
+def purge(*tags):
+    """Делает недействительными страницы с любым из ключей."""
+    for name in set(tags):
+        bump_generation(TAG_GENERATION.format(name))
+
+
+def _generations(tags):
+    generations = get_generations(TAG_GENERATION.format(name)
+                                  for name in tags)
+    return {name: generations[TAG_GENERATION.format(name)] for name in tags}
+
+
+def _key(request):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return PAGE_KEY.format(path)
+
+
+def _cacheable_request(request):
+    return (settings.PAGE_CACHE_ENABLED
+            and request.method in ('GET', 'HEAD')
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES)
+
+
+def _cacheable_response(request, response):
+    session = getattr(request, 'session', None)
+    return (response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and not response.has_header('Cache-Control')
+            and not request.META.get('CSRF_COOKIE_USED')
+            and not (session is not None and session.modified))
+
+
+def _timeout():
+    # Гость читает с реплики: страница, собранная сразу после purge,
+    # может отставать, поэтому живет не дольше задержки репликации.
+    if settings.DATABASE_REPLICAS:
+        return min(settings.PAGE_CACHE_TIMEOUT, settings.REPLICA_PIN_SECONDS)
+    return settings.PAGE_CACHE_TIMEOUT
+
+
+def _lookup(request):
+    entry = cache.get(_key(request))
+    if entry is None:
+        return None
+    generations, response = entry
+    if _generations(sorted(generations)) != generations:
+        return None
+    return response
+
+
+def cache_anonymous_page(view):
+    """Отдает гостям страницу из кэша, пока не изменились ее ключи.
+
+    Ставится над posts.conditional: попадание в кэш обходится без
+    запросов к базе, If-None-Match сверяется с ETag сохраненного ответа.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not _cacheable_request(request):
+            return view(request, *args, **kwargs)
+        cached = _lookup(request)
+        if cached is not None:
+            record('hits')
+            return get_conditional_response(
+                request, etag=cached.get('ETag'), response=cached
+            )
+        record('misses')
+        setattr(request, TAGS_ATTRIBUTE, {SITE_TAG})
+        response = view(request, *args, **kwargs)
+        patch_vary_headers(response, ('Cookie',))
+        if _cacheable_response(request, response):
+            tags = sorted(getattr(request, TAGS_ATTRIBUTE))
+            cache.set(_key(request), (_generations(tags), response),
+                      _timeout())
+        return response
+    return wrapper
@@ -0,0 +1,213 @@
+"""Метрики производительности запроса и гистограммы по представлениям.
+
+Метрики текущего запроса лежат в contextvar: их пополняют обертка
+execute_wrapper (запросы к базе), обертка Template.render (время
+шаблонов) и core.cache.record (попадания в кэш фрагментов).
+PerformanceMiddleware из core.middleware открывает и закрывает сбор.
+"""
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.template.base import Template
+
+_current = ContextVar('request_metrics', default=None)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+_SPACES = re.compile(r'\s+')
+
+CACHE_HIT_EVENTS = ('hits', 'stale')
+CACHE_MISS_EVENTS = ('misses',)
+
+
+def fingerprint(sql):
+    """SQL без конкретных значений: одинаковые запросы с разными
+    параметрами дают один отпечаток.
+    """
+    sql = _STRING.sub('%s', sql)
+    sql = _NUMBER.sub('%s', sql)
+    sql = _IN_LIST.sub('(...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.wall = 0.0
+        self.db_time = 0.0
+        self.queries = 0
+        self.fingerprints = Counter()
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @property
+    def duplicates(self):
+        """Сколько запросов повторили уже выполненный отпечаток."""
+        return sum(count - 1 for count in self.fingerprints.values())
+
+    def finish(self):
+        self.wall = time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Значение заголовка Server-Timing, длительности в мс."""
+        return ', '.join((
+            f'total;dur={self.wall * 1000:.1f}',
+            f'db;dur={self.db_time * 1000:.1f};'
+            f'desc="{self.queries} queries, {self.duplicates} duplicate"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'cache;desc="hit={self.cache_hits} miss={self.cache_misses}"',
+        ))
+
+
+def start():
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+def query_wrapper(execute, sql, params, many, context):
+    """Обертка для connection.execute_wrapper: время и отпечатки."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_time += time.perf_counter() - started
+        metrics.queries += 1
+        metrics.fingerprints[fingerprint(sql)] += 1
+
+
+def count_cache_event(event, amount=1):
+    metrics = _current.get()
+    if metrics is None:
+        return
+    if event in CACHE_HIT_EVENTS:
+        metrics.cache_hits += amount
+    elif event in CACHE_MISS_EVENTS:
+        metrics.cache_misses += amount
+
+
+_original_render = Template.render
+_install_lock = threading.Lock()
+
+
+def _timed_render(self, context):
+    metrics = _current.get()
+    # Вложенные шаблоны ({% include %}, {% extends %}) уже входят
+    # во время внешнего, считаем только верхний уровень.
+    if metrics is None or metrics.template_depth:
+        return _original_render(self, context)
+    metrics.template_depth += 1
+    started = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        metrics.template_time += time.perf_counter() - started
+        metrics.template_depth -= 1
+
+
+def install():
+    """Подменяет Template.render на версию с замером времени."""
+    with _install_lock:
+        if Template.render is not _timed_render:
+            Template.render = _timed_render
+
+
+class Histogram:
+    """Распределение времени ответа и суммы метрик по view_name.
+
+    Живет в памяти процесса: у каждого воркера сервера своя копия.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def observe(self, view_name, metrics):
+        wall_ms = metrics.wall * 1000
+        with self._lock:
+            view = self._views.setdefault(view_name, {
+                'count': 0,
+                'buckets': [0] * (len(self.buckets) + 1),
+                'wall_ms': 0.0,
+                'max_wall_ms': 0.0,
+                'db_ms': 0.0,
+                'queries': 0,
+                'duplicates': 0,
+                'template_ms': 0.0,
+                'cache_hits': 0,
+                'cache_misses': 0,
+            })
+            view['count'] += 1
+            index = next((index for index, bound in enumerate(self.buckets)
+                          if wall_ms <= bound), len(self.buckets))
+            view['buckets'][index] += 1
+            view['wall_ms'] += wall_ms
+            view['max_wall_ms'] = max(view['max_wall_ms'], wall_ms)
+            view['db_ms'] += metrics.db_time * 1000
+            view['queries'] += metrics.queries
+            view['duplicates'] += metrics.duplicates
+            view['template_ms'] += metrics.template_time * 1000
+            view['cache_hits'] += metrics.cache_hits
+            view['cache_misses'] += metrics.cache_misses
+
+    def _quantile(self, view, share):
+        # Верхняя граница корзины, в которую попал квантиль.
+        target = share * view['count']
+        seen = 0
+        for bound, count in zip(self.buckets, view['buckets']):
+            seen += count
+            if seen >= target:
+                return bound
+        return view['max_wall_ms']
+
+    def snapshot(self):
+        with self._lock:
+            views = {name: dict(view, buckets=list(view['buckets']))
+                     for name, view in self._views.items()}
+        result = {}
+        for name, view in sorted(views.items()):
+            count = view['count']
+            result[name] = {
+                'count': count,
+                'buckets': dict(zip(
+                    [str(bound) for bound in self.buckets] + ['+Inf'],
+                    view['buckets'],
+                )),
+                'p50_ms': self._quantile(view, 0.5),
+                'p95_ms': self._quantile(view, 0.95),
+                'p99_ms': self._quantile(view, 0.99),
+                'max_ms': round(view['max_wall_ms'], 1),
+                'mean_ms': round(view['wall_ms'] / count, 1),
+                'mean_db_ms': round(view['db_ms'] / count, 1),
+                'mean_queries': round(view['queries'] / count, 1),
+                'mean_duplicates': round(view['duplicates'] / count, 1),
+                'mean_template_ms': round(view['template_ms'] / count, 1),
+                'cache_hits': view['cache_hits'],
+                'cache_misses': view['cache_misses'],
+            }
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+histogram = Histogram(settings.PERFORMANCE_HISTOGRAM_BUCKETS)
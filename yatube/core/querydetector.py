@@ -0,0 +1,140 @@
+"""Поиск N+1 и медленных запросов с указанием места в коде.
+
+QueryDetector ставится через connection.execute_wrapper, группирует
+запросы по отпечатку (core.performance.fingerprint) и для повторов
+и медленных запросов запоминает строку Python и строку шаблона,
+откуда они пришли.
+"""
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.dispatch import Signal
+
+from .performance import fingerprint
+
+logger = logging.getLogger('core.queries')
+
+# Отправляется QueryDetectorMiddleware, если в запросе найдены проблемы.
+queries_detected = Signal(providing_args=['request', 'issues'])
+
+_CORE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Служебные модули, через которые проходит любой запрос: они
+# не считаются местом, откуда запрос пришел.
+_SKIPPED_FILES = {
+    os.path.join(_CORE_DIR, name) for name in (
+        'querydetector.py', 'performance.py', 'middleware.py', 'cache.py',
+        os.path.join('templatetags', 'fragment_cache.py'),
+    )
+}
+
+
+def _is_project_file(filename):
+    return (filename.startswith(str(settings.BASE_DIR))
+            and 'site-packages' not in filename
+            and filename not in _SKIPPED_FILES)
+
+
+def find_origin():
+    """Ближайшая строка кода проекта и ближайший узел шаблона."""
+    python = template = None
+    frame = sys._getframe(1)
+    while frame is not None and (python is None or template is None):
+        code = frame.f_code
+        if template is None and code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            token = getattr(node, 'token', None)
+            origin = getattr(node, 'origin', None)
+            if token is not None and origin is not None:
+                name = origin.template_name or origin.name
+                template = f'{name}:{token.lineno}'
+        if python is None and _is_project_file(code.co_filename):
+            path = os.path.relpath(code.co_filename, settings.BASE_DIR)
+            python = f'{path}:{frame.f_lineno} in {code.co_name}'
+        frame = frame.f_back
+    return {'python': python, 'template': template}
+
+
+class QueryDetector:
+    """Собирает запросы внутри блока with и находит проблемные.
+
+    N+1 - отпечаток, выполненный больше threshold раз; медленный
+    запрос - дольше slow_ms миллисекунд.
+    """
+
+    def __init__(self, threshold=None, slow_ms=None):
+        if threshold is None:
+            threshold = settings.QUERY_N_PLUS_ONE_THRESHOLD
+        if slow_ms is None:
+            slow_ms = settings.QUERY_SLOW_MS
+        self.threshold = threshold
+        self.slow_ms = slow_ms
+        self.queries = {}
+        self.slow = []
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self._record(sql, elapsed)
+
+    def _record(self, sql, elapsed):
+        key = fingerprint(sql)
+        entry = self.queries.setdefault(key, {
+            'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+            'sql': sql, 'origin': None,
+        })
+        entry['count'] += 1
+        entry['total_ms'] += elapsed
+        entry['max_ms'] = max(entry['max_ms'], elapsed)
+        # Стек разбирается только для повторов и медленных запросов.
+        origin = None
+        if entry['count'] == 2:
+            origin = entry['origin'] = find_origin()
+        if elapsed >= self.slow_ms:
+            self.slow.append({
+                'fingerprint': key, 'sql': sql, 'ms': round(elapsed, 1),
+                **(origin or find_origin()),
+            })
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def issues(self):
+        """Найденные проблемы в виде словарей для логов и тестов."""
+        found = []
+        for key, entry in self.queries.items():
+            if entry['count'] > self.threshold:
+                found.append({
+                    'kind': 'n_plus_one',
+                    'fingerprint': key,
+                    'sql': entry['sql'],
+                    'count': entry['count'],
+                    'total_ms': round(entry['total_ms'], 1),
+                    'max_ms': round(entry['max_ms'], 1),
+                    **(entry['origin'] or {}),
+                })
+        found.extend(dict(item, kind='slow') for item in self.slow)
+        return found
+
+
+def log_issues(issues, **context):
+    for issue in issues:
+        report = dict(context, **issue)
+        logger.warning('%s %s', issue['kind'],
+                       json.dumps(report, ensure_ascii=False),
+                       extra={'query_report': report})
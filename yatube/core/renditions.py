@@ -0,0 +1,114 @@
+import hashlib
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+MANIFEST_KEY = 'renditions:{}'
+MANIFEST_MISSING_TIMEOUT = 60
+
+# Формат Pillow, MIME-тип и расширение; порядок - от самого легкого.
+FORMATS = (
+    ('AVIF', 'image/avif', 'avif'),
+    ('WEBP', 'image/webp', 'webp'),
+    ('JPEG', 'image/jpeg', 'jpg'),
+)
+
+
+def supported_formats():
+    """Форматы, которые умеет сохранять установленный Pillow."""
+    Image.init()
+    return [fmt for fmt in FORMATS if fmt[0] in Image.SAVE]
+
+
+def rendition_name(name, width, extension):
+    """Имя варианта: основа файла для читаемости и хэш полного пути,
+    чтобы posts/a/x.jpg и posts/b/x.png не делили варианты.
+    """
+    stem = os.path.splitext(os.path.basename(name))[0]
+    digest = hashlib.md5(name.encode()).hexdigest()[:12]
+    return f'posts/renditions/{stem}-{digest}-{width}w.{extension}'
+
+
+def _candidates(name):
+    return [
+        (mime, rendition_name(name, width, extension), width)
+        for width, _ in _sizes()
+        for _, mime, extension in supported_formats()
+    ]
+
+
+def _sizes():
+    ratio = settings.IMAGE_RENDITION_RATIO
+    return [(width, round(width / ratio))
+            for width in settings.IMAGE_RENDITION_WIDTHS]
+
+
+def _manifest(entries):
+    """Группирует варианты по формату: {mime: [(name, width), ...]}."""
+    manifest = {}
+    for mime, name, width in entries:
+        manifest.setdefault(mime, []).append((name, width))
+    return manifest
+
+
+def generate(name):
+    """Создает варианты картинки во всех ширинах и форматах.
+
+    Кадрирует по центру в пропорции IMAGE_RENDITION_RATIO, как и
+    миниатюра 960x339, и сохраняет манифест в кэш.
+    """
+    with default_storage.open(name) as source:
+        image = Image.open(source)
+        image.load()
+    # Снимки с телефона хранят поворот в EXIF, а не в пикселях.
+    image = ImageOps.exif_transpose(image).convert('RGB')
+    entries = []
+    for width, height in _sizes():
+        resized = ImageOps.fit(image, (width, height), Image.LANCZOS)
+        for fmt, mime, extension in supported_formats():
+            buffer = BytesIO()
+            resized.save(buffer, fmt, quality=settings.IMAGE_RENDITION_QUALITY)
+            path = rendition_name(name, width, extension)
+            if default_storage.exists(path):
+                default_storage.delete(path)
+            # Хранилище может выбрать другое имя, если файл успел
+            # появиться снова: в манифест идет то, что сохранено.
+            saved = default_storage.save(path, ContentFile(buffer.getvalue()))
+            entries.append((mime, saved, width))
+    manifest = _manifest(entries)
+    cache.set(MANIFEST_KEY.format(name), manifest, None)
+    return manifest
+
+
+def get_manifest(name):
+    """Манифест готовых вариантов картинки или пустой словарь.
+
+    Если манифеста нет в кэше (вытеснен или создан другим процессом
+    с локальным кэшем), он восстанавливается по файлам в хранилище.
+    """
+    key = MANIFEST_KEY.format(name)
+    manifest = cache.get(key)
+    if manifest is not None:
+        return manifest
+    entries = [entry for entry in _candidates(name)
+               if default_storage.exists(entry[1])]
+    manifest = _manifest(entries)
+    cache.set(key, manifest, None if manifest else MANIFEST_MISSING_TIMEOUT)
+    return manifest
+
+
+def delete(name):
+    """Удаляет варианты картинки и ее манифест."""
+    key = MANIFEST_KEY.format(name)
+    manifest = cache.get(key) or {}
+    paths = {path for variants in manifest.values() for path, _ in variants}
+    paths.update(path for _, path, _ in _candidates(name))
+    for path in paths:
+        if default_storage.exists(path):
+            default_storage.delete(path)
+    cache.delete(key)
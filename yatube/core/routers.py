@@ -0,0 +1,68 @@
+"""Маршрутизация запросов между основной базой и репликами.
+
+Запись всегда идет в default. Чтение уходит на случайную реплику
+из DATABASE_REPLICAS только внутри replica_reads(), который открывает
+core.middleware.ReplicaPinMiddleware для безопасных HTTP-запросов.
+Команды управления, транзакции и запросы пользователя, недавно
+что-то записавшего, читают основную базу: реплика могла еще
+не получить их изменения.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+# Атрибут запроса: ответ закрепит пользователя за основной базой.
+PIN_ATTRIBUTE = '_pin_primary'
+
+
+@contextmanager
+def replica_reads(allowed=True):
+    token = _replica_reads.set(allowed)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def pin(request):
+    """Закрепляет пользователя за основной базой после записи.
+
+    Нужен представлениям, которые пишут в базу на GET-запрос:
+    после POST закрепление ставится само.
+    """
+    setattr(request, PIN_ATTRIBUTE, True)
+    _replica_reads.set(False)
+
+
+def is_pinned(request):
+    return settings.REPLICA_PIN_COOKIE in request.COOKIES
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (not replicas or not _replica_reads.get()
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        # Явно: иначе объект, прочитанный с реплики, сохранился бы в нее.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # На репликах те же данные, что и в основной базе.
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
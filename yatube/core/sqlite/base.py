@@ -0,0 +1,32 @@
+"""Бэкенд SQLite с OPTIONS['transaction_mode'], как в Django 5.1.
+
+С transaction_mode='IMMEDIATE' транзакция сразу берет блокировку
+записи. Обычный BEGIN (DEFERRED) берет ее только на первой записи,
+и если к этому моменту пишет другое соединение, SQLite отвечает
+"database is locked" немедленно, не дожидаясь busy_timeout: ожидание
+привело бы к взаимной блокировке.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'EXCLUSIVE', 'IMMEDIATE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    @property
+    def transaction_mode(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode')
+        if mode is not None and mode.upper() not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f'transaction_mode должен быть одним из {TRANSACTION_MODES}'
+            )
+        return mode
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('transaction_mode', None)
+        return params
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.transaction_mode
+        self.cursor().execute(f'BEGIN {mode}' if mode else 'BEGIN')
@@ -0,0 +1,115 @@
+"""Прогрев кэша шаблонов и замер времени рендера по шаблонам.
+
+warm_up компилирует все шаблоны проекта заранее: с кэширующим
+загрузчиком (yatube.settings_production) первый запрос к странице
+уже не читает и не разбирает файлы. TemplateProfiler считает время
+каждого шаблона, включая base.html через {% extends %} и вложенные
+{% include %}: полное и собственное, без вложенных шаблонов.
+"""
+import logging
+import os
+import time
+
+from django.template import TemplateSyntaxError, engines
+from django.template.base import Template
+
+logger = logging.getLogger('core.templates')
+
+
+def _loader_dirs(loaders):
+    for loader in loaders:
+        if hasattr(loader, 'loaders'):
+            # Кэширующий загрузчик оборачивает обычные.
+            yield from _loader_dirs(loader.loaders)
+        elif hasattr(loader, 'get_dirs'):
+            yield from loader.get_dirs()
+
+
+def template_names(engine):
+    """Имена всех шаблонов, которые видят загрузчики движка."""
+    names = set()
+    for directory in _loader_dirs(engine.template_loaders):
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                if filename.endswith(('.html', '.txt', '.xml')):
+                    path = os.path.join(root, filename)
+                    names.add(os.path.relpath(path, directory)
+                              .replace(os.sep, '/'))
+    return sorted(names)
+
+
+def warm_up():
+    """Компилирует все шаблоны, возвращает число скомпилированных.
+
+    Шаблон с ошибкой не останавливает запуск: он попадет в лог,
+    а ошибку покажет первый запрос, как и без прогрева.
+    """
+    compiled = 0
+    for engine in engines.all():
+        if not hasattr(engine, 'engine'):
+            continue
+        for name in template_names(engine.engine):
+            try:
+                engine.get_template(name)
+            except TemplateSyntaxError:
+                logger.exception('Шаблон %s не компилируется', name)
+                continue
+            compiled += 1
+    return compiled
+
+
+class TemplateProfiler:
+    """Собирает время рендера по шаблонам внутри блока with.
+
+    Подменяет Template._render, через который проходят и сам шаблон,
+    и родитель из {% extends %}, и {% include %}. Рассчитан на один
+    поток: используется в командах, а не в обработке запросов.
+    """
+
+    def __init__(self):
+        self.stats = {}
+        self._stack = []
+        self._original = None
+
+    def _name(self, template):
+        origin = template.origin
+        return origin.template_name or template.name or '<string>'
+
+    def _wrap(self, original):
+        profiler = self
+
+        def _render(template, context):
+            entry = profiler.stats.setdefault(profiler._name(template), {
+                'renders': 0, 'total_ms': 0.0, 'self_ms': 0.0,
+            })
+            # Второй элемент - время вложенных шаблонов.
+            frame = [time.perf_counter(), 0.0]
+            profiler._stack.append(frame)
+            try:
+                return original(template, context)
+            finally:
+                profiler._stack.pop()
+                elapsed = (time.perf_counter() - frame[0]) * 1000
+                entry['renders'] += 1
+                entry['total_ms'] += elapsed
+                entry['self_ms'] += elapsed - frame[1]
+                if profiler._stack:
+                    profiler._stack[-1][1] += elapsed
+        return _render
+
+    def __enter__(self):
+        self._original = Template._render
+        Template._render = self._wrap(self._original)
+        return self
+
+    def __exit__(self, *exc_info):
+        Template._render = self._original
+
+    def report(self):
+        """Строки по убыванию собственного времени."""
+        rows = [
+            dict(entry, name=name,
+                 mean_ms=entry['total_ms'] / entry['renders'])
+            for name, entry in self.stats.items()
+        ]
+        return sorted(rows, key=lambda row: row['self_ms'], reverse=True)
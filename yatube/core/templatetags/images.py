@@ -0,0 +1,41 @@
+from django import template
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from core import renditions, thumbnails
+
+register = template.Library()
+
+
+def _srcset(variants):
+    return ', '.join(f'{default_storage.url(name)} {width}w'
+                     for name, width in variants)
+
+
+@register.simple_tag
+def ready_thumbnail(image):
+    """{% ready_thumbnail post.image as im %}: готовая миниатюра или None."""
+    return thumbnails.ready_thumbnail(image)
+
+
+@register.inclusion_tag('includes/responsive_image.html')
+def responsive_image(image):
+    """<picture> с вариантами картинки по ширине и формату.
+
+    Пока варианты не созданы, выводит миниатюру или заглушку.
+    """
+    manifest = renditions.get_manifest(image.name)
+    fallback = manifest.get('image/jpeg')
+    if not fallback:
+        return {'thumbnail': thumbnails.ready_thumbnail(image)}
+    sources = [
+        {'mime': mime, 'srcset': _srcset(manifest[mime])}
+        for _, mime, _ in renditions.FORMATS
+        if mime in manifest and mime != 'image/jpeg'
+    ]
+    return {
+        'sources': sources,
+        'srcset': _srcset(fallback),
+        'src': default_storage.url(fallback[-1][0]),
+        'sizes': settings.IMAGE_RENDITION_SIZES,
+    }
@@ -0,0 +1,68 @@
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from core.cache import record
+
+register = template.Library()
+
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+CARD_KEY = 'post-card:{}:{}'
+
+
+def card_key(post):
+    """Ключ карточки: меняется вместе с post.updated и с полями автора
+    и группы, которые выводит карточка.
+
+    Все поля уже выбраны Post.objects.for_listing, лишних запросов нет.
+    """
+    author = post.author
+    group = post.group
+    version = repr((
+        post.updated.timestamp(),
+        author.username, author.first_name, author.last_name,
+        group.slug if group else None,
+    ))
+    digest = hashlib.md5(version.encode()).hexdigest()
+    return CARD_KEY.format(post.pk, digest)
+
+
+def render_card(post):
+    return get_template(CARD_TEMPLATE).render({'post': post})
+
+
+@register.filter
+def cards_version(posts):
+    """{{ page_obj|cards_version }}: версия набора карточек страницы.
+
+    Входит в ключ фрагмента вокруг списка карточек, чтобы правка поста
+    без смены поколения данных (например, готовая миниатюра) не
+    оставляла в кэше страницу со старой карточкой.
+    """
+    return max((post.updated.timestamp() for post in posts), default=0)
+
+
+@register.simple_tag
+def post_cards(posts):
+    """{% post_cards page_obj as cards %}: HTML карточек постов списком.
+
+    Страница собирается одним cache.get_many, недостающие карточки
+    рендерятся и сохраняются одним cache.set_many.
+    """
+    posts = list(posts)
+    if not settings.FRAGMENT_CACHE_ENABLED:
+        return [mark_safe(render_card(post)) for post in posts]
+    keys = [card_key(post) for post in posts]
+    cards = cache.get_many(keys)
+    missing = {key: render_card(post)
+               for key, post in zip(keys, posts) if key not in cards}
+    if missing:
+        cache.set_many(missing, settings.FRAGMENT_CACHE_TIMEOUT)
+        cards.update(missing)
+    record('hits', len(keys) - len(missing))
+    record('misses', len(missing))
+    return [mark_safe(cards[key]) for key in keys]
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TransactionTestCase
+
+from core.asgi import PooledWsgiToAsgi
+from posts.models import Post, User
+
+
+def call(application, *paths):
+    """Параллельные GET-запросы к ASGI-приложению: [(статус, тело)]."""
+    async def get(path):
+        messages = [{'type': 'http.request', 'body': b''}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        await application({
+            'type': 'http', 'method': 'GET', 'path': path,
+            'query_string': b'', 'http_version': '1.1',
+            'headers': [], 'server': ('testserver', 80),
+        }, receive, send)
+        return sent[0]['status'], b''.join(
+            message.get('body', b'') for message in sent[1:])
+
+    async def get_all():
+        return await asyncio.gather(*(get(path) for path in paths))
+    return asyncio.run(get_all())
+
+
+class PooledWsgiToAsgiTests(SimpleTestCase):
+    def wsgi(self, barrier, threads):
+        def application(environ, start_response):
+            threads.add(threading.current_thread().name)
+            barrier.wait()
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return [environ['PATH_INFO'].encode()]
+        return application
+
+    def test_requests_run_in_parallel(self):
+        """Запросы выполняются в пуле одновременно, а не по очереди"""
+        threads = set()
+        # Оба запроса ждут друг друга: по очереди они бы не завершились.
+        barrier = threading.Barrier(2, timeout=5)
+        application = PooledWsgiToAsgi(self.wsgi(barrier, threads), 2)
+        self.addCleanup(application.executor.shutdown)
+        self.assertEqual(call(application, '/one/', '/two/'),
+                         [(200, b'/one/'), (200, b'/two/')])
+        self.assertEqual(len(threads), 2)
+
+    def test_pool_size_bounds_threads(self):
+        """Потоков не больше размера пула"""
+        threads = set()
+        barrier = threading.Barrier(1)
+        application = PooledWsgiToAsgi(self.wsgi(barrier, threads), 1)
+        self.addCleanup(application.executor.shutdown)
+        call(application, '/one/', '/two/', '/three/')
+        self.assertEqual(len(threads), 1)
+
+    def test_lifespan(self):
+        """Сервер получает подтверждения запуска и остановки"""
+        application = PooledWsgiToAsgi(None, 1)
+        messages = [{'type': 'lifespan.startup'},
+                    {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(application({'type': 'lifespan'}, receive, send))
+        self.assertEqual(sent, ['lifespan.startup.complete',
+                                'lifespan.shutdown.complete'])
+
+
+class AsgiApplicationTests(TransactionTestCase):
+    # Запросы идут из потоков пула со своими соединениями: данные
+    # должны быть закоммичены, поэтому TransactionTestCase.
+
+    def test_pages_render(self):
+        """yatube.asgi отдает страницы чтения"""
+        from yatube.asgi import application
+
+        cache.clear()
+        author = User.objects.create(username='author')
+        post = Post.objects.create(text='Пост через ASGI', author=author)
+        pages = call(application, '/', f'/profile/{author.username}/',
+                     f'/posts/{post.pk}/')
+        for status, body in pages:
+            self.assertEqual(status, 200)
+            self.assertIn('Пост через ASGI', body.decode())
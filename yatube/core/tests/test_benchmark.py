@@ -0,0 +1,20 @@
+from django.test import SimpleTestCase
+
+from core.benchmark import percentile, summary
+
+
+class BenchmarkHelpersTests(SimpleTestCase):
+    def test_percentile(self):
+        """Перцентиль считается методом ближайшего ранга"""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertIsNone(percentile([], 50))
+
+    def test_summary(self):
+        """Сводка содержит перцентили, среднее и максимум"""
+        self.assertEqual(summary([3, 1, 2]), {
+            'p50': 2, 'p95': 3, 'p99': 3, 'mean': 2, 'max': 3,
+        })
@@ -0,0 +1,149 @@
+import os
+import runpy
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from core import cache as core_cache
+from core.cache import cache_stats, get_or_compute, reset_cache_stats
+
+TEMP_CACHE_DIR = tempfile.mkdtemp()
+
+
+class GetOrComputeTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        reset_cache_stats()
+
+    def test_hit_after_miss(self):
+        """Второе обращение берет значение из кэша"""
+        compute = mock.Mock(return_value='value')
+        self.assertEqual(get_or_compute('key', compute, 60), 'value')
+        self.assertEqual(get_or_compute('key', compute, 60), 'value')
+        compute.assert_called_once()
+        self.assertEqual(cache_stats(),
+                         {'misses': 1, 'recomputes': 1, 'hits': 1})
+
+    def test_single_flight(self):
+        """Одновременные промахи пересчитывают значение один раз"""
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'value'
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    get_or_compute('key', slow, 60)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['value'] * 5)
+
+    def test_early_expiration(self):
+        """Вблизи срока значение пересчитывается заранее"""
+        get_or_compute('key', lambda: 'old', 60)
+        with mock.patch.object(core_cache, '_should_refresh',
+                               return_value=True):
+            self.assertEqual(get_or_compute('key', lambda: 'new', 60), 'new')
+        self.assertEqual(cache_stats()['recomputes'], 2)
+
+    def test_stale_value_while_locked(self):
+        """Пока другой процесс пересчитывает, отдается старое значение"""
+        get_or_compute('key', lambda: 'old', 60)
+        cache.add(core_cache.LOCK_KEY.format('key'), 1)
+        with mock.patch.object(core_cache, '_should_refresh',
+                               return_value=True):
+            self.assertEqual(get_or_compute('key', lambda: 'new', 60), 'old')
+        self.assertEqual(cache_stats()['stale'], 1)
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': TEMP_CACHE_DIR,
+}})
+class SharedBackendTests(SimpleTestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_CACHE_DIR, ignore_errors=True)
+
+    def test_fragment_cache_tag(self):
+        """Тег fragment_cache работает с общим файловым кэшем"""
+        reset_cache_stats()
+        template = Template(
+            '{% load fragment_cache %}'
+            '{% fragment_cache 60 index_page page %}{{ value }}'
+            '{% endfragment_cache %}'
+        )
+        first = template.render(Context({'page': 1, 'value': 'first'}))
+        second = template.render(Context({'page': 1, 'value': 'second'}))
+        third = template.render(Context({'page': 2, 'value': 'third'}))
+        self.assertEqual((first, second, third), ('first', 'first', 'third'))
+        self.assertEqual(cache_stats()['hits'], 1)
+
+    def test_concurrent_generation_bumps(self):
+        """Одновременные bump_generation дают разные поколения"""
+        old = core_cache.get_generation('bumps')
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                core_cache.bump_generation('bumps')))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(results)), 10)
+        self.assertNotIn(old, results)
+        self.assertIn(core_cache.get_generation('bumps'), results)
+
+    @override_settings(FRAGMENT_CACHE_ENABLED=False)
+    def test_fragment_cache_disabled(self):
+        """FRAGMENT_CACHE_ENABLED = False рендерит фрагмент каждый раз"""
+        template = Template(
+            '{% load fragment_cache %}'
+            '{% fragment_cache 60 disabled_page %}{{ value }}'
+            '{% endfragment_cache %}'
+        )
+        first = template.render(Context({'value': 'first'}))
+        second = template.render(Context({'value': 'second'}))
+        self.assertEqual((first, second), ('first', 'second'))
+
+
+class ProductionCacheTests(SimpleTestCase):
+    def production(self, backend=None):
+        environ = {key: value for key, value in os.environ.items()
+                   if key != 'YATUBE_CACHE'}
+        if backend:
+            environ['YATUBE_CACHE'] = backend
+        with mock.patch.dict(os.environ, environ, clear=True):
+            return runpy.run_module('yatube.settings_production')
+
+    def test_shared_by_default(self):
+        """В продакшене по умолчанию кэш общий для воркеров"""
+        self.assertEqual(
+            self.production()['CACHES']['default']['BACKEND'],
+            'django.core.cache.backends.memcached.MemcachedCache')
+
+    def test_locmem_rejected(self):
+        """Продакшен не запускается с кэшем в памяти процесса"""
+        with self.assertRaises(ImproperlyConfigured):
+            self.production('locmem')
@@ -0,0 +1,27 @@
+from datetime import datetime
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.context_processors import year
+
+
+class YearTests(SimpleTestCase):
+    def setUp(self):
+        year._year = None
+        year._next_year = 0.0
+
+    def test_year_memoized_until_new_year(self):
+        """Год вычисляется раз и обновляется после 1 января"""
+        new_year = datetime(2031, 1, 1).timestamp()
+        with mock.patch('core.context_processors.year.datetime') as clock, \
+                mock.patch('core.context_processors.year.time') as timer:
+            clock.side_effect = datetime
+            clock.now.return_value = datetime(2030, 12, 31, 23, 59)
+            timer.time.return_value = new_year - 60
+            self.assertEqual(year.year(None), {'year': 2030})
+            clock.now.return_value = datetime(2031, 1, 1, 0, 1)
+            self.assertEqual(year.year(None), {'year': 2030})
+            self.assertEqual(clock.now.call_count, 1)
+            timer.time.return_value = new_year + 60
+            self.assertEqual(year.year(None), {'year': 2031})
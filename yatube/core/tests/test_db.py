@@ -0,0 +1,151 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection
+from django.db.models.signals import post_save
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core.db import apply_sqlite_pragmas, retry_on_locked
+from core.sqlite.base import DatabaseWrapper
+from posts.models import Group, Post, User
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+class SqlitePragmaTests(TransactionTestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied(self):
+        """Обработчик connection_created выполняет PRAGMA из настроек"""
+        default = self.pragma('cache_size')
+        self.addCleanup(apply_sqlite_pragmas, None, connection)
+        with override_settings(SQLITE_PRAGMAS={'cache_size': -1234}):
+            apply_sqlite_pragmas(None, connection)
+        self.assertEqual(self.pragma('cache_size'), -1234)
+        with override_settings(SQLITE_PRAGMAS={'cache_size': default}):
+            apply_sqlite_pragmas(None, connection)
+
+    def test_production_profile(self):
+        """Профиль продакшена включает WAL и постоянные соединения,
+        не меняя основные настройки"""
+        from yatube import settings_production
+
+        database = settings_production.DATABASES['default']
+        self.assertEqual(database['CONN_MAX_AGE'], 600)
+        self.assertEqual(database['ENGINE'], 'core.sqlite')
+        self.assertEqual(settings_production.SQLITE_PRAGMAS['journal_mode'],
+                         'WAL')
+        self.assertNotIn('transaction_mode',
+                         settings.DATABASES['default']['OPTIONS'])
+
+
+class RetryOnLockedTests(TransactionTestCase):
+    def test_retries_locked_write(self):
+        """Запись повторяется, а неудачная попытка откатывается"""
+        attempts = []
+
+        @retry_on_locked(attempts=3, delay=0)
+        def write():
+            attempts.append(1)
+            Group.objects.create(title='Группа', slug=f'g{len(attempts)}')
+            if len(attempts) < 3:
+                raise OperationalError('database is locked')
+            return 'ok'
+
+        self.assertEqual(write(), 'ok')
+        self.assertEqual(len(attempts), 3)
+        self.assertEqual(
+            list(Group.objects.values_list('slug', flat=True)), ['g3'])
+
+    def test_gives_up(self):
+        """После последней попытки ошибка пробрасывается"""
+        write = mock.Mock(side_effect=OperationalError('database is locked'))
+        write.__name__ = 'write'
+        with self.assertRaises(OperationalError):
+            retry_on_locked(write, attempts=2, delay=0)()
+        self.assertEqual(write.call_count, 2)
+
+    def test_other_errors_not_retried(self):
+        """Прочие ошибки базы не повторяются"""
+        write = mock.Mock(side_effect=OperationalError('no such table'))
+        write.__name__ = 'write'
+        with self.assertRaises(OperationalError):
+            retry_on_locked(write, attempts=3, delay=0)()
+        self.assertEqual(write.call_count, 1)
+
+
+@override_settings(DB_WRITE_RETRY_DELAY=0)
+class RetriedViewTests(TransactionTestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.author = User.objects.create(username='author')
+        self.client.force_login(self.author)
+
+    def test_upload_saved_once(self):
+        """Повтор записи поста не сохраняет загруженный файл заново"""
+        saves = []
+
+        def locked(sender, **kwargs):
+            # Первая попытка падает уже после вставки строки.
+            saves.append(kwargs['created'])
+            if len(saves) == 1:
+                raise OperationalError('database is locked')
+        post_save.connect(locked, sender=Post)
+        self.addCleanup(post_save.disconnect, locked, sender=Post)
+
+        # Миниатюры строит фоновый пул уже после теста, когда
+        # MEDIA_ROOT указывает на настоящий каталог.
+        with mock.patch('core.thumbnails.schedule') as schedule:
+            self.client.post(reverse('posts:post_create'), {
+                'text': 'Пост',
+                'image': SimpleUploadedFile('small.gif', SMALL_GIF,
+                                            content_type='image/gif'),
+            })
+        schedule.assert_called_once()
+        self.assertEqual(saves, [True, True])
+        self.assertEqual(
+            os.listdir(os.path.join(self.media_root, 'posts')),
+            ['small.gif'])
+        self.assertEqual(Post.objects.get().image.name, 'posts/small.gif')
+        self.assertEqual(
+            User.objects.get(pk=self.author.pk).counters.posts, 1)
+
+
+class TransactionModeTests(SimpleTestCase):
+    def wrapper(self, mode):
+        settings_dict = dict(connection.settings_dict,
+                             OPTIONS={'transaction_mode': mode})
+        return DatabaseWrapper(settings_dict)
+
+    def test_begin_immediate(self):
+        """Транзакция начинается с BEGIN в заданном режиме"""
+        wrapper = self.wrapper('IMMEDIATE')
+        self.assertNotIn('transaction_mode', wrapper.get_connection_params())
+        with mock.patch.object(wrapper, 'cursor') as cursor:
+            wrapper._start_transaction_under_autocommit()
+        cursor().execute.assert_called_once_with('BEGIN IMMEDIATE')
+
+    def test_unknown_mode(self):
+        """Неизвестный режим - ошибка конфигурации"""
+        with self.assertRaises(ImproperlyConfigured):
+            self.wrapper('LATER').transaction_mode
@@ -0,0 +1,79 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.performance import fingerprint, histogram
+from posts.models import Post, User
+
+
+class FingerprintTests(TestCase):
+    def test_values_are_stripped(self):
+        """Запросы с разными значениями дают один отпечаток"""
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id = 1 AND name = \'a\''),
+            fingerprint('SELECT *  FROM t WHERE id = 25 AND name = \'b\''),
+        )
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s, %s)'),
+            'SELECT * FROM t WHERE id IN (...)',
+        )
+
+
+class PerformanceMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        Post.objects.create(text='Пост', author=cls.author)
+        cls.staff = User.objects.create(username='staff', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        histogram.reset()
+        self.client = Client()
+
+    @override_settings(PERFORMANCE_SERVER_TIMING=True)
+    def test_server_timing_header(self):
+        """Ответ содержит время ответа, базы, шаблонов и кэша"""
+        response = self.client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        for metric in ('total;dur=', 'db;dur=', 'tpl;dur=',
+                       'cache;desc="hit=0 miss='):
+            self.assertIn(metric, timing)
+
+    @override_settings(PERFORMANCE_SERVER_TIMING=False)
+    def test_header_only_for_staff(self):
+        """Без настройки заголовок видит только staff"""
+        url = reverse('posts:index')
+        self.assertNotIn('Server-Timing', self.client.get(url))
+        self.client.force_login(self.staff)
+        self.assertIn('Server-Timing', self.client.get(url))
+
+    def test_histogram_by_view_name(self):
+        """Метрики копятся по имени представления"""
+        for _ in range(3):
+            self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:profile', args=[self.author]))
+        stats = histogram.snapshot()
+        index = stats['posts:index']
+        self.assertEqual(index['count'], 3)
+        self.assertEqual(sum(index['buckets'].values()), 3)
+        self.assertGreater(index['mean_queries'], 0)
+        self.assertGreater(index['mean_template_ms'], 0)
+        # Первый запрос гостя собирает страницу: промахи кэша страниц,
+        # фрагментов списка постов и шапки и карточки поста. Следующие
+        # отдаются из кэша страниц целиком.
+        self.assertEqual(index['cache_misses'], 4)
+        self.assertEqual(index['cache_hits'], 2)
+        self.assertEqual(stats['posts:profile']['count'], 1)
+
+    def test_stats_endpoint_is_staff_only(self):
+        """Гистограммы доступны только staff, POST их сбрасывает"""
+        url = reverse('core:performance')
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(self.staff)
+        self.assertIn('posts:index', self.client.get(url).json())
+        self.client.post(url)
+        self.assertEqual(set(self.client.get(url).json()),
+                         {'core:performance'})
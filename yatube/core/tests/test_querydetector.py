@@ -0,0 +1,74 @@
+from django.template import Context, Engine
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.querydetector import QueryDetector, queries_detected
+from posts.models import Group, Post, User
+
+
+class QueryDetectorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        for number in range(5):
+            author = User.objects.create(username=f'author{number}')
+            Post.objects.create(text='Пост', author=author, group=cls.group)
+
+    def test_n_plus_one_in_python(self):
+        """Повторяющийся запрос привязан к строке кода"""
+        with QueryDetector(threshold=3) as detector:
+            for post in Post.objects.all():
+                post.author.username
+        issue, = detector.issues()
+        self.assertEqual(issue['kind'], 'n_plus_one')
+        self.assertEqual(issue['count'], 5)
+        self.assertIn('auth_user', issue['fingerprint'])
+        self.assertIn('core/tests/test_querydetector.py', issue['python'])
+        self.assertIsNone(issue['template'])
+
+    def test_n_plus_one_in_template(self):
+        """Запрос из шаблона привязан к строке шаблона"""
+        template = Engine().from_string(
+            '{% for post in posts %}\n{{ post.author.username }}'
+            '{% endfor %}'
+        )
+        with QueryDetector(threshold=3) as detector:
+            template.render(Context({'posts': Post.objects.all()}))
+        issue, = detector.issues()
+        self.assertTrue(issue['template'].endswith(':2'))
+
+    def test_within_threshold(self):
+        """Запросы, выполненные не больше порога, не считаются N+1"""
+        with QueryDetector(threshold=5) as detector:
+            for post in Post.objects.all():
+                post.author.username
+        self.assertEqual(detector.issues(), [])
+
+    def test_slow_query(self):
+        """Запрос дольше порога помечается как медленный"""
+        with QueryDetector(slow_ms=0) as detector:
+            Group.objects.count()
+        issue, = detector.issues()
+        self.assertEqual(issue['kind'], 'slow')
+        self.assertIn('core/tests/test_querydetector.py', issue['python'])
+
+    @override_settings(QUERY_DETECTOR_ENABLED=True,
+                       QUERY_N_PLUS_ONE_THRESHOLD=0)
+    def test_middleware_logs_and_signals(self):
+        """Middleware пишет находки в лог и отправляет сигнал"""
+        found = []
+
+        def collect(sender, issues, **kwargs):
+            found.extend(issues)
+
+        queries_detected.connect(collect)
+        try:
+            with self.assertLogs('core.queries', 'WARNING') as logs:
+                Client().get(reverse('posts:group_list', args=['group']))
+        finally:
+            queries_detected.disconnect(collect)
+        self.assertTrue(found)
+        self.assertEqual(found[0]['view'], 'posts:group_list')
+        self.assertIn('"view": "posts:group_list"', logs.output[0])
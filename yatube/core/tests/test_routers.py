@@ -0,0 +1,134 @@
+import os
+import sqlite3
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.test import (Client, SimpleTestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from core.routers import ReplicaRouter, replica_reads
+from posts.models import Post, User
+
+REPLICA = 'replica'
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRouterTests(SimpleTestCase):
+    databases = {'default'}
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_go_to_replica_only_when_allowed(self):
+        """Без replica_reads чтение идет в основную базу"""
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Post), REPLICA)
+            with replica_reads(False):
+                self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_transaction_reads_primary(self):
+        """Внутри транзакции чтение идет в основную базу"""
+        with replica_reads(), transaction.atomic():
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_writes_go_to_primary(self):
+        """Запись всегда идет в основную базу"""
+        post = Post(text='Пост')
+        post._state.db = REPLICA
+        with replica_reads():
+            self.assertEqual(
+                self.router.db_for_write(Post, instance=post), 'default')
+
+    def test_no_migrations_on_replica(self):
+        """Миграции не применяются к репликам"""
+        self.assertIs(self.router.allow_migrate(REPLICA, 'posts'), False)
+        self.assertIsNone(self.router.allow_migrate('default', 'posts'))
+
+
+# Кэш страниц гостя проверяется в posts.tests.test_page_cache.
+@override_settings(DATABASE_REPLICAS=[REPLICA], PAGE_CACHE_ENABLED=False)
+class ReplicaReadsTests(TransactionTestCase):
+    """Реплика - отдельный файл SQLite, репликация - копия
+    тестовой базы через sqlite3 backup в момент replicate().
+    """
+
+    databases = {'default', REPLICA}
+
+    @classmethod
+    def setUpClass(cls):
+        descriptor, cls.replica_path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(descriptor)
+        connections.databases[REPLICA] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': cls.replica_path,
+        }
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections.databases[REPLICA]
+        os.remove(cls.replica_path)
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username='author')
+        self.client = Client()
+        self.client.force_login(self.author)
+        self.guest = Client()
+
+    def replicate(self):
+        connections[REPLICA].close()
+        connections['default'].ensure_connection()
+        target = sqlite3.connect(self.replica_path)
+        try:
+            connections['default'].connection.backup(target)
+        finally:
+            target.close()
+
+    def texts(self, client, url):
+        return [post.text for post in
+                client.get(url).context['page_obj'].object_list]
+
+    def test_guest_reads_replica(self):
+        """Гость видит только то, что уже дошло до реплики"""
+        Post.objects.create(text='Старый пост', author=self.author)
+        self.replicate()
+        Post.objects.create(text='Новый пост', author=self.author)
+        url = reverse('posts:index')
+        self.assertEqual(self.texts(self.guest, url), ['Старый пост'])
+        self.replicate()
+        self.assertEqual(self.texts(self.guest, url),
+                         ['Новый пост', 'Старый пост'])
+
+    def test_author_reads_own_writes(self):
+        """Автор сразу видит свой пост, хотя реплика отстает"""
+        self.replicate()
+        response = self.client.post(reverse('posts:post_create'),
+                                    {'text': 'Свежий пост'})
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+        url = reverse('posts:profile', args=[self.author.username])
+        self.assertEqual(self.texts(self.client, url), ['Свежий пост'])
+        self.assertEqual(self.texts(self.guest, url), [])
+
+    def test_pin_expires(self):
+        """Без cookie закрепления автор снова читает реплику"""
+        self.replicate()
+        self.client.post(reverse('posts:post_create'),
+                         {'text': 'Свежий пост'})
+        del self.client.cookies[settings.REPLICA_PIN_COOKIE]
+        url = reverse('posts:profile', args=[self.author.username])
+        self.assertEqual(self.texts(self.client, url), [])
+
+    def test_follow_pins_primary(self):
+        """Подписка по GET тоже закрепляет за основной базой"""
+        other = User.objects.create(username='other')
+        self.replicate()
+        response = self.client.get(
+            reverse('posts:profile_follow', args=[other.username]))
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
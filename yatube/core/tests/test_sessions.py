@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.contrib.sessions.backends.db import SessionStore
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.middleware import SessionMiddleware
+from posts.models import User
+
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db')
+class SessionMiddlewareTests(TestCase):
+    def setUp(self):
+        self.session = SessionStore()
+        self.session['theme'] = 'dark'
+        self.session.create()
+
+    def session_writes(self, view):
+        request = RequestFactory().get('/')
+        request.COOKIES[settings.SESSION_COOKIE_NAME] = (
+            self.session.session_key)
+        middleware = SessionMiddleware(lambda request: view(request)
+                                       or HttpResponse())
+        with CaptureQueriesContext(connection) as queries:
+            response = middleware(request)
+        writes = [query['sql'] for query in queries
+                  if query['sql'].startswith(('UPDATE', 'INSERT'))]
+        return writes, request, response
+
+    def test_same_value_not_saved(self):
+        """Запись того же значения не сохраняет сессию"""
+        def view(request):
+            request.session['theme'] = 'dark'
+        writes, _, _ = self.session_writes(view)
+        self.assertEqual(writes, [])
+
+    def test_changed_value_saved(self):
+        """Измененная сессия сохраняется"""
+        def view(request):
+            request.session['theme'] = 'light'
+        writes, _, _ = self.session_writes(view)
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(SessionStore(self.session.session_key)['theme'],
+                         'light')
+
+    def test_cycled_key_saved(self):
+        """Новый ключ сессии сохраняется и при тех же данных"""
+        def view(request):
+            request.session['theme'] = 'dark'
+            request.session.cycle_key()
+        writes, request, response = self.session_writes(view)
+        self.assertTrue(writes)
+        self.assertEqual(
+            response.cookies[settings.SESSION_COOKIE_NAME].value,
+            request.session.session_key)
+
+
+class LastLoginTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user',
+                                             password='password')
+
+    def test_login_writes_last_login(self):
+        """Вход сразу записывает last_login в базу"""
+        self.client.force_login(self.user)
+        self.assertIsNotNone(User.objects.get(pk=self.user.pk).last_login)
+
+    def test_login_invalidates_reset_token(self):
+        """Ссылка сброса пароля перестает работать после входа"""
+        token = default_token_generator.make_token(self.user)
+        self.client.force_login(self.user)
+        user = User.objects.get(pk=self.user.pk)
+        self.assertFalse(default_token_generator.check_token(user, token))
@@ -0,0 +1,57 @@
+from unittest import mock
+
+from django.apps import apps
+from django.core.cache import cache
+from django.template import engines
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.template_profile import TemplateProfiler, warm_up
+from posts.models import Post, User
+from yatube import settings_production
+
+
+class TemplateWarmUpTests(TestCase):
+    @override_settings(TEMPLATES=settings_production.TEMPLATES)
+    def test_warm_up_fills_cached_loader(self):
+        """Прогрев компилирует шаблоны проекта в кэш загрузчика"""
+        self.assertGreater(warm_up(), 0)
+        loader = engines['django'].engine.template_loaders[0]
+        for name in ('base.html', 'includes/header.html',
+                     'posts/index.html', 'posts/includes/paginator.html'):
+            with self.subTest(name=name):
+                self.assertIn(name, loader.get_template_cache)
+
+    @override_settings(TEMPLATE_WARMUP=True)
+    def test_ready_warms_up(self):
+        """CoreConfig.ready прогревает шаблоны, если включено"""
+        with mock.patch('core.template_profile.warm_up') as warm:
+            apps.get_app_config('core').ready()
+        warm.assert_called_once_with()
+
+
+class TemplateProfilerTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Post.objects.create(text='Пост',
+                            author=User.objects.create(username='author'))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_profiles_extends_and_includes(self):
+        """Профиль содержит страницу, base.html и include"""
+        with TemplateProfiler() as profiler:
+            Client().get(reverse('posts:index'))
+        stats = profiler.stats
+        for name in ('posts/index.html', 'base.html',
+                     'includes/header.html'):
+            with self.subTest(name=name):
+                self.assertEqual(stats[name]['renders'], 1)
+                self.assertLessEqual(stats[name]['self_ms'],
+                                     stats[name]['total_ms'])
+        self.assertGreaterEqual(stats['posts/index.html']['total_ms'],
+                                stats['base.html']['total_ms'])
+        self.assertEqual(profiler.report()[0]['self_ms'],
+                         max(row['self_ms'] for row in stats.values()))
@@ -0,0 +1,103 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.dispatch import Signal
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.images import ImageFile
+
+from core import renditions
+
+logger = logging.getLogger(__name__)
+
+# Отметка «миниатюры еще нет»: kvstore sorl кэширует только найденные
+# миниатюры, и без отметки каждая картинка без миниатюры - запрос к базе.
+MISSING_KEY = 'thumbnail-missing:{}'
+MISSING_TIMEOUT = 60
+
+# Отправляется из фонового пула, когда миниатюра и варианты картинки
+# созданы; image - имя файла в хранилище. Получатель обновляет
+# Post.updated: от него зависят ключи фрагментов с этой картинкой.
+thumbnail_ready = Signal(providing_args=['image'])
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def thumbnail_options():
+    options = dict(settings.POST_THUMBNAIL)
+    return options.pop('geometry'), options
+
+
+def get_executor():
+    """Общий пул потоков процесса для генерации миниатюр."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+        return _executor
+
+
+def ready_thumbnail(image):
+    """Готовая миниатюра из key-value store sorl или None.
+
+    В отличие от get_thumbnail ничего не генерирует и не открывает
+    исходную картинку, поэтому безопасно вызывается из шаблона.
+    """
+    if not image:
+        return None
+    geometry, options = thumbnail_options()
+    backend = default.backend
+    source = ImageFile(image)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(source, geometry, options)
+    missing_key = MISSING_KEY.format(name)
+    if cache.get(missing_key):
+        return None
+    thumbnail = default.kvstore.get(ImageFile(name, default.storage))
+    if thumbnail is None:
+        cache.set(missing_key, True, MISSING_TIMEOUT)
+    return thumbnail
+
+
+def generate(image):
+    """Синхронно создает миниатюру картинки поста."""
+    geometry, options = thumbnail_options()
+    thumbnail = get_thumbnail(image, geometry, **options)
+    cache.delete(MISSING_KEY.format(thumbnail.name))
+    return thumbnail
+
+
+def _generate_in_worker(image):
+    try:
+        generate(image)
+        renditions.generate(image)
+        thumbnail_ready.send(sender=None, image=image)
+    except Exception:
+        logger.exception('Не удалось создать миниатюру %s', image)
+    finally:
+        connections.close_all()
+
+
+def schedule(image):
+    """Ставит миниатюру и варианты картинки в фоновый пул после коммита."""
+    if not image:
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(_generate_in_worker, image.name)
+    )
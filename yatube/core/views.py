@@ -1,4 +1,9 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render
+from django.views.decorators.cache import never_cache
+
+from .performance import histogram
 
 
 def page_not_found(request, exception):
@@ -7,3 +12,16 @@ def page_not_found(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@never_cache
+@staff_member_required
+def performance_stats(request):
+    """Гистограммы PerformanceMiddleware этого процесса в JSON.
+
+    POST сбрасывает накопленные данные.
+    """
+    if request.method == 'POST':
+        histogram.reset()
+    return JsonResponse(histogram.snapshot(),
+                        json_dumps_params={'ensure_ascii': False})
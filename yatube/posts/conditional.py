@@ -0,0 +1,117 @@
+"""Условные GET-запросы (ETag и Last-Modified) для страниц с постами.
+
+Метаданные считаются одним-двумя запросами по индексам и запоминаются
+на объекте запроса, чтобы etag_func и last_modified_func декоратора
+django.views.decorators.http.condition не ходили в базу дважды. Если
+клиент прислал актуальный ETag, представление не вызывается вовсе:
+ни основной выборки, ни рендера шаблона.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from core.cache import get_generation
+
+REMOVED_KEY = 'removed:{}'
+
+
+def record_removal(name):
+    """Запоминает, что из выборки name только что ушла запись.
+
+    Максимум дат по оставшимся записям после удаления может стать
+    меньше, поэтому Last-Modified учитывает и время удаления.
+    """
+    cache.set(REMOVED_KEY.format(name), timezone.now(), None)
+
+
+def last_removal(name):
+    key = REMOVED_KEY.format(name)
+    removed = cache.get(key)
+    if removed is None:
+        # Время могло быть вытеснено из кэша: считаем, что удаляли
+        # только сейчас, - так ответ в худшем случае отдастся заново.
+        cache.add(key, timezone.now(), None)
+        removed = cache.get(key)
+    return removed
+
+
+def latest(*moments):
+    return max(moment for moment in moments if moment is not None)
+
+
+def posts_metadata(posts):
+    """Время последнего изменения выборки постов.
+
+    Это самое позднее из Post.updated (создание и правка поста)
+    и времени удаления поста или его ухода в другую группу. Число
+    постов здесь не считается: COUNT(*) проходит всю выборку.
+    """
+    updated = posts.aggregate(latest=Max('updated'))['latest']
+    return {'latest': latest(updated, last_removal('posts'))}
+
+
+def latest_modified(request):
+    """Время изменения выборки, уже посчитанное metadata_condition."""
+    return getattr(request, '_posts_metadata', {}).get('latest')
+
+
+def _value(value):
+    if hasattr(value, 'timestamp'):
+        return f'{value.timestamp():.6f}'
+    return str(value)
+
+
+def _viewer(request):
+    """Части ETag, зависящие от того, кто и как смотрит страницу.
+
+    В HTML-страницах есть шапка с именем пользователя, а у вошедших
+    еще и CSRF-токен в формах. Токен меняется при входе вместе
+    с ключом сессии, поэтому после повторного входа старый ответ
+    не годится и тому же пользователю.
+    """
+    return request.user.pk or 'anon', request.session.session_key
+
+
+def metadata_condition(get_metadata, prefix, per_viewer=False):
+    """Декоратор condition по словарю get_metadata(request, **kwargs).
+
+    ETag складывается из всех значений словаря, строки запроса
+    (страница, курсор) и поколения данных (правки постов, групп
+    и комментариев). Last-Modified берется
+    из ключа latest, но только для ответов, одинаковых для всех:
+    страницы с per_viewer=True различаются пользователем, а дата
+    этого не выражает.
+    """
+    def metadata(request, kwargs):
+        if not hasattr(request, '_posts_metadata'):
+            request._posts_metadata = get_metadata(request, **kwargs)
+        return request._posts_metadata
+
+    def etag(request, **kwargs):
+        meta = metadata(request, kwargs)
+        parts = [prefix, *kwargs.values(), request.GET.urlencode(),
+                 *meta.values(), get_generation()]
+        if per_viewer:
+            parts.extend(_viewer(request))
+        # Хэш: в kwargs и параметрах бывают символы, недопустимые
+        # в заголовке, а ключ сессии не должен попадать в ответ.
+        raw = '-'.join(_value(part) for part in parts)
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def last_modified(request, **kwargs):
+        return metadata(request, kwargs).get('latest')
+
+    return condition(
+        etag_func=etag,
+        last_modified_func=None if per_viewer else last_modified,
+    )
+
+
+def posts_condition(get_posts, prefix, per_viewer=False):
+    """metadata_condition по постам, которые вернет get_posts(**kwargs)."""
+    def get_metadata(request, **kwargs):
+        return posts_metadata(get_posts(**kwargs))
+    return metadata_condition(get_metadata, prefix, per_viewer)
@@ -0,0 +1,101 @@
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, User, UserCounters
+
+
+def count_for(user_id):
+    """Точные значения счетчиков, посчитанные агрегатами."""
+    return {
+        'posts': Post.objects.filter(author_id=user_id).count(),
+        'followers': Follow.objects.filter(author_id=user_id).count(),
+        'following': Follow.objects.filter(user_id=user_id).count(),
+    }
+
+
+def get_counters(user):
+    try:
+        return UserCounters.objects.get(user_id=user.pk)
+    except UserCounters.DoesNotExist:
+        counters, _ = UserCounters.objects.get_or_create(
+            user_id=user.pk, defaults=count_for(user.pk)
+        )
+        return counters
+
+
+def change(user_id, field, delta):
+    """Атомарно сдвигает счетчик пользователя на delta.
+
+    Если строки счетчиков еще нет, она создается по агрегатам,
+    которые уже учитывают только что сохраненную запись.
+    """
+    with transaction.atomic():
+        updated = UserCounters.objects.filter(user_id=user_id).update(
+            **{field: F(field) + delta}
+        )
+        if not updated and delta > 0:
+            UserCounters.objects.get_or_create(
+                user_id=user_id, defaults=count_for(user_id)
+            )
+
+
+def change_comments(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta
+    )
+
+
+def _count(queryset, field):
+    """Коррелированный подзапрос COUNT(*) по queryset.filter(field=pk).
+
+    Несколько Count по разным связям в одном annotate перемножают
+    строки соединений; подзапросы считаются независимо.
+    """
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by()
+        .values(field).annotate(total=Count('pk')).values('total'),
+        output_field=IntegerField(),
+    ), 0)
+
+
+def recount(users=None, posts=None):
+    """Пересчитывает счетчики; возвращает число исправленных строк.
+
+    Без аргументов пересчитывает все. Если передан users или posts
+    (списки id), пересчитываются только эти пользователи и посты.
+    """
+    fixed = 0
+    if users is not None or posts is not None:
+        users, posts = users or [], posts or []
+    with transaction.atomic():
+        drifted = Post.objects.annotate(
+            real=_count(Comment.objects.all(), 'post')
+        ).exclude(comments_count=F('real'))
+        if posts is not None:
+            drifted = drifted.filter(pk__in=posts)
+        for post_id, real in drifted.values_list('pk', 'real'):
+            Post.objects.filter(pk=post_id).update(comments_count=real)
+            fixed += 1
+        scoped = User.objects.select_related('counters').annotate(
+            posts_real=_count(Post.objects.all(), 'author'),
+            followers_real=_count(Follow.objects.all(), 'author'),
+            following_real=_count(Follow.objects.all(), 'user'),
+        )
+        if users is not None:
+            scoped = scoped.filter(pk__in=users)
+        for user in scoped.iterator():
+            actual = {
+                'posts': user.posts_real,
+                'followers': user.followers_real,
+                'following': user.following_real,
+            }
+            counters = getattr(user, 'counters', None)
+            if counters is None:
+                UserCounters.objects.create(user=user, **actual)
+                fixed += 1
+            elif any(getattr(counters, field) != value
+                     for field, value in actual.items()):
+                UserCounters.objects.filter(user=user).update(**actual)
+                fixed += 1
+    return fixed
@@ -0,0 +1,110 @@
+"""Потоковые ленты постов в форматах RSS 2.0, Atom и JSON Feed.
+
+Каждая лента - генератор строк для StreamingHttpResponse: посты
+читаются порциями через iterator(), так что в памяти никогда
+не лежит вся лента целиком.
+"""
+import json
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.urls import reverse
+from django.utils.text import Truncator
+
+CONTENT_TYPES = {
+    'rss': 'application/rss+xml; charset=utf-8',
+    'atom': 'application/atom+xml; charset=utf-8',
+    'json': 'application/feed+json; charset=utf-8',
+}
+
+
+def _x(value):
+    return escape(str(value), {'"': '&quot;'})
+
+
+def _items(request, posts):
+    posts = posts.order_by('-pub_date', '-pk')[:settings.FEED_MAX_ITEMS]
+    for post in posts.iterator(chunk_size=settings.FEED_CHUNK_SIZE):
+        yield post, {
+            'url': request.build_absolute_uri(
+                reverse('posts:post_detail', args=[post.pk])
+            ),
+            'title': Truncator(post.text).words(8),
+            'author': post.author.get_full_name() or post.author.username,
+        }
+
+
+def rss(request, title, link, posts, updated):
+    yield ('<?xml version="1.0" encoding="utf-8"?>\n'
+           '<rss version="2.0"><channel>'
+           f'<title>{_x(title)}</title><link>{_x(link)}</link>'
+           f'<description>{_x(title)}</description>'
+           '<language>ru</language>')
+    if updated:
+        yield f'<lastBuildDate>{format_datetime(updated)}</lastBuildDate>'
+    for post, item in _items(request, posts):
+        yield ('<item>'
+               f'<title>{_x(item["title"])}</title>'
+               f'<link>{_x(item["url"])}</link>'
+               f'<guid isPermaLink="true">{_x(item["url"])}</guid>'
+               f'<pubDate>{format_datetime(post.pub_date)}</pubDate>'
+               f'<dc:creator xmlns:dc="http://purl.org/dc/elements/1.1/">'
+               f'{_x(item["author"])}</dc:creator>'
+               f'<description>{_x(post.text)}</description>'
+               '</item>')
+    yield '</channel></rss>\n'
+
+
+def atom(request, title, link, posts, updated):
+    feed_url = request.build_absolute_uri()
+    yield ('<?xml version="1.0" encoding="utf-8"?>\n'
+           '<feed xmlns="http://www.w3.org/2005/Atom" xml:lang="ru">'
+           f'<title>{_x(title)}</title>'
+           f'<link href="{_x(link)}" rel="alternate"/>'
+           f'<link href="{_x(feed_url)}" rel="self"/>'
+           f'<id>{_x(feed_url)}</id>')
+    if updated:
+        yield f'<updated>{updated.isoformat()}</updated>'
+    for post, item in _items(request, posts):
+        yield ('<entry>'
+               f'<title>{_x(item["title"])}</title>'
+               f'<link href="{_x(item["url"])}" rel="alternate"/>'
+               f'<id>{_x(item["url"])}</id>'
+               f'<updated>{post.pub_date.isoformat()}</updated>'
+               f'<published>{post.pub_date.isoformat()}</published>'
+               f'<author><name>{_x(item["author"])}</name></author>'
+               f'<content type="text">{_x(post.text)}</content>'
+               '</entry>')
+    yield '</feed>\n'
+
+
+def json_feed(request, title, link, posts, updated):
+    header = json.dumps({
+        'version': 'https://jsonfeed.org/version/1.1',
+        'title': title,
+        'home_page_url': link,
+        'feed_url': request.build_absolute_uri(),
+        'language': 'ru',
+    }, ensure_ascii=False)
+    # Заголовок без закрывающей скобки, дальше потоком идут items.
+    yield header[:-1] + ', "items": ['
+    separator = ''
+    for post, item in _items(request, posts):
+        yield separator + json.dumps({
+            'id': item['url'],
+            'url': item['url'],
+            'title': item['title'],
+            'content_text': post.text,
+            'date_published': post.pub_date.isoformat(),
+            'authors': [{'name': item['author']}],
+        }, ensure_ascii=False)
+        separator = ', '
+    yield ']}\n'
+
+
+GENERATORS = {
+    'rss': rss,
+    'atom': atom,
+    'json': json_feed,
+}
@@ -0,0 +1,84 @@
+import json
+
+from django.core.cache import cache
+from django.core.management.base import CommandError
+from django.test import Client
+from django.test.utils import override_settings
+
+from core.template_profile import TemplateProfiler
+
+from .benchmark import Command as BenchmarkCommand
+from .profile_templates import SKIPPED
+
+# Общие части страниц, ради которых кэшируются фрагменты.
+CHROME = (
+    'includes/header.html',
+    'includes/footer.html',
+    'posts/includes/paginator.html',
+)
+
+
+class Command(BenchmarkCommand):
+    help = ('Сравнивает время рендера шапки, подвала и паджинатора '
+            'на запрос без кэша фрагментов и с ним (заполните базу '
+            'командой seed)')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=20,
+            help='Сколько раз запросить каждую страницу',
+        )
+        parser.add_argument(
+            '--anonymous', action='store_true',
+            help='Запрашивать страницы без входа на сайт',
+        )
+        parser.add_argument('--output', help='Куда записать отчет в JSON')
+
+    def measure(self, client, urls, requests, enabled):
+        """Миллисекунды шаблонов на один запрос: по CHROME и всего."""
+        with override_settings(FRAGMENT_CACHE_ENABLED=enabled):
+            cache.clear()
+            # Первый проход заполняет кэш и в замер не попадает.
+            for url, data in urls.values():
+                client.get(url, data)
+            with TemplateProfiler() as profiler:
+                for _ in range(requests):
+                    for url, data in urls.values():
+                        client.get(url, data)
+        count = requests * len(urls)
+        stats = profiler.stats
+        result = {name: stats[name]['total_ms'] / count
+                  for name in CHROME if name in stats}
+        result['total'] = sum(entry['self_ms']
+                              for entry in stats.values()) / count
+        return result
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests должно быть больше нуля')
+        post, other = self.targets()
+        urls = {name: url for name, url in self.urls(post, other).items()
+                if name not in SKIPPED}
+        client = Client()
+        if not options['anonymous']:
+            client.force_login(post.author)
+
+        report = {
+            'disabled': self.measure(client, urls, options['requests'],
+                                     False),
+            'enabled': self.measure(client, urls, options['requests'],
+                                    True),
+        }
+        self.stdout.write(f'{"шаблон, мс на запрос":<32} '
+                          f'{"без кэша":>9} {"с кэшем":>9} {"экономия":>9}')
+        for name in (*CHROME, 'total'):
+            before = report['disabled'].get(name)
+            after = report['enabled'].get(name)
+            if before is None or after is None:
+                continue
+            self.stdout.write(f'{name:<32} {before:>9.3f} {after:>9.3f} '
+                              f'{before - after:>9.3f}')
+        cache.clear()
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
@@ -0,0 +1,146 @@
+import json
+import threading
+import time
+from urllib.error import HTTPError, URLError
+from urllib.request import urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from core.benchmark import environment, summary
+from posts.models import Post
+
+
+def _change(old, new):
+    if not old:
+        return ''
+    return f'{(new - old) / old * 100:+.0f}%'
+
+
+class Command(BaseCommand):
+    help = ('Нагружает запущенный сервер параллельными GET-запросами к '
+            'страницам чтения и пишет задержки и пропускную способность '
+            'в JSON. Для сравнения WSGI и ASGI запустите его против '
+            'gunicorn yatube.wsgi, затем против uvicorn '
+            'yatube.asgi:application с --compare и первым отчетом.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Путь страницы; по умолчанию главная, группа, профиль '
+                 'и пост самого нового поста в группе',
+        )
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Сколько раз запросить каждую страницу',
+        )
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--output', default='bench_http.json')
+        parser.add_argument(
+            '--compare', help='Отчет прошлого запуска для сравнения',
+        )
+
+    def default_paths(self):
+        post = Post.objects.filter(group__isnull=False).select_related(
+            'author', 'group'
+        ).order_by('-pub_date').first()
+        if post is None:
+            raise CommandError(
+                'Нет постов в группах: заполните базу командой seed '
+                'или передайте --path'
+            )
+        return [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[post.group.slug]),
+            reverse('posts:profile', args=[post.author.username]),
+            reverse('posts:post_detail', args=[post.pk]),
+        ]
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError(
+                '--concurrency и --requests должны быть больше нуля'
+            )
+        paths = options['paths'] or self.default_paths()
+        base_url = options['base_url'].rstrip('/')
+        # Общая очередь: пути чередуются, как у реальных посетителей.
+        jobs = iter(paths * options['requests'])
+        jobs_lock = threading.Lock()
+        timings = {path: [] for path in paths}
+        errors = {path: 0 for path in paths}
+
+        def worker():
+            while True:
+                with jobs_lock:
+                    path = next(jobs, None)
+                if path is None:
+                    return
+                started = time.perf_counter()
+                try:
+                    with urlopen(base_url + path,
+                                 timeout=options['timeout']) as response:
+                        response.read()
+                except (HTTPError, URLError, OSError):
+                    errors[path] += 1
+                    continue
+                timings[path].append((time.perf_counter() - started) * 1000)
+
+        threads = [threading.Thread(target=worker)
+                   for _ in range(options['concurrency'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        done = sum(len(values) for values in timings.values())
+        report = {
+            'environment': environment(),
+            'options': {
+                'base_url': base_url,
+                'concurrency': options['concurrency'],
+                'requests': options['requests'],
+            },
+            'requests_per_second': round(done / elapsed, 1),
+            'paths': {
+                path: {
+                    'latency_ms': summary(timings[path]),
+                    'errors': errors[path],
+                }
+                for path in paths
+            },
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+
+        previous = {}
+        if options['compare']:
+            with open(options['compare']) as old:
+                previous = json.load(old)
+        self.write_summary(report, previous)
+        self.stdout.write(f'Отчет: {options["output"]}')
+
+    def write_summary(self, report, previous):
+        old_paths = previous.get('paths', {})
+        for path, result in report['paths'].items():
+            latency = result['latency_ms']
+            if latency['p50'] is None:
+                self.stdout.write(f'{path:<30} ошибок {result["errors"]}')
+                continue
+            line = (f'{path:<30} p50 {latency["p50"]:7.1f} мс  '
+                    f'p95 {latency["p95"]:7.1f} мс  '
+                    f'p99 {latency["p99"]:7.1f} мс  '
+                    f'ошибок {result["errors"]}')
+            if path in old_paths and old_paths[path]['latency_ms']['p95']:
+                change = _change(old_paths[path]['latency_ms']['p95'],
+                                 latency['p95'])
+                line += f'  (p95 {change})'
+            self.stdout.write(line)
+        line = f'{report["requests_per_second"]} запросов/с'
+        if previous:
+            line += (' (было '
+                     f'{previous["requests_per_second"]} запросов/с)')
+        self.stdout.write(line)
@@ -0,0 +1,74 @@
+import json
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from core import renditions
+from core.thumbnails import ready_thumbnail
+from posts.models import Post
+
+
+def _size(name):
+    if name and default_storage.exists(name):
+        return default_storage.size(name)
+    return 0
+
+
+def picked_rendition(manifest, viewport):
+    """Вариант, который выберет браузер: первый поддерживаемый формат
+    из <picture> и наименьшая ширина не меньше ширины экрана.
+    """
+    for _, mime, _ in renditions.FORMATS:
+        variants = sorted(manifest.get(mime, ()), key=lambda item: item[1])
+        if variants:
+            for name, width in variants:
+                if width >= viewport:
+                    return name
+            return variants[-1][0]
+    return None
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает байты картинок первой страницы index: '
+            'миниатюра 960x339 против вариантов из srcset')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--viewport', type=int, action='append',
+            help='Ширина экрана клиента, можно указать несколько раз',
+        )
+        parser.add_argument('--json', help='Файл для отчета в JSON')
+
+    def handle(self, *args, **options):
+        viewports = options['viewport'] or [360, 960]
+        posts = Post.objects.exclude(image='').order_by(
+            '-pub_date', '-pk'
+        )[:settings.NUMBER_POSTS_ON_FIRST_PAGE]
+        report = {'images': 0, 'original': 0, 'thumbnail': 0,
+                  'viewports': {viewport: 0 for viewport in viewports}}
+        for post in posts:
+            thumbnail = ready_thumbnail(post.image)
+            manifest = renditions.get_manifest(post.image.name)
+            report['images'] += 1
+            report['original'] += _size(post.image.name)
+            thumbnail_size = _size(thumbnail.name) if thumbnail else 0
+            report['thumbnail'] += thumbnail_size
+            for viewport in viewports:
+                picked = picked_rendition(manifest, viewport)
+                report['viewports'][viewport] += (
+                    _size(picked) if picked else thumbnail_size
+                )
+        self.stdout.write(
+            f'Картинок на странице: {report["images"]}, '
+            f'оригиналы: {report["original"]} Б, '
+            f'миниатюры: {report["thumbnail"]} Б'
+        )
+        for viewport, size in report['viewports'].items():
+            self.stdout.write(
+                f'Экран {viewport}px: {size} Б, экономия '
+                f'{report["thumbnail"] - size} Б на страницу'
+            )
+        if options['json']:
+            with open(options['json'], 'w') as output:
+                json.dump(report, output, indent=2)
@@ -0,0 +1,72 @@
+import random
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from faker import Faker
+
+from posts.models import Post
+from posts.search import SearchResults, reindex, stems
+
+User = get_user_model()
+
+
+def _timed(function, repeat):
+    """Лучшее время из repeat запусков в миллисекундах."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает поиск по индексу с icontains на сгенерированных '
+            'постах. Данные создаются в транзакции и откатываются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        fake = Faker('ru_RU')
+        fake.seed_instance(options['seed'])
+        rng = random.Random(options['seed'])
+        vocabulary = list({fake.word() for _ in range(5000)})
+        queries = rng.sample(vocabulary, 5)
+        per_page = settings.NUMBER_POSTS_ON_FIRST_PAGE
+        with transaction.atomic():
+            author = User.objects.create(username='bench_search')
+            Post.objects.bulk_create(
+                (Post(text=' '.join(rng.choices(vocabulary, k=30)),
+                      author=author)
+                 for _ in range(options['posts']))
+            )
+            started = time.perf_counter()
+            reindex()
+            self.stdout.write(
+                f'Постов: {options["posts"]}, индекс построен за '
+                f'{time.perf_counter() - started:.1f} с'
+            )
+            for query in queries:
+                def like():
+                    posts = Post.objects.filter(text__icontains=query)
+                    return posts.count(), list(posts[:per_page])
+
+                def indexed():
+                    results = SearchResults(query)
+                    return results.count(), results[:per_page]
+
+                like_ms = _timed(like, options['repeat'])
+                index_ms = _timed(indexed, options['repeat'])
+                self.stdout.write(
+                    f'{query} ({" ".join(stems(query))}): '
+                    f'icontains {like()[0]} за {like_ms:.1f} мс, '
+                    f'индекс {indexed()[0]} за {index_ms:.1f} мс'
+                )
+            transaction.set_rollback(True)
@@ -0,0 +1,82 @@
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from .benchmark import Command as BenchmarkCommand
+from .profile_templates import SKIPPED
+
+
+def _count(queries, table):
+    return sum(f'"{table}"' in query['sql'] for query in queries)
+
+
+class Command(BenchmarkCommand):
+    help = ('Считает запросы к базе на страницу для вошедшего '
+            'пользователя с каждым хранилищем сессий из SESSION_ENGINES '
+            'и запросы при входе (заполните базу командой seed)')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=5,
+            help='Сколько раз запросить каждую страницу',
+        )
+        parser.add_argument(
+            '--engines', nargs='+', default=list(settings.SESSION_ENGINES),
+            choices=list(settings.SESSION_ENGINES),
+            help='Какие хранилища сравнить; первое - база для сравнения',
+        )
+        parser.add_argument('--output', help='Куда записать отчет в JSON')
+
+    def measure(self, user, urls, requests):
+        client = Client()
+        with CaptureQueriesContext(connection) as queries:
+            client.force_login(user)
+        login = len(queries)
+        for url, data in urls.values():
+            client.get(url, data)
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(requests):
+                for url, data in urls.values():
+                    client.get(url, data)
+        views = requests * len(urls)
+        return {
+            'queries_per_view': len(queries) / views,
+            'session_queries_per_view':
+                _count(queries, 'django_session') / views,
+            'login_queries': login,
+        }
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests должно быть больше нуля')
+        post, other = self.targets()
+        urls = {name: url for name, url in self.urls(post, other).items()
+                if name not in SKIPPED}
+        report = {}
+        for name in options['engines']:
+            with override_settings(
+                    SESSION_ENGINE=settings.SESSION_ENGINES[name]):
+                cache.clear()
+                report[name] = self.measure(post.author, urls,
+                                            options['requests'])
+        cache.clear()
+
+        baseline = report[options['engines'][0]]['queries_per_view']
+        self.stdout.write(f'{"сессии":<16} {"запросов":>9} '
+                          f'{"к сессиям":>10} {"вход":>5} '
+                          f'{"разница":>8}')
+        for name, row in report.items():
+            self.stdout.write(
+                f'{name:<16} {row["queries_per_view"]:>9.2f} '
+                f'{row["session_queries_per_view"]:>10.2f} '
+                f'{row["login_queries"]:>5} '
+                f'{row["queries_per_view"] - baseline:>+8.2f}'
+            )
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
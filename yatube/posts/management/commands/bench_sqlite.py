@@ -0,0 +1,177 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.test.utils import override_settings
+
+from core.benchmark import percentile
+from core.db import is_locked, retry_on_locked
+from posts.models import Comment, Post, User
+from yatube import settings_production
+
+PRODUCTION = settings_production.DATABASES[DEFAULT_DB_ALIAS]
+# Режим: настройки базы, PRAGMA и повтор записи при блокировке.
+MODES = {
+    # Как без профиля: журнал отката, ожидание по умолчанию, без повторов.
+    'baseline': (
+        {'ENGINE': 'django.db.backends.sqlite3', 'OPTIONS': {}},
+        {'journal_mode': 'DELETE'},
+        False,
+    ),
+    'tuned': (
+        {'ENGINE': PRODUCTION['ENGINE'], 'OPTIONS': PRODUCTION['OPTIONS']},
+        settings_production.SQLITE_PRAGMAS,
+        True,
+    ),
+}
+
+
+def _write(author, number):
+    # Как add_comment: сначала чтение, потом запись в той же транзакции.
+    post = Post.objects.filter(author=author).first()
+    if post is None or number % 2:
+        post = Post.objects.create(author=author,
+                                   text=f'bench_sqlite {number}')
+    Comment.objects.create(post=post, author=author, text='bench_sqlite')
+
+
+def _writer(author, writes, retry):
+    """Пишет writes раз; возвращает (времена успешных записей в мс,
+    ошибки блокировки, прочие ошибки).
+    """
+    write = retry_on_locked(_write) if retry else _write
+    timings, locked, failed = [], 0, 0
+    try:
+        for number in range(writes):
+            started = time.perf_counter()
+            try:
+                if retry:
+                    write(author, number)
+                else:
+                    with transaction.atomic():
+                        write(author, number)
+            except Exception as error:
+                if is_locked(error):
+                    locked += 1
+                else:
+                    failed += 1
+                continue
+            timings.append((time.perf_counter() - started) * 1000)
+    finally:
+        connection.close()
+    return timings, locked, failed
+
+
+def _read(stop):
+    try:
+        while not stop.is_set():
+            list(Post.objects.for_listing()[:10])
+    finally:
+        connection.close()
+
+
+def _drop_connection():
+    connections.close_all()
+    try:
+        del connections[DEFAULT_DB_ALIAS]
+    except AttributeError:
+        # В этом потоке соединение еще не создавалось.
+        pass
+
+
+@contextmanager
+def _profile(database, pragmas):
+    """Подменяет бэкенд и PRAGMA для соединений, открытых внутри блока.
+
+    Каждый поток открывает свое соединение по connections.databases,
+    поэтому режим меняется, пока ни одного соединения нет.
+    """
+    settings_dict = connections.databases[DEFAULT_DB_ALIAS]
+    saved = {key: settings_dict[key] for key in database}
+    _drop_connection()
+    settings_dict.update(database)
+    try:
+        with override_settings(SQLITE_PRAGMAS=pragmas):
+            yield
+    finally:
+        _drop_connection()
+        settings_dict.update(saved)
+
+
+class Command(BaseCommand):
+    help = ('Пишет посты и комментарии из нескольких потоков в текущую '
+            'базу SQLite без настроек и с профилем settings_production '
+            'и сравнивает долю ошибок "database is locked". Созданные '
+            'данные удаляются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument(
+            '--writes', type=int, default=50,
+            help='Сколько записей делает поток: комментарий, через раз и пост',
+        )
+        parser.add_argument(
+            '--readers', type=int, default=4,
+            help='Потоки, читающие главную страницу, пока идет запись',
+        )
+        parser.add_argument('--mode', choices=sorted(MODES), action='append',
+                            help='По умолчанию - оба режима')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда только для SQLite')
+        if connection.is_in_memory_db():
+            raise CommandError('Нужна база в файле, а не в памяти')
+        if options['threads'] < 1 or options['writes'] < 1:
+            raise CommandError('--threads и --writes должны быть больше нуля')
+        authors = [
+            User.objects.create(username=f'bench_sqlite_{number}')
+            for number in range(options['threads'])
+        ]
+        try:
+            for mode in options['mode'] or ('baseline', 'tuned'):
+                self.run(mode, authors, options['writes'],
+                         options['readers'])
+        finally:
+            User.objects.filter(
+                pk__in=[author.pk for author in authors]
+            ).delete()
+
+    def run(self, mode, authors, writes, readers):
+        database, pragmas, retry = MODES[mode]
+        results = []
+
+        def worker(author):
+            results.append(_writer(author, writes, retry))
+
+        with _profile(database, pragmas):
+            # journal_mode хранится в файле базы: первое соединение
+            # переключает его, пока других нет.
+            connection.ensure_connection()
+            stop = threading.Event()
+            reading = [threading.Thread(target=_read, args=[stop])
+                       for _ in range(readers)]
+            threads = [threading.Thread(target=worker, args=[author])
+                       for author in authors]
+            started = time.perf_counter()
+            for thread in reading + threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            stop.set()
+            for thread in reading:
+                thread.join()
+
+        timings = [value for result in results for value in result[0]]
+        locked = sum(result[1] for result in results)
+        failed = sum(result[2] for result in results)
+        total = len(authors) * writes
+        self.stdout.write(
+            f'{mode:<9} потоков {len(authors)}, записей {total}: '
+            f'locked {locked} ({locked / total:.1%}), других ошибок '
+            f'{failed}, {len(timings) / elapsed:.0f} записей/с, '
+            f'p95 {percentile(timings, 95) or 0:.1f} мс'
+        )
@@ -0,0 +1,172 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.benchmark import (current_rss_kb, environment, peak_rss_kb,
+                            percentile, summary)
+from posts.models import Comment, Follow, Post, User
+from posts.urls import urlpatterns
+
+
+def _change(old, new):
+    if not old:
+        return ''
+    return f'{(new - old) / old * 100:+.0f}%'
+
+
+class Command(BaseCommand):
+    help = ('Прогоняет все URL из posts.urls через тестовый клиент и '
+            'пишет p50/p95/p99 времени ответа, число запросов к базе '
+            'и память процесса в JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Сколько раз запросить каждый URL',
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=3,
+            help='Прогревочные запросы, не попадающие в отчет',
+        )
+        parser.add_argument(
+            '--anonymous', action='store_true',
+            help='Запрашивать страницы без входа на сайт',
+        )
+        parser.add_argument('--output', default='benchmark.json')
+        parser.add_argument(
+            '--compare', help='Отчет прошлого запуска для сравнения',
+        )
+
+    def targets(self):
+        """Пост, его автор (от его имени идут запросы) и автор,
+        на которого он еще не подписан.
+        """
+        post = Post.objects.filter(group__isnull=False).select_related(
+            'author', 'group'
+        ).order_by('-pub_date').first()
+        if post is None:
+            raise CommandError(
+                'Нет постов в группах: заполните базу командой seed'
+            )
+        other = User.objects.exclude(pk=post.author_id).exclude(
+            following__user=post.author
+        ).first()
+        if other is None:
+            raise CommandError('Нужен еще хотя бы один пользователь')
+        return post, other
+
+    def urls(self, post, other):
+        kwargs = {
+            'slug_name': post.group.slug,
+            'username': post.author.username,
+            'post_id': post.pk,
+            'feed_format': 'rss',
+        }
+        words = post.text.split()
+        queries = {'search': {'q': words[0] if words else ''}}
+        urls = {}
+        for pattern in urlpatterns:
+            if not pattern.name:
+                continue
+            values = {key: value for key, value in kwargs.items()
+                      if key in pattern.pattern.converters}
+            if pattern.name in ('profile_follow', 'profile_unfollow'):
+                values['username'] = other.username
+            urls[pattern.name] = (
+                reverse(f'posts:{pattern.name}', kwargs=values),
+                queries.get(pattern.name, {}),
+            )
+        return urls
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests должно быть больше нуля')
+        post, other = self.targets()
+        urls = self.urls(post, other)
+        client = Client()
+        if not options['anonymous']:
+            client.force_login(post.author)
+
+        rss_start = current_rss_kb()
+        timings = {name: [] for name in urls}
+        queries = {name: [] for name in urls}
+        statuses = {name: set() for name in urls}
+        # Все URL запрашиваются по кругу, поэтому подписка
+        # и отписка чередуются и не меняют данные.
+        for round_number in range(options['warmup'] + options['requests']):
+            for name, (url, data) in urls.items():
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = client.get(url, data)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                    elapsed = (time.perf_counter() - started) * 1000
+                if round_number < options['warmup']:
+                    continue
+                timings[name].append(elapsed)
+                queries[name].append(len(captured))
+                statuses[name].add(response.status_code)
+
+        report = {
+            'environment': environment(),
+            'options': {
+                'requests': options['requests'],
+                'warmup': options['warmup'],
+                'anonymous': options['anonymous'],
+            },
+            'data': {
+                'users': User.objects.count(),
+                'posts': Post.objects.count(),
+                'comments': Comment.objects.count(),
+                'follows': Follow.objects.count(),
+            },
+            'rss_kb': {
+                'start': rss_start,
+                'end': current_rss_kb(),
+                'peak': peak_rss_kb(),
+            },
+            'urls': {
+                name: {
+                    'url': url,
+                    'status': sorted(statuses[name]),
+                    'latency_ms': summary(timings[name]),
+                    'queries': {
+                        'p50': percentile(queries[name], 50),
+                        'max': max(queries[name], default=None),
+                    },
+                }
+                for name, (url, _) in urls.items()
+            },
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+
+        previous = {}
+        if options['compare']:
+            with open(options['compare']) as old:
+                previous = json.load(old)['urls']
+        self.write_summary(report, previous)
+        self.stdout.write(f'Отчет: {options["output"]}')
+
+    def write_summary(self, report, previous):
+        for name, result in report['urls'].items():
+            latency = result['latency_ms']
+            line = (f'{name:<18} p50 {latency["p50"]:7.1f} мс  '
+                    f'p95 {latency["p95"]:7.1f} мс  '
+                    f'p99 {latency["p99"]:7.1f} мс  '
+                    f'запросов {result["queries"]["max"]}')
+            if name in previous:
+                old = previous[name]
+                change = _change(old['latency_ms']['p95'], latency['p95'])
+                line += (f'  (p95 {change}, '
+                         f'запросов было {old["queries"]["max"]})')
+            self.stdout.write(line)
+        self.stdout.write(
+            f'RSS: {report["rss_kb"]["end"]} КБ, '
+            f'пик {report["rss_kb"]["peak"]} КБ'
+        )
@@ -0,0 +1,59 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts.transfer import (FORMATS, KINDS, Progress, export_rows,
+                            guess_format, load_checkpoint, row_writer,
+                            save_checkpoint)
+
+
+class Command(BaseCommand):
+    help = ('Потоково выгружает группы, посты, комментарии или подписки '
+            'в JSON Lines или CSV')
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(KINDS))
+        parser.add_argument(
+            '--output', default='-',
+            help='Файл выгрузки; по умолчанию - стандартный вывод',
+        )
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл смещения: при повторном запуске выгрузка '
+                 'продолжится с места остановки',
+        )
+
+    def handle(self, *args, **options):
+        kind = KINDS[options['kind']]
+        fmt = guess_format(options['output'], options['format'])
+        state = load_checkpoint(options['checkpoint'])
+        resumed = bool(state)
+        progress = Progress(state.get('offset', 0))
+        if options['output'] == '-':
+            stream = sys.stdout
+        else:
+            stream = open(options['output'], 'a' if resumed else 'w',
+                          newline='', encoding='utf-8')
+        try:
+            write = row_writer(stream, fmt, kind.fields, header=not resumed)
+            last_pk = state.get('last_pk')
+            rows = export_rows(options['kind'], last_pk,
+                               options['chunk_size'])
+            for pk, row in rows:
+                write(row)
+                last_pk = pk
+                progress.add(1)
+                if progress.done % options['chunk_size'] == 0:
+                    stream.flush()
+                    save_checkpoint(options['checkpoint'],
+                                    offset=progress.done, last_pk=last_pk)
+                    self.stderr.write(str(progress))
+            stream.flush()
+            save_checkpoint(options['checkpoint'],
+                            offset=progress.done, last_pk=last_pk)
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+        self.stderr.write(f'Готово: {progress}')
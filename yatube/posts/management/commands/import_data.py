@@ -0,0 +1,78 @@
+import sys
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.cache import bump_generation
+from posts.transfer import (FORMATS, KINDS, ImportConflict, Progress,
+                            Touched, chunks, guess_format, import_chunk,
+                            load_checkpoint, lookups, read_rows,
+                            refresh_touched, save_checkpoint)
+
+
+class Command(BaseCommand):
+    help = ('Потоково загружает группы, посты, комментарии или подписки '
+            'из JSON Lines или CSV')
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(KINDS))
+        parser.add_argument(
+            'path', help='Файл выгрузки или - для стандартного ввода',
+        )
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Записей в одной транзакции',
+        )
+        parser.add_argument(
+            '--offset', type=int, default=0,
+            help='Пропустить столько первых записей',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл смещения: после каждой порции в него пишется '
+                 'число загруженных записей, с него продолжается импорт',
+        )
+        parser.add_argument(
+            '--no-refresh', action='store_true',
+            help='Не пересчитывать счетчики, ленты и поиск после загрузки',
+        )
+
+    def handle(self, *args, **options):
+        fmt = guess_format(options['path'], options['format'])
+        offset = load_checkpoint(options['checkpoint']).get(
+            'offset', options['offset']
+        )
+        progress = Progress(offset)
+        skipped = 0
+        cache = lookups()
+        touched = Touched()
+        if options['path'] == '-':
+            stream = sys.stdin
+        else:
+            stream = open(options['path'], newline='', encoding='utf-8')
+        try:
+            rows = islice(read_rows(stream, fmt), offset, None)
+            for chunk in chunks(rows, options['batch_size']):
+                try:
+                    done, chunk_skipped = import_chunk(
+                        options['kind'], chunk, cache, touched
+                    )
+                except ImportConflict as error:
+                    raise CommandError(
+                        f'{error}; загружено записей: {progress.done}'
+                    )
+                progress.add(done)
+                skipped += chunk_skipped
+                save_checkpoint(options['checkpoint'], offset=progress.done)
+                self.stderr.write(str(progress))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        self.stderr.write(f'Готово: {progress}, пропущено: {skipped}')
+        # bulk_create не вызывает сигналы: производные данные
+        # загруженных записей обновляются один раз после всей загрузки.
+        if options['no_refresh']:
+            bump_generation()
+        else:
+            refresh_touched(touched, log=self.stderr.write)
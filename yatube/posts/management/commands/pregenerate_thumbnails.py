@@ -0,0 +1,67 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import renditions
+from core.thumbnails import generate, thumbnail_ready
+from posts.models import Post
+
+
+def _attempt(name):
+    try:
+        generate(name)
+        renditions.generate(name)
+        thumbnail_ready.send(sender=None, image=name)
+    except Exception as error:
+        return error
+    return None
+
+
+def _attempt_in_worker(name):
+    try:
+        return _attempt(name)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = ('Создает миниатюры и варианты картинок всех постов '
+            'в несколько потоков')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.THUMBNAIL_WORKERS,
+            help='Число потоков генерации; 1 - без пула, в текущем потоке',
+        )
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(image='').values_list(
+            'image', flat=True
+        ).iterator()
+        if options['workers'] > 1:
+            with ThreadPoolExecutor(options['workers']) as pool:
+                futures = {
+                    pool.submit(_attempt_in_worker, name): name
+                    for name in names
+                }
+                done, failed = self.report(
+                    (futures[future], future.result())
+                    for future in as_completed(futures)
+                )
+        else:
+            done, failed = self.report(
+                (name, _attempt(name)) for name in names
+            )
+        self.stdout.write(f'Миниатюр создано: {done}, ошибок: {failed}')
+
+    def report(self, outcomes):
+        done = failed = 0
+        for name, error in outcomes:
+            if error is None:
+                done += 1
+            else:
+                failed += 1
+                self.stderr.write(f'{name}: {error}')
+        return done, failed
@@ -0,0 +1,79 @@
+import json
+from contextlib import ExitStack
+
+from django.core.management.base import CommandError
+from django.test import Client
+from django.test.utils import override_settings
+
+from core.template_profile import TemplateProfiler
+from yatube import settings_production
+
+from .benchmark import Command as BenchmarkCommand
+
+# Страницы, которые меняют данные, а не показывают их.
+SKIPPED = ('profile_follow', 'profile_unfollow')
+
+
+class Command(BenchmarkCommand):
+    help = ('Рендерит все страницы из posts.urls на текущих данных '
+            '(заполните базу командой seed) и показывает время рендера '
+            'по шаблонам: base.html, include и остальные')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=5,
+            help='Сколько раз запросить каждую страницу',
+        )
+        parser.add_argument(
+            '--anonymous', action='store_true',
+            help='Запрашивать страницы без входа на сайт',
+        )
+        parser.add_argument(
+            '--cached', action='store_true',
+            help='Кэширующий загрузчик шаблонов, как в settings_production',
+        )
+        parser.add_argument('--limit', type=int, default=20,
+                            help='Сколько самых дорогих шаблонов показать')
+        parser.add_argument('--output', help='Куда записать отчет в JSON')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests должно быть больше нуля')
+        post, other = self.targets()
+        urls = {name: url for name, url in self.urls(post, other).items()
+                if name not in SKIPPED}
+        client = Client()
+        if not options['anonymous']:
+            client.force_login(post.author)
+
+        with ExitStack() as stack:
+            if options['cached']:
+                stack.enter_context(override_settings(
+                    TEMPLATES=settings_production.TEMPLATES
+                ))
+            profiler = stack.enter_context(TemplateProfiler())
+            for _ in range(options['requests']):
+                for url, data in urls.values():
+                    response = client.get(url, data)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+        rows = profiler.report()
+
+        self.stdout.write(f'{"шаблон":<48} {"рендеров":>9} '
+                          f'{"всего, мс":>10} {"свое, мс":>9} '
+                          f'{"среднее":>8}')
+        for row in rows[:options['limit']]:
+            self.stdout.write(
+                f'{row["name"]:<48} {row["renders"]:>9} '
+                f'{row["total_ms"]:>10.1f} {row["self_ms"]:>9.1f} '
+                f'{row["mean_ms"]:>8.2f}'
+            )
+        self.stdout.write(
+            f'Всего собственного времени шаблонов: '
+            f'{sum(row["self_ms"] for row in rows):.1f} мс на '
+            f'{options["requests"] * len(urls)} запросов'
+        )
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump({'pages': sorted(urls), 'templates': rows},
+                          output, ensure_ascii=False, indent=2)
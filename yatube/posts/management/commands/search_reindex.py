@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts.search import reindex
+
+
+class Command(BaseCommand):
+    help = 'Строит заново полнотекстовый индекс постов'
+
+    def handle(self, *args, **options):
+        reindex()
+        self.stdout.write('Индекс поиска перестроен')
@@ -1,11 +1,45 @@
-from django.db import models
+from django.db import models, router, transaction
 from django.contrib.auth import get_user_model
 from django.conf import settings
 
 User = get_user_model()
 
 
-class Post(models.Model):
+class CountedModel(models.Model):
+    """Модель, от которой зависят денормализованные счетчики.
+
+    Обработчики post_save из posts.signals сдвигают счетчики
+    в той же транзакции, что и сохранение: если обновить счетчик
+    не удалось, запись тоже не сохранится. Удаление и так идет
+    в транзакции вместе с post_delete.
+    """
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(
+            type(self), instance=self
+        )
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class PostQuerySet(models.QuerySet):
+
+    def for_listing(self):
+        """Посты с автором и группой одним запросом и только с теми
+        полями, которые выводят карточки постов.
+        """
+        return self.select_related('author', 'group').only(
+            'id', 'text', 'pub_date', 'updated', 'image', 'comments_count',
+            'author', 'group',
+            'author__username', 'author__first_name', 'author__last_name',
+            'group__slug', 'group__title',
+        )
+
+
+class Post(CountedModel):
     text = models.TextField(
         'Текст поста',
         help_text='Введите текст поста'
@@ -13,6 +47,9 @@ class Post(models.Model):
 
     pub_date = models.DateTimeField(auto_now_add=True)
 
+    # Версия закэшированной карточки поста (core.templatetags.post_cards)
+    updated = models.DateTimeField('Изменен', auto_now=True)
+
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -36,10 +73,28 @@ class Post(models.Model):
         blank=True
     )
 
+    comments_count = models.PositiveIntegerField(
+        'Комментариев',
+        default=0,
+        editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = (
+            models.Index(fields=('-pub_date', '-id'),
+                         name='post_pub_date_idx'),
+            models.Index(fields=('author', '-pub_date', '-id'),
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=('group', '-pub_date', '-id'),
+                         name='post_group_pub_date_idx'),
+            # Last-Modified главной и лент (posts.conditional).
+            models.Index(fields=('-updated',), name='post_updated_idx'),
+        )
 
     def __str__(self):
         return self.text[:settings.WORDS_OUTPUT_LIMIT]
@@ -54,7 +109,7 @@ class Group(models.Model):
         return self.title
 
 
-class Comment(models.Model):
+class Comment(CountedModel):
     post = models.ForeignKey(
         Post,
         blank=True,
@@ -81,9 +136,13 @@ class Comment(models.Model):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии',
         ordering = ('-created',)
+        indexes = (
+            models.Index(fields=('post', '-created', '-id'),
+                         name='comment_post_created_idx'),
+        )
 
 
-class Follow(models.Model):
+class Follow(CountedModel):
 
     user = models.ForeignKey(
         User,
@@ -102,3 +161,93 @@ class Follow(models.Model):
     class Meta:
         verbose_name = 'Подписка',
         verbose_name_plural = 'Подписки'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'), name='unique_follow'),
+        )
+
+
+class TimelineEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель'
+    )
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ('-pub_date',)
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        indexes = (
+            # Покрывает и фильтр, и сортировку ленты (posts_for).
+            models.Index(fields=('user', '-pub_date', '-post'),
+                         name='timeline_user_feed_idx'),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'post'), name='unique_timeline_entry'),
+        )
+
+
+class UserCounters(models.Model):
+    """Денормализованные счетчики пользователя.
+
+    Поддерживаются сигналами из posts.signals, расхождения
+    исправляет команда recount.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='counters',
+        verbose_name='Пользователь'
+    )
+
+    posts = models.PositiveIntegerField('Постов', default=0)
+
+    followers = models.PositiveIntegerField('Подписчиков', default=0)
+
+    following = models.PositiveIntegerField('Подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Счетчики пользователя'
+        verbose_name_plural = 'Счетчики пользователей'
+
+
+class SearchTerm(models.Model):
+    """Запись инвертированного индекса: основа слова -> пост.
+
+    Используется поиском на базах без FTS5 (см. posts.search).
+    """
+
+    term = models.CharField('Основа', max_length=100)
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='search_terms',
+        verbose_name='Пост'
+    )
+
+    weight = models.PositiveIntegerField('Вхождений', default=1)
+
+    class Meta:
+        verbose_name = 'Термин поиска'
+        verbose_name_plural = 'Термины поиска'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('term', 'post'), name='unique_search_term'),
+        )
@@ -0,0 +1,191 @@
+"""Полнотекстовый поиск по постам.
+
+Текст поста приводится к основам слов (posts.stemmer) и хранится
+в инвертированном индексе. На SQLite это виртуальная таблица FTS5
+posts_post_fts с ранжированием bm25, на остальных базах - таблица
+SearchTerm (основа -> пост с весом).
+"""
+from collections import Counter
+
+from django.db import connection
+from django.db.models import Count, Sum
+
+from .models import Post, SearchTerm
+from .stemmer import stems
+
+FTS_TABLE = 'posts_post_fts'
+
+# Есть ли таблица FTS5 в базе: проверяется один раз на каждую базу.
+_fts_available = {}
+
+
+def uses_fts():
+    if connection.vendor != 'sqlite':
+        return False
+    name = connection.settings_dict['NAME']
+    if name not in _fts_available:
+        _fts_available[name] = (
+            FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_available[name]
+
+
+def _match_expression(query_stems):
+    # Каждая основа ищется как префикс: «программ» найдет и «программист».
+    return ' '.join(f'"{value}"*' for value in query_stems)
+
+
+def index_post(post):
+    post_stems = stems(post.text)
+    if uses_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT OR REPLACE INTO {FTS_TABLE} (rowid, stems) '
+                f'VALUES (%s, %s)',
+                [post.pk, ' '.join(post_stems)],
+            )
+        return
+    SearchTerm.objects.filter(post_id=post.pk).delete()
+    SearchTerm.objects.bulk_create(
+        SearchTerm(term=term, post_id=post.pk, weight=weight)
+        for term, weight in Counter(post_stems).items()
+    )
+
+
+def unindex_post(post_id):
+    if uses_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+
+
+def index_posts(post_ids):
+    """Индексирует посты с post_ids одним запросом на вставку."""
+    rows = list(Post.objects.filter(pk__in=post_ids).values_list(
+        'pk', 'text'))
+    if uses_fts():
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT OR REPLACE INTO {FTS_TABLE} (rowid, stems) '
+                f'VALUES (%s, %s)',
+                [(pk, ' '.join(stems(text))) for pk, text in rows],
+            )
+        return
+    SearchTerm.objects.filter(post_id__in=post_ids).delete()
+    SearchTerm.objects.bulk_create(
+        SearchTerm(term=term, post_id=pk, weight=weight)
+        for pk, text in rows
+        for term, weight in Counter(stems(text)).items()
+    )
+
+
+def reindex(batch_size=1000):
+    """Строит индекс заново, например после bulk_create."""
+    if uses_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            batch = []
+            posts = Post.objects.values_list('pk', 'text')
+            for pk, text in posts.iterator(chunk_size=batch_size):
+                batch.append((pk, ' '.join(stems(text))))
+                if len(batch) >= batch_size:
+                    cursor.executemany(
+                        f'INSERT INTO {FTS_TABLE} (rowid, stems) '
+                        f'VALUES (%s, %s)', batch)
+                    batch = []
+            if batch:
+                cursor.executemany(
+                    f'INSERT INTO {FTS_TABLE} (rowid, stems) '
+                    f'VALUES (%s, %s)', batch)
+        return
+    SearchTerm.objects.all().delete()
+    terms = []
+    for pk, text in Post.objects.values_list('pk', 'text').iterator(
+            chunk_size=batch_size):
+        terms.extend(
+            SearchTerm(term=term, post_id=pk, weight=weight)
+            for term, weight in Counter(stems(text)).items()
+        )
+        if len(terms) >= batch_size:
+            SearchTerm.objects.bulk_create(terms)
+            terms = []
+    SearchTerm.objects.bulk_create(terms)
+
+
+def _ranked_terms(query_stems):
+    unique = set(query_stems)
+    return SearchTerm.objects.filter(term__in=unique).values(
+        'post_id'
+    ).annotate(
+        matched=Count('term', distinct=True), score=Sum('weight')
+    ).filter(matched=len(unique))
+
+
+def filter_posts(queryset, query):
+    """Сужает queryset до постов, найденных по индексу (для админки)."""
+    query_stems = stems(query)
+    if not query_stems:
+        return queryset.none()
+    if uses_fts():
+        return queryset.extra(
+            where=[f'"posts_post"."id" IN (SELECT rowid FROM {FTS_TABLE} '
+                   f'WHERE {FTS_TABLE} MATCH %s)'],
+            params=[_match_expression(query_stems)],
+        )
+    return queryset.filter(
+        pk__in=_ranked_terms(query_stems).values('post_id')
+    )
+
+
+class SearchResults:
+    """Ранжированная выдача, которую можно отдать в Paginator.
+
+    Считает совпадения и достает по срезу только id нужной страницы,
+    сами посты загружаются одним запросом.
+    """
+
+    def __init__(self, query):
+        self.stems = stems(query)
+
+    def count(self):
+        if not self.stems:
+            return 0
+        if uses_fts():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT count(*) FROM {FTS_TABLE} '
+                    f'WHERE {FTS_TABLE} MATCH %s',
+                    [_match_expression(self.stems)],
+                )
+                return cursor.fetchone()[0]
+        return _ranked_terms(self.stems).count()
+
+    def __len__(self):
+        return self.count()
+
+    def _ranked_ids(self, offset, limit):
+        if uses_fts():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT rowid FROM {FTS_TABLE} '
+                    f'WHERE {FTS_TABLE} MATCH %s '
+                    f'ORDER BY bm25({FTS_TABLE}), rowid DESC '
+                    f'LIMIT %s OFFSET %s',
+                    [_match_expression(self.stems), limit, offset],
+                )
+                return [row[0] for row in cursor.fetchall()]
+        ranked = _ranked_terms(self.stems).order_by('-score', '-post_id')
+        return list(ranked.values_list('post_id', flat=True)[
+            offset:offset + limit
+        ])
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        if not self.stems:
+            return []
+        offset = index.start or 0
+        ids = self._ranked_ids(offset, index.stop - offset)
+        posts = Post.objects.for_listing().in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
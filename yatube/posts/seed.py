@@ -0,0 +1,158 @@
+"""Генератор синтетических данных в масштабе продакшена.
+
+Активность пользователей распределена по Парето: немногие авторы
+пишут большую часть постов и собирают большую часть подписчиков,
+как в настоящих соцсетях. Все строки создаются через bulk_create,
+поэтому сигналы не срабатывают и производные данные (счетчики, ленты,
+поисковый индекс, кэш) пересобираются в конце.
+"""
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from faker import Faker
+
+from core import page_cache
+from core.cache import bump_generation
+
+from . import counters, search, timeline
+from .models import Comment, Follow, Group, Post, User
+from .transfer import bulk_create_as_is
+
+# Показатель распределения Парето: 1.16 дает правило «80/20».
+PARETO_ALPHA = 1.16
+SEED_PASSWORD = 'yatube-seed'
+
+
+def _weights(rng, size):
+    return [rng.paretovariate(PARETO_ALPHA) for _ in range(size)]
+
+
+def _dates(rng, size, days):
+    """Случайные моменты за последние days дней."""
+    now = timezone.now()
+    return [now - timedelta(seconds=rng.randrange(days * 24 * 60 * 60))
+            for _ in range(size)]
+
+
+def _seed_comments(rng, fake, posts, user_ids, comments, batch_size):
+    if not posts:
+        return
+    # Обсуждают тоже немногие посты; комментарий всегда позже поста.
+    commented = rng.choices(posts, _weights(rng, len(posts)), k=comments)
+    now = timezone.now()
+    bulk_create_as_is(
+        Comment,
+        (Comment(post_id=post.pk, author_id=rng.choice(user_ids),
+                 text=fake.sentence(),
+                 created=post.pub_date + (now - post.pub_date) * rng.random())
+         for post in commented),
+        batch_size=batch_size,
+    )
+
+
+@transaction.atomic
+def seed(users=100, groups=10, posts=1000, comments=3000,
+         follows=20, days=365, seed=None, batch_size=500, log=None):
+    """Создает пользователей, группы, посты, комментарии и подписки.
+
+    follows - среднее число подписок на пользователя. Возвращает
+    словарь с количеством созданных строк.
+    """
+    rng = random.Random(seed)
+    fake = Faker('ru_RU')
+    fake.seed_instance(seed)
+    log = log or (lambda message: None)
+
+    password = make_password(SEED_PASSWORD)
+    first_user = User.objects.order_by('-pk').values_list(
+        'pk', flat=True).first() or 0
+    User.objects.bulk_create(
+        (User(username=f'{fake.user_name()}_{first_user + index}',
+              first_name=fake.first_name(), last_name=fake.last_name(),
+              password=password)
+         for index in range(users)),
+        batch_size=batch_size,
+    )
+    user_ids = list(User.objects.filter(pk__gt=first_user).values_list(
+        'pk', flat=True))
+    log(f'Пользователей: {len(user_ids)}')
+
+    first_group = Group.objects.order_by('-pk').values_list(
+        'pk', flat=True).first() or 0
+    Group.objects.bulk_create(
+        (Group(title=fake.catch_phrase()[:200],
+               slug=f'{fake.slug()}-{first_group + index}',
+               description=fake.paragraph())
+         for index in range(groups)),
+        batch_size=batch_size,
+    )
+    group_ids = list(Group.objects.filter(pk__gt=first_group).values_list(
+        'pk', flat=True))
+    log(f'Групп: {len(group_ids)}')
+
+    # Один и тот же вес отвечает и за активность автора,
+    # и за его популярность у подписчиков.
+    weights = _weights(rng, len(user_ids))
+    first_post = Post.objects.order_by('-pk').values_list(
+        'pk', flat=True).first() or 0
+    authors = rng.choices(user_ids, weights, k=posts)
+    bulk_create_as_is(
+        Post,
+        (Post(text=fake.text(max_nb_chars=rng.choice((100, 300, 1000))),
+              author_id=author_id, pub_date=pub_date, updated=pub_date,
+              group_id=(rng.choice(group_ids)
+                        if group_ids and rng.random() < 0.7 else None))
+         for author_id, pub_date in zip(
+             authors, sorted(_dates(rng, posts, days)))),
+        batch_size=batch_size,
+    )
+    post_objects = list(Post.objects.filter(pk__gt=first_post).only(
+        'pk', 'pub_date').order_by('pk'))
+    _seed_comments(rng, fake, post_objects, user_ids, comments, batch_size)
+    log(f'Постов: {len(post_objects)}')
+
+    log(f'Комментариев: {comments if post_objects else 0}')
+
+    follow_objects = []
+    for user_id in user_ids:
+        # Среднее распределения Парето равно alpha / (alpha - 1).
+        count = min(
+            int(rng.paretovariate(PARETO_ALPHA) * follows
+                * (PARETO_ALPHA - 1) / PARETO_ALPHA),
+            len(user_ids) - 1,
+        )
+        targets = set(rng.choices(user_ids, weights, k=count))
+        targets.discard(user_id)
+        follow_objects.extend(
+            Follow(user_id=user_id, author_id=author_id)
+            for author_id in targets
+        )
+    Follow.objects.bulk_create(follow_objects, batch_size=batch_size,
+                               ignore_conflicts=True)
+    log(f'Подписок: {len(follow_objects)}')
+
+    refresh_derived(User.objects.filter(pk__gt=first_user), log)
+    return {'users': len(user_ids), 'groups': len(group_ids),
+            'posts': len(post_objects),
+            'comments': comments if post_objects else 0,
+            'follows': len(follow_objects)}
+
+
+def refresh_derived(users=None, log=None):
+    """Пересобирает то, что обычно поддерживают сигналы.
+
+    Ленты пересобираются только для users (по умолчанию - для всех).
+    """
+    log = log or (lambda message: None)
+    log(f'Исправлено счетчиков: {counters.recount()}')
+    timeline.rebuild_all(users)
+    log('Ленты пересобраны')
+    search.reindex()
+    log('Индекс поиска перестроен')
+    bump_generation()
+    # Страницы для гостей кэшируются целиком: новые посты, счетчики
+    # и ленты должны появиться на всех сразу.
+    page_cache.purge(page_cache.SITE_TAG)
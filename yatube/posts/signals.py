@@ -0,0 +1,189 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core import page_cache, renditions
+from core.cache import bump_generation
+from core.thumbnails import thumbnail_ready
+
+from . import counters, search, timeline
+from .conditional import record_removal
+from .models import Comment, Follow, Group, Post, User
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, **kwargs):
+    if created:
+        counters.change(instance.author_id, 'posts', 1)
+        timeline.fan_out(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.change(instance.author_id, 'posts', -1)
+    record_removal('posts')
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, **kwargs):
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_removed_from_index(sender, instance, **kwargs):
+    search.unindex_post(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created and instance.post_id:
+        counters.change_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    if instance.post_id:
+        counters.change_comments(instance.post_id, -1)
+        record_removal(f'comments:{instance.post_id}')
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comments(sender, instance, **kwargs):
+    # Первая страница комментариев поста кэшируется отдельно
+    # (posts.views.comments_version).
+    bump_generation(f'comments:{instance.post_id}')
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        counters.change(instance.author_id, 'followers', 1)
+        counters.change(instance.user_id, 'following', 1)
+        timeline.add_author(instance.user, instance.author)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.change(instance.author_id, 'followers', -1)
+    counters.change(instance.user_id, 'following', -1)
+    timeline.remove_author(instance.user, instance.author)
+    timeline.author_unfollowed(instance.author_id)
+
+
+@receiver(thumbnail_ready)
+def thumbnail_created(sender, image, **kwargs):
+    # Карточки постов кэшируются по Post.updated: новая версия
+    # покажет картинку вместо заглушки.
+    posts = Post.objects.filter(image=image)
+    posts.update(updated=timezone.now())
+    for post in posts.values('pk', 'author__username', 'group__slug'):
+        page_cache.purge('index', f'post:{post["pk"]}',
+                         f'author:{post["author__username"]}',
+                         f'group:{post["group__slug"]}')
+
+
+@receiver(post_init, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    # Группа до правки: пост пропадает и со страницы старой группы.
+    # Через __dict__, чтобы не загружать отложенное поле.
+    instance._initial_group_id = instance.__dict__.get('group_id')
+
+
+def _image_name(post):
+    # Через __dict__: у поста из only() картинка не загружена,
+    # а удаленный пост уже не догрузить.
+    image = post.__dict__.get('image')
+    return getattr(image, 'name', image)
+
+
+@receiver(post_init, sender=Post)
+def remember_image(sender, instance, **kwargs):
+    instance._initial_image = _image_name(instance)
+
+
+def _drop_renditions(name):
+    # Одна картинка бывает у нескольких постов (import_data).
+    if name and not Post.objects.filter(image=name).exists():
+        transaction.on_commit(lambda: renditions.delete(name))
+
+
+@receiver(post_save, sender=Post)
+def image_replaced(sender, instance, created, **kwargs):
+    image = _image_name(instance)
+    if not created and image is not None and image != instance._initial_image:
+        _drop_renditions(instance._initial_image)
+    instance._initial_image = image
+
+
+@receiver(post_delete, sender=Post)
+def image_removed(sender, instance, **kwargs):
+    _drop_renditions(_image_name(instance))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def purge_post_pages(sender, instance, **kwargs):
+    tags = ['index', f'post:{instance.pk}',
+            f'author:{instance.author.username}']
+    if instance.group_id:
+        tags.append(f'group:{instance.group.slug}')
+    old_group_id = instance._initial_group_id
+    if old_group_id and old_group_id != instance.group_id:
+        # Пост ушел из старой группы: Last-Modified ее ленты
+        # не может опираться только на оставшиеся посты.
+        record_removal('posts')
+        tags.extend(f'group:{slug}' for slug in Group.objects.filter(
+            pk=old_group_id).values_list('slug', flat=True))
+    page_cache.purge(*tags)
+    instance._initial_group_id = instance.group_id
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def purge_comment_pages(sender, instance, **kwargs):
+    page_cache.purge(f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def purge_follow_pages(sender, instance, **kwargs):
+    # Профили выводят число подписчиков и подписок.
+    page_cache.purge(f'author:{instance.author.username}',
+                     f'author:{instance.user.username}')
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def purge_group_pages(sender, instance, **kwargs):
+    # Ссылки на группу есть в карточках постов на всех страницах.
+    page_cache.purge(page_cache.SITE_TAG)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=User)
+def invalidate_fragments(sender, **kwargs):
+    bump_generation()
+    if sender is User:
+        bump_generation('users')
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, created=False, update_fields=None, **kwargs):
+    # Вход пользователя обновляет только last_login, на страницах
+    # это поле не выводится.
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    bump_generation()
+    bump_generation('users')
+    if not created:
+        page_cache.purge(page_cache.SITE_TAG)
+
+
+@receiver(post_delete, sender=User)
+def purge_user_pages(sender, **kwargs):
+    page_cache.purge(page_cache.SITE_TAG)
@@ -0,0 +1,103 @@
+"""Стеммер русского языка по алгоритму Snowball (Портера).
+
+https://snowballstem.org/algorithms/russian/stemmer.html
+"""
+import re
+from functools import lru_cache
+
+VOWELS = 'аеиоуыэюя'
+WORD = re.compile(r'\w+')
+
+
+def _endings(words):
+    return '|'.join(sorted(words.split(), key=len, reverse=True))
+
+
+def _after_a(group1, group2):
+    # Окончания первой группы отрезаются только после «а» или «я».
+    return re.compile(
+        rf'((?<=[ая])({_endings(group1)})|({_endings(group2)}))$'
+    )
+
+
+PERFECTIVE_GERUND = _after_a(
+    'в вши вшись',
+    'ив ивши ившись ыв ывши ывшись',
+)
+ADJECTIVE = _endings(
+    'ее ие ые ое ими ыми ей ий ый ой ем им ым ом его ого ему ому '
+    'их ых ую юю ая яя ою ею'
+)
+PARTICIPLE = (rf'(?<=[ая])({_endings("ем нн вш ющ щ")})'
+              rf'|{_endings("ивш ывш ующ")}')
+ADJECTIVAL = re.compile(rf'({PARTICIPLE})?({ADJECTIVE})$')
+REFLEXIVE = re.compile(r'(ся|сь)$')
+VERB = _after_a(
+    'ла на ете йте ли й л ем н ло но ет ют ны ть ешь нно',
+    'ила ыла ена ейте уйте ите или ыли ей уй ил ыл им ым ен ило ыло ено '
+    'ят ует уют ит ыт ены ить ыть ишь ую ю',
+)
+NOUN = re.compile('({})$'.format(_endings(
+    'а ев ов ие ье е иями ями ами еи ии и ией ей ой ий й иям ям ием ем '
+    'ам ом о у ах иях ях ы ь ию ью ю ия ья я'
+)))
+SUPERLATIVE = re.compile(r'(ейше|ейш)$')
+DERIVATIONAL = re.compile(r'(ость|ост)$')
+
+
+def _region_after_syllable(word, start):
+    """Начало области после первой пары «гласная, согласная»,
+    которая целиком лежит не раньше start.
+    """
+    for index in range(start + 1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            return index + 1
+    return len(word)
+
+
+def _strip(word, pattern, start):
+    match = pattern.search(word, start)
+    if match and match.start() >= start:
+        return word[:match.start()], True
+    return word, False
+
+
+@lru_cache(maxsize=100000)
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    first_vowel = next(
+        (index for index, char in enumerate(word) if char in VOWELS), None
+    )
+    if first_vowel is None:
+        return word
+    rv = first_vowel + 1
+    r1 = _region_after_syllable(word, 0)
+    r2 = _region_after_syllable(word, r1)
+
+    word, found = _strip(word, PERFECTIVE_GERUND, rv)
+    if not found:
+        word, _ = _strip(word, REFLEXIVE, rv)
+        for pattern in (ADJECTIVAL, VERB, NOUN):
+            word, found = _strip(word, pattern, rv)
+            if found:
+                break
+
+    if word.endswith('и') and len(word) > rv:
+        word = word[:-1]
+
+    word, _ = _strip(word, DERIVATIONAL, r2)
+
+    if word.endswith('нн'):
+        word = word[:-1]
+    else:
+        word, found = _strip(word, SUPERLATIVE, rv)
+        if found and word.endswith('нн'):
+            word = word[:-1]
+        elif not found and word.endswith('ь'):
+            word = word[:-1]
+    return word
+
+
+def stems(text):
+    """Основы всех слов текста по порядку."""
+    return [stem(word) for word in WORD.findall(text.lower())]
@@ -0,0 +1,33 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import LiveServerTestCase
+from django.urls import reverse
+
+from ..models import Group, Post, User
+
+
+class BenchHttpTests(LiveServerTestCase):
+    def test_report(self):
+        """Нагрузочный прогон пишет задержки и сравнение с прошлым"""
+        author = User.objects.create(username='author')
+        group = Group.objects.create(title='Группа', slug='group',
+                                     description='Описание')
+        Post.objects.create(text='Пост', author=author, group=group)
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'bench.json')
+            out = StringIO()
+            for compare in (None, output):
+                call_command('bench_http', base_url=self.live_server_url,
+                             concurrency=2, requests=2, output=output,
+                             compare=compare, stdout=out)
+            with open(output) as report:
+                report = json.load(report)
+        self.assertEqual(len(report['paths']), 4)
+        index = report['paths'][reverse('posts:index')]
+        self.assertEqual(index['errors'], 0)
+        self.assertIsNotNone(index['latency_ms']['p95'])
+        self.assertIn('было', out.getvalue())
@@ -0,0 +1,106 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.cache import get_generation
+
+from ..models import Comment, Post, User
+
+
+@override_settings(COMMENTS_PER_PAGE=3)
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='reader')
+        cls.post = Post.objects.create(text='Пост', author=cls.user)
+        cls.other_post = Post.objects.create(text='Другой', author=cls.user)
+        for number in range(7):
+            Comment.objects.create(text=f'Комментарий {number}',
+                                   post=cls.post, author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.url = reverse('posts:post_detail', args=[self.post.pk])
+        self.fragment_url = reverse('posts:post_comments',
+                                    args=[self.post.pk])
+
+    def comment_queries(self, url, **data):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, data)
+        selects = [query['sql'] for query in queries
+                   if query['sql'].startswith('SELECT "posts_comment"')]
+        return response, selects
+
+    def test_first_page(self):
+        """Пост показывает только первую страницу новых комментариев"""
+        response = self.client.get(self.url)
+        content = response.content.decode()
+        self.assertIn('Комментарий 6', content)
+        self.assertIn('Комментарий 4', content)
+        self.assertNotIn('Комментарий 3', content)
+        self.assertIn('Показать еще', content)
+
+    def test_json_pages(self):
+        """JSON-страницы по ссылке next отдают все комментарии по разу"""
+        texts = []
+        url = f'{self.fragment_url}?format=json'
+        while url:
+            data = self.client.get(url).json()
+            texts.extend(comment['text'] for comment in data['comments'])
+            url = data['next']
+        self.assertEqual(texts, [f'Комментарий {number}'
+                                 for number in range(6, -1, -1)])
+
+    def test_fragment_continues_post(self):
+        """HTML-фрагмент продолжает с места, где закончился пост"""
+        page = self.client.get(self.url).context['comments']
+        response = self.client.get(self.fragment_url,
+                                   {'cursor': page.next_cursor})
+        self.assertTemplateUsed(response, 'posts/includes/comments.html')
+        content = response.content.decode()
+        self.assertIn('Комментарий 3', content)
+        self.assertNotIn('Комментарий 4', content)
+        self.assertNotIn('<html', content)
+
+    def test_cursor_page_in_post(self):
+        """Без JavaScript следующая страница открывается в посте"""
+        page = self.client.get(self.url).context['comments']
+        response = self.client.get(self.url, {'cursor': page.next_cursor})
+        self.assertIn('Комментарий 1', response.content.decode())
+        self.assertNotIn('Комментарий 6', response.content.decode())
+
+    def test_first_page_cached_per_post(self):
+        """Первая страница берется из кэша, пока у поста нет новых
+        комментариев"""
+        _, selects = self.comment_queries(self.url)
+        self.assertEqual(len(selects), 1)
+        Comment.objects.create(text='Чужой', post=self.other_post,
+                               author=self.user)
+        response, selects = self.comment_queries(self.url)
+        self.assertEqual(selects, [])
+        self.assertIn('Комментарий 6', response.content.decode())
+
+        self.client.post(reverse('posts:add_comment', args=[self.post.pk]),
+                         {'text': 'Свежий'})
+        response, selects = self.comment_queries(self.url)
+        self.assertEqual(len(selects), 1)
+        self.assertIn('Свежий', response.content.decode())
+
+    def test_comment_keeps_fragment_generation(self):
+        """Комментарий не сбрасывает кэш фрагментов всего сайта"""
+        generation = get_generation()
+        self.client.post(reverse('posts:add_comment', args=[self.post.pk]),
+                         {'text': 'Свежий'})
+        Comment.objects.filter(text='Свежий').delete()
+        self.assertEqual(get_generation(), generation)
+
+    def test_missing_post(self):
+        """Комментарии несуществующего поста - 404"""
+        response = self.client.get(
+            reverse('posts:post_comments', args=[self.post.pk + 100]))
+        self.assertEqual(response.status_code, 404)
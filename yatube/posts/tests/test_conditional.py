@@ -0,0 +1,114 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+@override_settings(
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db'
+)
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='reader')
+        cls.author = User.objects.create(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        cls.post = Post.objects.create(text='Пост', author=cls.author,
+                                       group=cls.group)
+        Comment.objects.create(text='Комментарий', post=cls.post,
+                               author=cls.user)
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.urls = {
+            'index': reverse('posts:index'),
+            'group_list': reverse('posts:group_list',
+                                  args=[self.group.slug]),
+            'profile': reverse('posts:profile',
+                               args=[self.author.username]),
+            'follow_index': reverse('posts:follow_index'),
+            'post_detail': reverse('posts:post_detail',
+                                   args=[self.post.pk]),
+        }
+
+    def etag(self, url, client=None, **data):
+        response = (client or self.client).get(url, data)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_not_modified_without_render(self):
+        """Актуальный ETag дает 304 без выборки постов и шаблона"""
+        # Пользователь и агрегат (сессия cached_db уже в кэше); для
+        # профиля и ленты подписок еще запрос о подписках.
+        queries = {'profile': 3, 'follow_index': 3}
+        for name, url in self.urls.items():
+            with self.subTest(name=name):
+                etag = self.etag(url)
+                with mock.patch('posts.views.render') as render, \
+                        self.assertNumQueries(queries.get(name, 2)):
+                    response = self.client.get(url,
+                                               HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+                self.assertEqual(response.templates, [])
+                render.assert_not_called()
+
+    def test_no_last_modified(self):
+        """HTML-страницы не отдают Last-Modified: он не учитывает
+        пользователя и страницу пагинации"""
+        for name, url in self.urls.items():
+            with self.subTest(name=name):
+                response = self.client.get(url)
+                self.assertTrue(response.has_header('ETag'))
+                self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_etag_depends_on_viewer(self):
+        """ETag разный у гостя и у пользователя и у разных страниц"""
+        url = self.urls['index']
+        etag = self.etag(url)
+        self.assertNotEqual(etag, self.etag(url, Client()))
+        self.assertNotEqual(etag, self.etag(url, page=2))
+
+    def test_etag_changes_with_data(self):
+        """Новый пост, комментарий или подписка меняют ETag"""
+        etags = {name: self.etag(url) for name, url in self.urls.items()}
+        Post.objects.create(text='Новый пост', author=self.author,
+                            group=self.group)
+        for name, url in self.urls.items():
+            if name == 'post_detail':
+                continue
+            with self.subTest(name=name):
+                self.assertNotEqual(etags[name], self.etag(url))
+
+        url = self.urls['post_detail']
+        etag = self.etag(url)
+        Comment.objects.create(text='Еще', post=self.post, author=self.user)
+        self.assertNotEqual(etag, self.etag(url))
+
+        etags = {name: self.etag(self.urls[name])
+                 for name in ('profile', 'follow_index')}
+        Follow.objects.filter(user=self.user).delete()
+        for name, etag in etags.items():
+            with self.subTest(name=name):
+                self.assertNotEqual(etag, self.etag(self.urls[name]))
+
+    def test_stale_etag_renders(self):
+        """Устаревший ETag получает полную страницу"""
+        response = self.client.get(self.urls['index'],
+                                   HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'posts/index.html')
+
+    def test_follow_index_requires_login(self):
+        """Гостя лента подписок отправляет на вход и с If-None-Match"""
+        response = Client().get(self.urls['follow_index'],
+                                HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 302)
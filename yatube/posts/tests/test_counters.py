@@ -0,0 +1,101 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Post, User, UserCounters
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_post_counter(self):
+        """Счетчик постов автора следит за созданием и удалением"""
+        Post.objects.create(text='Еще пост', author=self.author)
+        self.assertEqual(self.author.counters.posts, 2)
+        Post.objects.filter(text='Еще пост').delete()
+        self.author.counters.refresh_from_db()
+        self.assertEqual(self.author.counters.posts, 1)
+
+    def test_comment_counter(self):
+        """Счетчик комментариев поста обновляется при комментировании"""
+        self.reader_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            data={'text': 'Комментарий'})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        Comment.objects.all().delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_follow_counters(self):
+        """Подписка меняет счетчики подписчиков и подписок"""
+        self.reader_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.author}))
+        self.assertEqual(
+            UserCounters.objects.get(user=self.author).followers, 1)
+        self.assertEqual(
+            UserCounters.objects.get(user=self.reader).following, 1)
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': self.author}))
+        self.assertEqual(
+            UserCounters.objects.get(user=self.author).followers, 0)
+
+    def test_profile_reads_counters(self):
+        """Профиль берет число постов из счетчиков"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('posts:profile', kwargs={'username': self.author}))
+        self.assertEqual(response.context['counters'].posts, 1)
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries))
+
+    def test_recount_repairs_drift(self):
+        """Команда recount исправляет разошедшиеся счетчики"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        UserCounters.objects.update(posts=42, followers=0)
+        Post.objects.update(comments_count=7)
+        call_command('recount', stdout=StringIO())
+        counters = UserCounters.objects.get(user=self.author)
+        self.assertEqual(counters.posts, 1)
+        self.assertEqual(counters.followers, 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_recount_does_not_multiply_relations(self):
+        """Посты, подписчики и подписки считаются независимо"""
+        Post.objects.create(text='Второй пост', author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.author, author=self.reader)
+        UserCounters.objects.all().delete()
+        call_command('recount', stdout=StringIO())
+        counters = UserCounters.objects.get(user=self.author)
+        self.assertEqual(
+            (counters.posts, counters.followers, counters.following),
+            (2, 1, 1))
+
+
+class CountersTransactionTests(TransactionTestCase):
+    def test_failed_counter_rolls_back_write(self):
+        """Если счетчик не обновился, запись тоже не сохраняется"""
+        author = User.objects.create(username='author')
+        post = Post.objects.create(text='Пост', author=author)
+        with mock.patch('posts.counters.change_comments',
+                        side_effect=DatabaseError), \
+                self.assertRaises(DatabaseError):
+            Comment.objects.create(post=post, author=author,
+                                   text='Комментарий')
+        self.assertFalse(Comment.objects.exists())
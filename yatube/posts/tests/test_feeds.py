@@ -0,0 +1,123 @@
+import json
+from datetime import timedelta
+from xml.etree import ElementTree
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import parse_http_date
+
+from ..conditional import REMOVED_KEY
+from ..models import Group, Post, User
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author',
+                                         first_name='Лев')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        cls.posts = [
+            Post.objects.create(text=f'Пост <{number}> & ко',
+                                author=cls.author, group=cls.group)
+            for number in range(3)
+        ]
+        Post.objects.create(text='Чужой пост', author=User.objects.create(
+            username='other'))
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def get(self, name, feed_format, *args, **headers):
+        return self.client.get(
+            reverse(f'posts:{name}', args=[*args, feed_format]), **headers
+        )
+
+    def content(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_rss(self):
+        """RSS содержит посты группы от новых к старым"""
+        response = self.get('group_feed', 'rss', self.group.slug)
+        self.assertEqual(response['Content-Type'],
+                         'application/rss+xml; charset=utf-8')
+        channel = ElementTree.fromstring(self.content(response)).find(
+            'channel')
+        descriptions = [item.findtext('description')
+                        for item in channel.iter('item')]
+        self.assertEqual(descriptions,
+                         [post.text for post in reversed(self.posts)])
+
+    def test_atom(self):
+        """Atom содержит все посты сайта"""
+        response = self.get('index_feed', 'atom')
+        feed = ElementTree.fromstring(self.content(response))
+        self.assertEqual(len(feed.findall(f'{ATOM}entry')), 4)
+        self.assertEqual(feed.find(f'{ATOM}entry/{ATOM}author/{ATOM}name')
+                         .text, 'other')
+
+    def test_json_feed(self):
+        """JSON Feed профиля содержит только посты автора"""
+        response = self.get('profile_feed', 'json', self.author.username)
+        feed = json.loads(self.content(response))
+        self.assertEqual(feed['version'], 'https://jsonfeed.org/version/1.1')
+        self.assertEqual(len(feed['items']), 3)
+        self.assertEqual(feed['items'][0]['authors'], [{'name': 'Лев'}])
+
+    def test_not_modified(self):
+        """Повторный запрос с ETag или датой получает 304 без ленты"""
+        response = self.get('index_feed', 'rss')
+        self.content(response)
+        for headers in (
+            {'HTTP_IF_NONE_MATCH': response['ETag']},
+            {'HTTP_IF_MODIFIED_SINCE': response['Last-Modified']},
+        ):
+            with self.subTest(headers=headers):
+                # Только агрегат по постам, без выборки ленты.
+                with self.assertNumQueries(1):
+                    cached = self.get('index_feed', 'rss', **headers)
+                self.assertEqual(cached.status_code, 304)
+
+    def test_etag_changes_with_posts(self):
+        """Новый или измененный пост меняет ETag"""
+        etag = self.get('profile_feed', 'rss', 'author')['ETag']
+        post = Post.objects.get(pk=self.posts[0].pk)
+        post.text = 'Исправленный текст'
+        post.save()
+        edited = self.get('profile_feed', 'rss', 'author')['ETag']
+        self.assertNotEqual(edited, etag)
+        Post.objects.create(text='Новый', author=self.author)
+        self.assertNotEqual(
+            self.get('profile_feed', 'rss', 'author')['ETag'], edited)
+
+    def test_last_modified_follows_edits_and_deletes(self):
+        """Last-Modified сдвигается правкой старого поста и удалением"""
+        past = timezone.now() - timedelta(days=1)
+        Post.objects.update(updated=past)
+        cache.set(REMOVED_KEY.format('posts'), past, None)
+
+        def last_modified():
+            response = self.get('group_feed', 'rss', 'group')
+            return parse_http_date(response['Last-Modified'])
+
+        self.assertEqual(last_modified(), int(past.timestamp()))
+        post = Post.objects.get(pk=self.posts[0].pk)
+        post.text = 'Исправленный текст'
+        post.save()
+        edited = last_modified()
+        self.assertGreater(edited, int(past.timestamp()))
+        Post.objects.update(updated=past)
+        Post.objects.get(pk=self.posts[-1].pk).delete()
+        self.assertGreaterEqual(last_modified(), edited)
+
+    def test_missing_group(self):
+        """Лента несуществующей группы - 404"""
+        self.assertEqual(
+            self.get('group_feed', 'rss', 'missing').status_code, 404)
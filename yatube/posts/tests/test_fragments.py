@@ -0,0 +1,138 @@
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.cache import cache_stats, reset_cache_stats
+
+from ..models import Follow, Group, Post, User
+
+
+class ChromeFragmentTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='reader')
+        cls.other = User.objects.create(username='writer')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {number}', author=cls.user)
+            for number in range(settings.NUMBER_OF_POSTS)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_header_varies_on_user(self):
+        """Шапка из кэша своя у гостя и у каждого пользователя"""
+        url = reverse('about:author')
+        self.assertIn('Войти', self.client.get(url).content.decode())
+        self.client.force_login(self.user)
+        content = self.client.get(url).content.decode()
+        self.assertIn('Пользователь: reader', content)
+        self.assertNotIn('Войти', content)
+        self.client.force_login(self.other)
+        self.assertIn('Пользователь: writer',
+                      self.client.get(url).content.decode())
+
+    def test_header_varies_on_view_name(self):
+        """Активный пункт меню соответствует странице"""
+        author = self.client.get(reverse('about:author')).content.decode()
+        tech = self.client.get(reverse('about:tech')).content.decode()
+        self.assertIn(f'active"\n            href="{reverse("about:author")}',
+                      author)
+        self.assertIn(f'active"\n             href="{reverse("about:tech")}',
+                      tech)
+
+    def test_search_query_not_cached(self):
+        """Строка поиска показывает текущий запрос"""
+        for query in ('первый', 'второй'):
+            with self.subTest(query=query):
+                response = self.client.get(reverse('posts:search'),
+                                           {'q': query})
+                self.assertIn(f'value="{query}"', response.content.decode())
+
+    def test_paginator_varies_on_page(self):
+        """Кэшированный паджинатор отмечает текущую страницу"""
+        url = reverse('posts:profile', args=[self.user.username])
+        for page in (1, 2):
+            with self.subTest(page=page):
+                content = self.client.get(url, {'page': page}).content
+                self.assertIn(
+                    f'<span class="page-link">{page}</span>',
+                    content.decode())
+
+
+class PostCardTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author',
+                                         first_name='Лев')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        cls.post = Post.objects.create(text='Карточка', author=cls.author,
+                                       group=cls.group)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        reset_cache_stats()
+        self.client = Client()
+        self.client.force_login(self.reader)
+        self.pages = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:follow_index'),
+        )
+
+    def test_card_shared_between_listings(self):
+        """Карточка рендерится один раз для всех четырех списков"""
+        with mock.patch('core.templatetags.post_cards.render_card',
+                        wraps=lambda post: f'<article>{post.text}'
+                                           f'</article>') as render:
+            for url in self.pages:
+                with self.subTest(url=url):
+                    response = self.client.get(url)
+                    self.assertContains(response,
+                                        '<article>Карточка</article>')
+        render.assert_called_once()
+
+    def test_page_is_one_get_many(self):
+        """Карточки страницы читаются из кэша одним get_many"""
+        url = reverse('posts:follow_index')
+        self.client.get(url)
+        with mock.patch.object(cache, 'get_many',
+                               wraps=cache.get_many) as get_many:
+            self.client.get(url)
+        get_many.assert_called_once()
+        self.assertEqual(len(get_many.call_args[0][0]), 1)
+
+    def test_card_follows_post_changes(self):
+        """Правка поста, автора или группы меняет карточку"""
+        url = reverse('posts:follow_index')
+        self.assertContains(self.client.get(url), 'Лев')
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Исправленная карточка'
+        post.save()
+        self.assertContains(self.client.get(url), 'Исправленная карточка')
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = 'Федор'
+        author.save()
+        self.assertContains(self.client.get(url), 'Федор')
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'renamed'
+        group.save()
+        self.assertContains(self.client.get(url), 'group/renamed/')
+
+    @override_settings(FRAGMENT_CACHE_ENABLED=False)
+    def test_cards_without_cache(self):
+        """Без кэша фрагментов карточки рендерятся на каждый запрос"""
+        url = reverse('posts:follow_index')
+        for _ in range(2):
+            self.assertContains(self.client.get(url), 'Карточка')
+        self.assertEqual(cache_stats().get('hits', 0), 0)
@@ -0,0 +1,112 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Group, Post, User
+
+
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        cls.other_group = Group.objects.create(title='Другая', slug='other',
+                                               description='Описание')
+        cls.post = Post.objects.create(text='Пост', author=cls.author,
+                                       group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.guest = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.urls = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group_list', args=[self.group.slug]),
+            'other': reverse('posts:group_list',
+                             args=[self.other_group.slug]),
+            'profile': reverse('posts:profile',
+                               args=[self.author.username]),
+            'post': reverse('posts:post_detail', args=[self.post.pk]),
+        }
+        for url in self.urls.values():
+            self.guest.get(url)
+
+    def assertCached(self, *names):
+        for name in names:
+            with self.subTest(name=name), self.assertNumQueries(0):
+                self.assertEqual(
+                    self.guest.get(self.urls[name]).status_code, 200)
+
+    def assertPurged(self, name, text):
+        with self.subTest(name=name):
+            self.assertContains(self.guest.get(self.urls[name]), text)
+
+    def test_pages_served_from_cache(self):
+        """Повторный запрос гостя не обращается к базе"""
+        self.assertCached(*self.urls)
+
+    def test_no_session_or_csrf_leak(self):
+        """Закэшированный ответ без cookie и CSRF-токена"""
+        response = self.guest.get(self.urls['post'])
+        self.assertEqual(response.cookies, {})
+        self.assertNotContains(response, 'csrfmiddlewaretoken')
+        self.assertIn('Cookie', response['Vary'])
+
+    def test_logged_in_user_bypasses_cache(self):
+        """Пользователь с сессией получает свою страницу"""
+        response = self.author_client.get(self.urls['post'])
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        self.assertContains(response, 'Пользователь: author')
+        self.assertNotContains(self.guest.get(self.urls['post']),
+                               'Пользователь: author')
+
+    def test_post_create_purges_its_pages(self):
+        """Новый пост сбрасывает главную, группу и профиль автора"""
+        self.author_client.post(reverse('posts:post_create'),
+                                {'text': 'Новый пост',
+                                 'group': self.group.pk})
+        for name in ('index', 'group', 'profile'):
+            self.assertPurged(name, 'Новый пост')
+        self.assertCached('other')
+
+    def test_post_edit_purges_old_and_new_group(self):
+        """Перенос поста сбрасывает обе группы"""
+        self.author_client.post(
+            reverse('posts:post_edit', args=[self.post.pk]),
+            {'text': 'Перенесенный пост', 'group': self.other_group.pk})
+        self.assertPurged('other', 'Перенесенный пост')
+        self.assertNotContains(self.guest.get(self.urls['group']),
+                               f'href="{self.urls["post"]}"')
+        self.assertPurged('post', 'Перенесенный пост')
+
+    def test_comment_purges_only_post(self):
+        """Комментарий сбрасывает только страницу поста"""
+        self.author_client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Свежий комментарий'})
+        self.assertPurged('post', 'Свежий комментарий')
+        self.assertCached('index', 'group', 'profile')
+
+    def test_admin_edit_purges(self):
+        """Правка группы, как из админки, сбрасывает все страницы"""
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Переименованная'
+        group.save()
+        self.assertPurged('group', 'Переименованная')
+
+    def test_if_none_match_on_hit(self):
+        """ETag из кэша отвечает 304 без обращения к базе"""
+        etag = self.guest.get(self.urls['index'])['ETag']
+        with self.assertNumQueries(0):
+            response = self.guest.get(self.urls['index'],
+                                      HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(PAGE_CACHE_ENABLED=False)
+    def test_disabled(self):
+        """PAGE_CACHE_ENABLED = False выключает кэш страниц"""
+        response = self.guest.get(self.urls['index'])
+        self.assertIsNotNone(response.context)
@@ -0,0 +1,64 @@
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class QueryPlanTests(TestCase):
+    """Списки постов должны читаться по индексу, а не полным сканом."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for number in range(3):
+            post = Post.objects.create(
+                text=f'Пост {number}', author=cls.author, group=cls.group)
+            Comment.objects.create(
+                post=post, author=cls.reader, text='Комментарий')
+        cls.post = post
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def plan_for(self, url, table):
+        """Планы запросов к table, выполненных при открытии url."""
+        with CaptureQueriesContext(connection) as queries:
+            self.reader_client.get(url)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries:
+                sql = query['sql']
+                if f'FROM "{table}"' not in sql or 'ORDER BY' not in sql:
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                plans.append(' '.join(row[-1] for row in cursor.fetchall()))
+        return plans
+
+    def test_listing_views_use_indexes(self):
+        """Каждый список постов и комментариев использует индекс"""
+        listings = {
+            reverse('posts:index'): 'posts_post',
+            reverse('posts:group_list',
+                    kwargs={'slug_name': self.group.slug}): 'posts_post',
+            reverse('posts:profile',
+                    kwargs={'username': self.author}): 'posts_post',
+            reverse('posts:follow_index'): 'posts_post',
+            reverse('posts:post_detail',
+                    kwargs={'post_id': self.post.id}): 'posts_comment',
+        }
+        for url, table in listings.items():
+            with self.subTest(url=url):
+                plans = self.plan_for(url, table)
+                self.assertTrue(plans)
+                for plan in plans:
+                    self.assertIn('INDEX', plan)
+                    self.assertNotRegex(
+                        plan, rf'SCAN (TABLE )?{table}(?! USING)')
@@ -0,0 +1,97 @@
+from unittest import mock
+
+from django.contrib.admin.sites import site
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post, SearchTerm, User
+from ..search import SearchResults, reindex
+from ..stemmer import stem
+
+
+class StemmerTests(TestCase):
+    def test_word_forms_share_stem(self):
+        """Формы одного слова приводятся к общей основе"""
+        for words in (('пост', 'посты', 'постами', 'поста'),
+                      ('подписчик', 'подписчиков', 'подписчикам'),
+                      ('ежик', 'ёжики')):
+            with self.subTest(words=words):
+                self.assertEqual({stem(word) for word in words}, {words[0]})
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='searcher')
+        cls.once = Post.objects.create(
+            text='Про кошку и собаку', author=cls.user)
+        cls.twice = Post.objects.create(
+            text='Кошки, кошки и ещё раз кошками', author=cls.user)
+        cls.other = Post.objects.create(
+            text='Совсем другой текст', author=cls.user)
+
+    def setUp(self):
+        self.client = Client()
+
+    def search(self, query):
+        return list(SearchResults(query)[:10])
+
+    def test_finds_word_forms(self):
+        """Поиск находит посты по другим формам слова"""
+        self.assertEqual(set(self.search('кошкам')), {self.once, self.twice})
+
+    def test_all_words_required(self):
+        """Пост должен содержать все слова запроса"""
+        self.assertEqual(self.search('кошки собаки'), [self.once])
+
+    def test_ranked_by_relevance(self):
+        """Пост с большим числом совпадений выше в выдаче"""
+        self.assertEqual(self.search('кошка'), [self.twice, self.once])
+
+    def test_index_follows_edit_and_delete(self):
+        """Правка и удаление поста сразу видны в поиске"""
+        post = Post.objects.create(text='Черепаха', author=self.user)
+        self.assertEqual(self.search('черепахи'), [post])
+        post.text = 'Улитка'
+        post.save()
+        self.assertEqual(self.search('черепахи'), [])
+        self.assertEqual(self.search('улитки'), [post])
+        post.delete()
+        self.assertEqual(self.search('улитки'), [])
+
+    def test_fallback_index(self):
+        """Без FTS5 поиск работает по таблице SearchTerm"""
+        with mock.patch('posts.search.uses_fts', return_value=False):
+            reindex()
+            self.assertTrue(SearchTerm.objects.filter(
+                term=stem('кошки'), post=self.twice, weight=3).exists())
+            self.assertEqual(self.search('кошка'), [self.twice, self.once])
+            self.assertEqual(self.search('кошки собаки'), [self.once])
+
+    @override_settings(NUMBER_POSTS_ON_FIRST_PAGE=1)
+    def test_view_paginates_and_keeps_query(self):
+        """Страница поиска разбита на страницы и помнит запрос"""
+        url = reverse('posts:search')
+        response = self.client.get(url, {'q': 'кошки'})
+        self.assertEqual(response.context['page_obj'].paginator.count, 2)
+        self.assertEqual(list(response.context['page_obj']), [self.twice])
+        self.assertContains(response, '?q=%D0%BA%D0%BE%D1%88%D0%BA%D0%B8'
+                                      '&amp;page=2')
+        response = self.client.get(url, {'q': 'кошки', 'page': 2})
+        self.assertEqual(list(response.context['page_obj']), [self.once])
+
+    def test_empty_query(self):
+        """Пустой запрос ничего не ищет"""
+        response = self.client.get(reverse('posts:search'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_admin_uses_index(self):
+        """Поиск в админке идет по тому же индексу"""
+        admin = site._registry[Post]
+        request = RequestFactory().get('/')
+        queryset, use_distinct = admin.get_search_results(
+            request, Post.objects.all(), 'собаки')
+        self.assertEqual(list(queryset), [self.once])
+        self.assertFalse(use_distinct)
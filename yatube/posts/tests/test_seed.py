@@ -0,0 +1,131 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase
+from django.urls import reverse
+
+from ..counters import recount
+from ..models import Comment, Follow, Post, TimelineEntry, User
+from ..search import SearchResults
+from ..seed import refresh_derived, seed
+from ..urls import urlpatterns
+
+
+class SeedTests(TestCase):
+    def setUp(self):
+        self.created = seed(users=30, groups=3, posts=120, comments=200,
+                            follows=5, seed=1)
+
+    def test_creates_requested_volumes(self):
+        """seed создает заказанное число строк"""
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Post.objects.count(), 120)
+        self.assertEqual(Comment.objects.count(), 200)
+        self.assertEqual(Follow.objects.count(), self.created['follows'])
+        self.assertFalse(Follow.objects.filter(
+            user_id=F('author_id')).exists())
+
+    def test_authors_are_skewed(self):
+        """Большую часть постов пишет меньшинство авторов"""
+        per_author = sorted(
+            (user.posts.count() for user in User.objects.all()),
+            reverse=True,
+        )
+        top = per_author[:len(per_author) // 5]
+        self.assertGreater(sum(top), sum(per_author) / 2)
+
+    def test_dates_are_spread(self):
+        """Посты получают разные даты публикации, а не одну"""
+        dates = Post.objects.values_list('pub_date', flat=True)
+        self.assertGreater(len(set(dates)), 100)
+        for comment in Comment.objects.select_related('post')[:20]:
+            self.assertGreaterEqual(comment.created, comment.post.pub_date)
+
+    def test_derived_data_is_consistent(self):
+        """Счетчики, ленты и поиск пересобраны после bulk_create"""
+        self.assertEqual(recount(), 0)
+        follow = Follow.objects.first()
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=follow.user_id).filter(
+                post__author=follow.author_id).count(),
+            follow.author.posts.count(),
+        )
+        word = Post.objects.first().text.split()[0]
+        self.assertGreater(SearchResults(word).count(), 0)
+
+    def test_refresh_purges_page_cache(self):
+        """После пересборки гости не получают страницы из кэша"""
+        cache.clear()
+        url = reverse('posts:index')
+        self.client.get(url)
+        Post.objects.bulk_create([
+            Post(text='Пост из пачки', author=User.objects.first())])
+        refresh_derived()
+        self.assertContains(self.client.get(url), 'Пост из пачки')
+
+    def test_benchmark_writes_report(self):
+        """benchmark измеряет каждый URL из posts.urls"""
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'report.json')
+            call_command('benchmark', requests=3, warmup=1, output=output,
+                         stdout=StringIO())
+            stdout = StringIO()
+            call_command('benchmark', requests=2, warmup=0, output=output,
+                         compare=output, stdout=stdout)
+            with open(output) as report_file:
+                report = json.load(report_file)
+        names = {pattern.name for pattern in urlpatterns if pattern.name}
+        self.assertEqual(set(report['urls']), names)
+        for name, result in report['urls'].items():
+            with self.subTest(name=name):
+                self.assertLess(max(result['status']), 400)
+                self.assertIsNotNone(result['latency_ms']['p99'])
+                self.assertIsNotNone(result['queries']['max'])
+        self.assertGreater(report['rss_kb']['peak'], 0)
+        self.assertIn('запросов было', stdout.getvalue())
+
+    def test_profile_templates(self):
+        """profile_templates меряет шаблоны всех страниц"""
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'templates.json')
+            stdout = StringIO()
+            call_command('profile_templates', requests=1, output=output,
+                         stdout=stdout)
+            with open(output) as report_file:
+                report = json.load(report_file)
+        names = {row['name'] for row in report['templates']}
+        self.assertTrue({'base.html', 'includes/header.html',
+                         'posts/includes/paginator.html'} <= names)
+        self.assertNotIn('profile_follow', report['pages'])
+        self.assertIn('base.html', stdout.getvalue())
+
+    def test_bench_fragments(self):
+        """bench_fragments сравнивает шаблоны с кэшем фрагментов и без"""
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'fragments.json')
+            call_command('bench_fragments', requests=1, output=output,
+                         stdout=StringIO())
+            with open(output) as report_file:
+                report = json.load(report_file)
+        self.assertEqual(set(report), {'disabled', 'enabled'})
+        self.assertIn('includes/header.html', report['enabled'])
+        self.assertGreater(report['disabled']['total'], 0)
+
+    def test_bench_sessions(self):
+        """bench_sessions сравнивает запросы с разными сессиями"""
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'sessions.json')
+            call_command('bench_sessions', requests=1,
+                         engines=['db', 'cached_db'], output=output,
+                         stdout=StringIO())
+            with open(output) as report_file:
+                report = json.load(report_file)
+        self.assertGreater(report['db']['session_queries_per_view'], 0)
+        self.assertEqual(report['cached_db']['session_queries_per_view'], 0)
+        self.assertLess(report['cached_db']['queries_per_view'],
+                        report['db']['queries_per_view'])
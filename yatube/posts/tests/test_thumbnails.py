@@ -0,0 +1,183 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core import renditions
+from core.cache import get_generation
+from core.thumbnails import generate, ready_thumbnail
+
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+ORIENTATION_TAG = 0x0112
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def uploaded_gif(name='small.gif'):
+    return SimpleUploadedFile(
+        name=name, content=SMALL_GIF, content_type='image/gif')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='author')
+        cls.post = Post.objects.create(
+            text='Пост с картинкой', author=cls.user, image=uploaded_gif())
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        # Миниатюры, варианты и кэш остаются от предыдущих тестов,
+        # а база откатывается.
+        cache.clear()
+        for generated in ('cache', os.path.join('posts', 'renditions')):
+            shutil.rmtree(os.path.join(TEMP_MEDIA_ROOT, generated),
+                          ignore_errors=True)
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_placeholder_until_ready(self):
+        """До генерации миниатюры страница показывает заглушку"""
+        self.assertIsNone(ready_thumbnail(self.post.image))
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}))
+        self.assertContains(response, 'img/placeholder.svg')
+
+    def test_thumbnail_after_generation(self):
+        """Готовая миниатюра выводится вместо заглушки"""
+        thumbnail = generate(self.post.image)
+        self.assertEqual(ready_thumbnail(self.post.image).name,
+                         thumbnail.name)
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}))
+        self.assertContains(response, thumbnail.url)
+
+    def test_create_schedules_thumbnail(self):
+        """Создание поста с картинкой ставит миниатюру в очередь"""
+        with mock.patch('core.thumbnails.schedule') as schedule:
+            self.authorized_client.post(
+                reverse('posts:post_create'),
+                data={'text': 'Новый пост', 'image': uploaded_gif('new.gif')})
+        schedule.assert_called_once()
+        self.assertEqual(schedule.call_args[0][0].name, 'posts/new.gif')
+
+    def test_pregenerate_command(self):
+        """Команда создает миниатюры для всех постов с картинками"""
+        call_command('pregenerate_thumbnails', workers=1, stdout=StringIO())
+        self.assertIsNotNone(ready_thumbnail(self.post.image))
+
+    def test_renditions_generated(self):
+        """Картинка нарезается на все ширины и поддерживаемые форматы"""
+        manifest = renditions.generate(self.post.image.name)
+        formats = renditions.supported_formats()
+        self.assertEqual(
+            sum(len(variants) for variants in manifest.values()),
+            len(formats) * len(settings.IMAGE_RENDITION_WIDTHS))
+        for variants in manifest.values():
+            for name, width in variants:
+                self.assertTrue(name.startswith('posts/renditions/'))
+        self.assertEqual(
+            renditions.get_manifest(self.post.image.name), manifest)
+
+    def test_picture_markup(self):
+        """Пост с вариантами картинки выводит <picture> и srcset"""
+        renditions.generate(self.post.image.name)
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}))
+        self.assertContains(response, '<picture>')
+        self.assertContains(response, 'srcset=')
+        self.assertContains(response, '480w')
+
+    def test_bench_renditions_command(self):
+        """Отчет о сэкономленных байтах считается по первой странице"""
+        generate(self.post.image)
+        renditions.generate(self.post.image.name)
+        out = StringIO()
+        call_command('bench_renditions', viewport=[360], stdout=out)
+        self.assertIn('Картинок на странице: 1', out.getvalue())
+        self.assertIn('Экран 360px', out.getvalue())
+
+    def test_card_updated_after_pregenerate(self):
+        """Готовая картинка обновляет закэшированную карточку поста"""
+        url = reverse('posts:index')
+        self.assertContains(self.client.get(url), 'img/placeholder.svg')
+        updated = Post.objects.get(pk=self.post.pk).updated
+        call_command('pregenerate_thumbnails', workers=1, stdout=StringIO())
+        self.assertGreater(Post.objects.get(pk=self.post.pk).updated,
+                           updated)
+        self.assertContains(self.client.get(url), '<picture>')
+
+    def test_ready_thumbnail_keeps_generation(self):
+        """Готовая миниатюра не сбрасывает кэш всего сайта"""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        self.assertContains(self.client.get(url), 'img/placeholder.svg')
+        generation = get_generation()
+        call_command('pregenerate_thumbnails', workers=1, stdout=StringIO())
+        self.assertEqual(get_generation(), generation)
+        self.assertContains(self.client.get(url), '<picture>')
+
+    def test_rendition_names_unique_per_path(self):
+        """Картинки с одинаковым именем в разных папках не делят варианты"""
+        self.assertNotEqual(
+            renditions.rendition_name('posts/a/photo.jpg', 480, 'jpg'),
+            renditions.rendition_name('posts/b/photo.png', 480, 'jpg'))
+
+    def test_renditions_follow_exif_orientation(self):
+        """Поворот из EXIF применяется до нарезки"""
+        buffer = BytesIO()
+        exif = Image.Exif()
+        exif[ORIENTATION_TAG] = 6
+        Image.new('RGB', (400, 1200)).save(buffer, 'JPEG', exif=exif)
+        name = default_storage.save('posts/rotated.jpg',
+                                    ContentFile(buffer.getvalue()))
+        with mock.patch.object(renditions.ImageOps, 'fit',
+                               wraps=renditions.ImageOps.fit) as fit:
+            renditions.generate(name)
+        self.assertEqual(fit.call_args[0][0].size, (1200, 400))
+
+    def test_renditions_deleted_with_image(self):
+        """Замена картинки и удаление поста убирают ее варианты"""
+        post = Post.objects.create(text='Пост', author=self.user,
+                                   image=uploaded_gif('old.gif'))
+        old = post.image.name
+        manifest = renditions.generate(old)
+        paths = [path for variants in manifest.values()
+                 for path, _ in variants]
+        with mock.patch('posts.signals.transaction.on_commit',
+                        side_effect=lambda callback: callback()):
+            post.image = uploaded_gif('new.gif')
+            post.save()
+            self.assertFalse(any(map(default_storage.exists, paths)))
+            self.assertEqual(renditions.get_manifest(old), {})
+            manifest = renditions.generate(post.image.name)
+            post.delete()
+        self.assertFalse(any(
+            default_storage.exists(path)
+            for variants in manifest.values() for path, _ in variants))
@@ -0,0 +1,133 @@
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import timeline
+from ..models import Follow, Post, TimelineEntry, User
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create(username='reader')
+        cls.author = User.objects.create(username='author')
+        cls.old_post = Post.objects.create(text='Старый пост',
+                                           author=cls.author)
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def follow(self):
+        self.reader_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.author}))
+
+    def feed(self):
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_timeline(self):
+        """Подписка досыпает в ленту старые посты автора"""
+        self.follow()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=self.old_post).exists())
+        self.assertEqual(self.feed(), [self.old_post])
+
+    def test_new_post_fans_out(self):
+        """Новый пост раскладывается по лентам подписчиков"""
+        self.follow()
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+        self.assertEqual(self.feed(), [post, self.old_post])
+
+    def test_unfollow_clears_timeline(self):
+        """Отписка убирает посты автора из ленты"""
+        self.follow()
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': self.author}))
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists())
+        self.assertEqual(self.feed(), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_celebrity_fan_out_on_read(self):
+        """Посты популярных авторов дочитываются при показе ленты"""
+        self.follow()
+        post = Post.objects.create(text='Пост звезды', author=self.author)
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists())
+        self.assertEqual(self.feed(), [post, self.old_post])
+
+    def test_rebuild_timelines_command(self):
+        """Команда rebuild_timelines восстанавливает ленту"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', 'reader', stdout=StringIO())
+        self.assertEqual(self.feed(), [self.old_post])
+
+    @override_settings(TIMELINE_BATCH_SIZE=2)
+    def test_follow_copies_whole_history(self):
+        """Подписка копирует в ленту всю историю автора, а не ее начало"""
+        posts = [Post.objects.create(text=f'Пост {i}', author=self.author)
+                 for i in range(5)]
+        self.follow()
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(
+                user=self.reader).values_list('post_id', flat=True)),
+            {self.old_post.pk, *(post.pk for post in posts)},
+        )
+
+    def test_former_celebrity_backfilled(self):
+        """Автор, потерявший статус знаменитости, снова в лентах"""
+        fan = User.objects.create(username='fan')
+        with override_settings(TIMELINE_FANOUT_LIMIT=1):
+            self.follow()
+            Follow.objects.create(user=fan, author=self.author)
+            post = Post.objects.create(text='Пост звезды', author=self.author)
+            self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+            Follow.objects.get(user=fan).delete()
+            self.assertTrue(TimelineEntry.objects.filter(
+                user=self.reader, post=post).exists())
+            self.assertEqual(self.feed(), [post, self.old_post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1, TIMELINE_BATCH_SIZE=2)
+    def test_former_celebrity_backfill_is_bounded(self):
+        """Отписка от бывшей знаменитости копирует в ленты только
+        первую страницу ее постов, сколько бы их ни было"""
+        fan = User.objects.create(username='fan')
+        self.follow()
+        Follow.objects.create(user=fan, author=self.author)
+        posts = [Post.objects.create(text=f'Пост звезды {number}',
+                                     author=self.author)
+                 for number in range(25)]
+        fan_client = Client()
+        fan_client.force_login(fan)
+        # 15 запросов самой отписки, затем подписчики автора, его
+        # последние посты и по вставке на каждые две записи ленты.
+        # Старая история в запросе не читается.
+        with self.assertNumQueries(15 + 2 + 5):
+            fan_client.get(reverse('posts:profile_unfollow',
+                                   kwargs={'username': self.author}))
+        recent = posts[-settings.NUMBER_POSTS_ON_FIRST_PAGE:]
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(
+                user=self.reader).values_list('post_id', flat=True)),
+            {self.old_post.pk, *(post.pk for post in recent)},
+        )
+
+    def test_feed_uses_timeline_index(self):
+        """Лента без знаменитостей сортируется по индексу записей ленты"""
+        self.follow()
+        posts = timeline.posts_for(self.reader)[:10]
+        sql, params = posts.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('timeline_user_feed_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
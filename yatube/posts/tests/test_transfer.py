@@ -0,0 +1,200 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from core import page_cache
+from core.cache import get_generation
+
+from ..models import Comment, Follow, Group, Post, TimelineEntry, User
+
+TEMP_DIR = tempfile.mkdtemp()
+
+
+def generation(tag):
+    return get_generation(page_cache.TAG_GENERATION.format(tag))
+
+
+class TransferTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        cls.old_date = timezone.now() - timedelta(days=30)
+        for number in range(5):
+            post = Post.objects.create(text=f'Пост {number}',
+                                       author=cls.author, group=cls.group)
+            Comment.objects.create(post=post, author=cls.reader,
+                                   text=f'Комментарий {number}')
+        Post.objects.update(pub_date=cls.old_date)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def path(self, name):
+        return os.path.join(TEMP_DIR, name)
+
+    def export(self, kind, name, **options):
+        call_command('export_data', kind, output=self.path(name),
+                     chunk_size=2, stderr=StringIO(), **options)
+
+    def load(self, kind, name, **options):
+        call_command('import_data', kind, self.path(name), batch_size=2,
+                     stderr=StringIO(), **options)
+
+    def snapshot(self):
+        return (
+            sorted(Post.objects.values_list(
+                'id', 'text', 'pub_date', 'author__username', 'group__slug')),
+            sorted(Comment.objects.values_list(
+                'id', 'post_id', 'text', 'author__username')),
+            sorted(Follow.objects.values_list(
+                'user__username', 'author__username')),
+        )
+
+    def round_trip(self, extension):
+        before = self.snapshot()
+        for kind in ('group', 'post', 'comment', 'follow'):
+            self.export(kind, f'{kind}.{extension}')
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        User.objects.all().delete()
+        for kind in ('group', 'post', 'comment', 'follow'):
+            self.load(kind, f'{kind}.{extension}')
+        self.assertEqual(self.snapshot(), before)
+
+    def test_jsonl_round_trip(self):
+        """Выгрузка в JSON Lines и загрузка восстанавливают данные"""
+        self.round_trip('jsonl')
+        self.assertEqual(User.objects.get(username='reader').counters
+                         .following, 1)
+
+    def test_csv_round_trip(self):
+        """Выгрузка в CSV и загрузка восстанавливают данные"""
+        self.round_trip('csv')
+
+    def test_import_is_batched(self):
+        """Импорт пишет порциями, авторы и группы ищутся один раз"""
+        self.export('post', 'posts.jsonl')
+        Post.objects.all().delete()
+        # Последний id поста до загрузки, затем три порции: точка
+        # сохранения, проверка занятых id, вставка и освобождение,
+        # плюс два запроса поиска автора и группы в первой порции.
+        with self.assertNumQueries(15):
+            self.load('post', 'posts.jsonl', no_refresh=True)
+        self.assertEqual(Post.objects.count(), 5)
+
+    def test_export_resumes_from_checkpoint(self):
+        """Прерванная выгрузка продолжается с сохраненного смещения"""
+        checkpoint = self.path('export.checkpoint')
+        first = Post.objects.order_by('pk')[:2]
+        with open(checkpoint, 'w') as state:
+            json.dump({'offset': 2, 'last_pk': first[1].pk}, state)
+        with open(self.path('resumed.jsonl'), 'w') as output:
+            output.write('уже выгружено\n' * 2)
+        self.export('post', 'resumed.jsonl', checkpoint=checkpoint)
+        with open(self.path('resumed.jsonl')) as output:
+            lines = output.read().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[2])['id'],
+                         Post.objects.order_by('pk')[2].pk)
+        with open(checkpoint) as state:
+            self.assertEqual(json.load(state)['offset'], 5)
+
+    def test_import_resumes_from_checkpoint(self):
+        """Импорт пропускает уже загруженные записи из смещения"""
+        self.export('post', 'posts.jsonl')
+        Post.objects.all().delete()
+        checkpoint = self.path('import.checkpoint')
+        with open(checkpoint, 'w') as state:
+            json.dump({'offset': 3}, state)
+        self.load('post', 'posts.jsonl', checkpoint=checkpoint)
+        self.assertEqual(Post.objects.count(), 2)
+        with open(checkpoint) as state:
+            self.assertEqual(json.load(state)['offset'], 5)
+
+    def test_missing_authors_are_created(self):
+        """Неизвестные авторы заводятся без возможности входа"""
+        with open(self.path('new.jsonl'), 'w') as source:
+            source.write(json.dumps({
+                'author': 'stranger', 'group': None, 'text': 'Привет',
+                'pub_date': self.old_date.isoformat(), 'image': '',
+            }) + '\n')
+        self.load('post', 'new.jsonl')
+        stranger = User.objects.get(username='stranger')
+        self.assertFalse(stranger.has_usable_password())
+        post = stranger.posts.get()
+        self.assertEqual(post.pub_date, self.old_date)
+
+    def write(self, name, *rows):
+        with open(self.path(name), 'w') as source:
+            for row in rows:
+                source.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+    def test_comment_without_post_is_kept(self):
+        """Комментарий без поста загружается без поста, а не теряется"""
+        self.write('comments.jsonl', {
+            'id': None, 'post': None, 'author': 'reader',
+            'created': self.old_date.isoformat(), 'text': 'Ничей',
+        })
+        self.load('comment', 'comments.jsonl')
+        self.assertIsNone(Comment.objects.get(text='Ничей').post_id)
+
+    def test_conflicting_id_stops_import(self):
+        """Пост с чужим id останавливает импорт, а не пропускается"""
+        taken = Post.objects.order_by('pk').first()
+        self.write('posts.jsonl', {
+            'id': taken.pk, 'author': 'reader', 'group': None,
+            'text': 'Другой пост', 'pub_date': self.old_date.isoformat(),
+            'image': '',
+        })
+        with self.assertRaisesMessage(CommandError, str(taken.pk)):
+            self.load('post', 'posts.jsonl')
+        self.assertFalse(Post.objects.filter(text='Другой пост').exists())
+
+    def test_repeated_import_is_skipped(self):
+        """Повторная загрузка тех же постов ничего не меняет"""
+        self.export('post', 'posts.jsonl')
+        before = self.snapshot()
+        self.load('post', 'posts.jsonl')
+        self.assertEqual(self.snapshot(), before)
+
+    def test_dates_kept_without_changing_fields(self):
+        """Даты загружаются как есть, поля модели не перенастраиваются"""
+        self.write('posts.jsonl', {
+            'author': 'reader', 'group': None, 'text': 'Старый',
+            'pub_date': self.old_date.isoformat(), 'image': '',
+        })
+        self.load('post', 'posts.jsonl')
+        self.assertEqual(Post.objects.get(text='Старый').pub_date,
+                         self.old_date)
+        self.assertTrue(Post._meta.get_field('pub_date').auto_now_add)
+
+    def test_refresh_covers_only_imported_data(self):
+        """Импорт обновляет счетчики, ленту и страницы затронутых"""
+        self.write('posts.jsonl', {
+            'author': 'author', 'group': 'group', 'text': 'Новый',
+            'pub_date': timezone.now().isoformat(), 'image': '',
+        })
+        tags = [f'author:{self.author.username}', 'group:group', 'index']
+        before = {tag: generation(tag) for tag in tags}
+        self.load('post', 'posts.jsonl')
+        post = Post.objects.get(text='Новый')
+        self.author.counters.refresh_from_db()
+        self.assertEqual(self.author.counters.posts, 6)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+        for tag in tags:
+            self.assertNotEqual(generation(tag), before[tag])
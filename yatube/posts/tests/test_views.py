@@ -1,12 +1,16 @@
 import tempfile
-from time import sleep
 import shutil
 
 from django.test import Client, override_settings, TestCase
 from django.urls import reverse
 from django import forms
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core.cache import get_generation
 
 from ..models import Follow, Group, Post, User
 
@@ -57,7 +61,9 @@ class TaskPagesTests(TestCase):
         )
 
     def setUp(self):
-
+        # Страницы гостя кэшируются целиком, а база между тестами
+        # откатывается без сигналов.
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
 
@@ -240,16 +246,48 @@ class TaskPagesTests(TestCase):
         self.assertNotEqual(test_post, page_obj)
 
     def test_index_cache(self):
+        """Index отдается из кэша, пока данные не менялись"""
+        cache = self.client.get(reverse('posts:index')).content
+        # update() не вызывает сигналы, поколение кэша не меняется.
+        Post.objects.filter(pk=self.post.pk).update(text='Тихая правка')
+        cache_again = self.client.get(reverse('posts:index')).content
+        self.assertEqual(cache, cache_again)
+        self.assertNotIn('Тихая правка'.encode(), cache_again)
+
+    def test_index_cache_invalidated_by_new_post(self):
+        """Новый пост сразу сбрасывает кэш index"""
         cache = self.client.get(reverse('posts:index')).content
         Post.objects.create(
             text='Текст для проверки кэша',
             author=self.user
         )
-        cache_before_20sec = self.client.get(reverse('posts:index')).content
-        self.assertEqual(cache, cache_before_20sec)
-        sleep(settings.CACHE_SAVE_TIME)
-        cache_after_20sec = self.client.get(reverse('posts:index')).content
-        self.assertNotEqual(cache, cache_after_20sec)
+        content = self.client.get(reverse('posts:index')).content
+        self.assertNotEqual(cache, content)
+        self.assertIn('Текст для проверки кэша'.encode(), content)
+
+    def test_fragment_cache_invalidated_by_edit(self):
+        """Правка поста сбрасывает кэш группы, профиля и поста"""
+        urls = (
+            reverse('posts:group_list', kwargs={'slug_name': 'tst_slug'}),
+            reverse('posts:profile', kwargs={'username': 'NoName'}),
+            reverse('posts:post_detail',
+                    kwargs={'post_id': self.post.id}),
+        )
+        for url in urls:
+            self.client.get(url)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Отредактированный текст'
+        post.save()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url),
+                                    'Отредактированный текст')
+
+    def test_fragment_cache_survives_login(self):
+        """Вход пользователя не сбрасывает кэш фрагментов"""
+        generation = get_generation()
+        self.client.force_login(self.another_user)
+        self.assertEqual(generation, get_generation())
 
     def test_authorized_user_follow(self):
         """Авториз. пользователь может подписаться на автора и отписаться"""
@@ -320,6 +358,7 @@ class PaginatorViewTest(TestCase):
             )
 
     def setUp(self):
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
 
@@ -336,3 +375,47 @@ class PaginatorViewTest(TestCase):
                 with self.subTest(adress=pag):
                     response = self.client.get(page + pag[0])
                     self.assertEqual(len(response.context['page_obj']), pag[1])
+
+    def test_cursor_paginator_walks_all_posts(self):
+        """Курсорная пагинация проходит все посты без повторов."""
+        seen = []
+        url = reverse('posts:index')
+        response = self.client.get(url)
+        while True:
+            page_obj = response.context['page_obj']
+            seen.extend(post.id for post in page_obj)
+            if not page_obj.has_next():
+                break
+            response = self.client.get(
+                url, {'cursor': page_obj.next_cursor})
+        self.assertEqual(len(seen), settings.NUMBER_OF_POSTS)
+        self.assertEqual(
+            seen, list(Post.objects.order_by('-pub_date', '-id')
+                       .values_list('id', flat=True)))
+
+    def test_cursor_paginator_previous_page(self):
+        """Курсор назад возвращает на первую страницу."""
+        url = reverse('posts:index')
+        first = self.client.get(url).context['page_obj']
+        second = self.client.get(
+            url, {'cursor': first.next_cursor}).context['page_obj']
+        self.assertEqual(len(second), settings.NUMBER_POSTS_ON_SECOND_PAGE)
+        self.assertTrue(second.has_previous())
+        back = self.client.get(
+            url, {'cursor': second.previous_cursor}).context['page_obj']
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+
+    def test_cursor_paginator_skips_count(self):
+        """Курсорная страница не выполняет COUNT(*)."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:index'))
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries))
+
+    def test_cursor_paginator_broken_cursor(self):
+        """Битый курсор отдает первую страницу."""
+        response = self.client.get(reverse('posts:index'),
+                                   {'cursor': 'garbage'})
+        self.assertEqual(len(response.context['page_obj']),
+                         settings.NUMBER_POSTS_ON_FIRST_PAGE)
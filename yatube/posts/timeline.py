@@ -0,0 +1,164 @@
+from django.conf import settings
+from django.db.models import F, Q
+
+from .models import Follow, Post, TimelineEntry, UserCounters
+
+FEED_ORDERING = ('feed_date', 'feed_pk')
+
+
+def is_celebrity(author_id):
+    """Пост такого автора не раскладывается по лентам при публикации."""
+    return UserCounters.objects.filter(
+        user_id=author_id,
+        followers__gt=settings.TIMELINE_FANOUT_LIMIT
+    ).exists()
+
+
+def fan_out(post):
+    """Fan-out-on-write: кладет новый пост в ленты подписчиков автора."""
+    if is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+         for user_id in followers],
+        ignore_conflicts=True,
+    )
+
+
+def _author_posts(author_id):
+    """Вся история постов автора страницами по TIMELINE_BATCH_SIZE."""
+    last_pk = 0
+    while True:
+        page = list(Post.objects.filter(
+            author_id=author_id, pk__gt=last_pk
+        ).order_by('pk').values_list('id', 'pub_date')[
+            :settings.TIMELINE_BATCH_SIZE
+        ])
+        if not page:
+            return
+        yield page
+        last_pk = page[-1][0]
+
+
+def _recent_posts(author_id):
+    """Последние посты автора - столько, сколько на странице ленты."""
+    return [list(Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-pk'
+    ).values_list('id', 'pub_date')[:settings.NUMBER_POSTS_ON_FIRST_PAGE])]
+
+
+def _copy_posts(author_id, user_ids, pages=None):
+    """Раскладывает посты автора по лентам user_ids.
+
+    pages - страницы пар (id, pub_date), по умолчанию вся история.
+    """
+    if pages is None:
+        pages = _author_posts(author_id)
+    batch = []
+    for page in pages:
+        for post_id, pub_date in page:
+            batch.extend(
+                TimelineEntry(user_id=user_id, post_id=post_id,
+                              pub_date=pub_date)
+                for user_id in user_ids
+            )
+            if len(batch) >= settings.TIMELINE_BATCH_SIZE:
+                TimelineEntry.objects.bulk_create(batch,
+                                                  ignore_conflicts=True)
+                batch = []
+    TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def add_author(user, author):
+    """Досыпает в ленту все посты автора после подписки."""
+    if is_celebrity(author.pk):
+        return
+    _copy_posts(author.pk, [user.pk])
+
+
+def remove_author(user, author):
+    TimelineEntry.objects.filter(user=user, post__author=author).delete()
+
+
+def author_unfollowed(author_id):
+    """Автор, опустившийся до TIMELINE_FANOUT_LIMIT подписчиков, снова
+    раскладывается при публикации.
+
+    Ленты подписчиков, которые дочитывали его при показе, получают
+    только первую страницу его последних постов: отписка выполняется
+    в запросе, и копировать всю историю в тысячу лент ей нельзя. Более
+    старые посты досыпает команда rebuild_timelines.
+    """
+    if not UserCounters.objects.filter(
+        user_id=author_id, followers=settings.TIMELINE_FANOUT_LIMIT
+    ).exists():
+        return
+    _copy_posts(author_id, list(Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)), _recent_posts(author_id))
+
+
+def rebuild(user):
+    """Собирает ленту пользователя заново по текущим подпискам."""
+    TimelineEntry.objects.filter(user=user).delete()
+    for follow in Follow.objects.filter(user=user).select_related('author'):
+        add_author(user, follow.author)
+
+
+def rebuild_all(users=None):
+    """Пересобирает ленты users (по умолчанию - всех) разом.
+
+    В отличие от rebuild для каждого пользователя, посты автора
+    читаются один раз на всех его подписчиков.
+    """
+    follows = Follow.objects.exclude(
+        author__counters__followers__gt=settings.TIMELINE_FANOUT_LIMIT
+    ).order_by('author_id')
+    entries = TimelineEntry.objects.all()
+    if users is not None:
+        follows = follows.filter(user__in=users)
+        entries = entries.filter(user__in=users)
+    entries.delete()
+    followers = {}
+    for user_id, author_id in follows.values_list('user_id', 'author_id'):
+        followers.setdefault(author_id, []).append(user_id)
+    for author_id, user_ids in followers.items():
+        _copy_posts(author_id, user_ids)
+
+
+def _celebrities(user):
+    return Follow.objects.filter(
+        user=user,
+        author__counters__followers__gt=settings.TIMELINE_FANOUT_LIMIT
+    ).values('author_id')
+
+
+def feed_posts(user):
+    """Все посты ленты одним запросом без сортировки, для агрегатов."""
+    entries = TimelineEntry.objects.filter(user=user).values('post_id')
+    return Post.objects.filter(
+        Q(pk__in=entries) | Q(author__in=_celebrities(user))
+    )
+
+
+def posts_for(user):
+    """Лента подписок для показа, отсортированная по FEED_ORDERING.
+
+    Без подписок на знаменитостей посты читаются из записей ленты
+    по индексу (user, -pub_date, -post). Посты знаменитостей не
+    раскладываются по лентам и дочитываются при показе
+    (fan-out-on-read).
+    """
+    if _celebrities(user).exists():
+        posts = feed_posts(user).annotate(
+            feed_date=F('pub_date'), feed_pk=F('pk')
+        )
+    else:
+        posts = Post.objects.filter(timeline_entries__user=user).annotate(
+            feed_date=F('timeline_entries__pub_date'),
+            feed_pk=F('timeline_entries__post'),
+        )
+    return posts.order_by(*(f'-{field}' for field in FEED_ORDERING))
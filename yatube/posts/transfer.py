@@ -0,0 +1,398 @@
+"""Потоковые импорт и экспорт групп, постов, комментариев и подписок.
+
+Записи - плоские словари: пользователи передаются по username,
+группы - по slug, посты - по id. Форматы - JSON Lines и CSV. Память
+не растет с размером выгрузки: экспорт читает базу порциями через
+iterator(chunk_size), импорт пишет bulk_create порциями, каждая в своей
+транзакции. Смещение после каждой порции можно сохранить и продолжить
+прерванную передачу с него.
+"""
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.db import models, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core import page_cache
+from core.cache import bump_generation
+
+from . import counters, search, timeline
+from .models import Comment, Follow, Group, Post, User
+
+FORMATS = ('jsonl', 'csv')
+# Не больше стольких значений в одном IN: у SQLite лимит 999 параметров.
+IN_BATCH = 500
+
+
+class Kind:
+    """Описание типа записей: поля выгрузки и пути к ним для values_list."""
+
+    def __init__(self, model, fields, paths):
+        self.model = model
+        self.fields = fields
+        self.paths = paths
+
+
+KINDS = {
+    'group': Kind(
+        Group, ('slug', 'title', 'description'),
+        ('slug', 'title', 'description'),
+    ),
+    'post': Kind(
+        Post, ('id', 'author', 'group', 'pub_date', 'text', 'image'),
+        ('id', 'author__username', 'group__slug', 'pub_date', 'text',
+         'image'),
+    ),
+    'comment': Kind(
+        Comment, ('id', 'post', 'author', 'created', 'text'),
+        ('id', 'post_id', 'author__username', 'created', 'text'),
+    ),
+    'follow': Kind(
+        Follow, ('user', 'author'),
+        ('user__username', 'author__username'),
+    ),
+}
+
+
+def _plain(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def export_rows(kind_name, after_pk=None, chunk_size=2000):
+    """Пары (pk, запись) по возрастанию pk, начиная после after_pk."""
+    kind = KINDS[kind_name]
+    queryset = kind.model.objects.order_by('pk')
+    if after_pk is not None:
+        queryset = queryset.filter(pk__gt=after_pk)
+    values = queryset.values_list('pk', *kind.paths)
+    for pk, *row in values.iterator(chunk_size=chunk_size):
+        yield pk, dict(zip(kind.fields, map(_plain, row)))
+
+
+def row_writer(stream, fmt, fields, header=True):
+    """Функция, пишущая одну запись в поток в формате fmt."""
+    if fmt == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=fields)
+        if header:
+            writer.writeheader()
+        return writer.writerow
+
+    def write(row):
+        stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+    return write
+
+
+def read_rows(stream, fmt):
+    if fmt == 'csv':
+        for row in csv.DictReader(stream):
+            # В CSV нет null: пустая ячейка означает отсутствие значения.
+            yield {key: value if value != '' else None
+                   for key, value in row.items()}
+        return
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _in_batches(queryset, field, values):
+    values = list(values)
+    for start in range(0, len(values), IN_BATCH):
+        yield from queryset.filter(
+            **{f'{field}__in': values[start:start + IN_BATCH]}
+        )
+
+
+def chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Lookup:
+    """Кэш значение -> pk, пополняемый одним запросом на порцию."""
+
+    def __init__(self, model, field, create=None):
+        self.model = model
+        self.field = field
+        self.create = create
+        self.cache = {}
+
+    def resolve(self, values):
+        missing = {value for value in values
+                   if value is not None and value not in self.cache}
+        if missing:
+            self._fetch(missing)
+            missing -= set(self.cache)
+            if missing and self.create:
+                self.model.objects.bulk_create(
+                    [self.create(value) for value in missing],
+                    ignore_conflicts=True,
+                )
+                self._fetch(missing)
+        return self.cache
+
+    def _fetch(self, values):
+        self.cache.update(_in_batches(
+            self.model.objects.values_list(self.field, 'pk'),
+            self.field, values,
+        ))
+
+
+def _new_user(username):
+    # Авторы, которых нет в базе, заводятся без возможности входа.
+    return User(username=username, password=make_password(None))
+
+
+def lookups():
+    return {
+        'user': Lookup(User, 'username', create=_new_user),
+        'group': Lookup(Group, 'slug'),
+    }
+
+
+class ImportConflict(Exception):
+    """Запись занимает id, под которым в базе уже другая строка."""
+
+
+class _AsIsQuerySet(models.QuerySet):
+    # Вставка как у loaddata (raw): поля auto_now и auto_now_add
+    # сохраняются такими, какие они у объекта.
+    def _insert(self, *args, **kwargs):
+        kwargs['raw'] = True
+        return super()._insert(*args, **kwargs)
+
+
+def bulk_create_as_is(model, objects, **kwargs):
+    """bulk_create, сохраняющий даты объектов как есть.
+
+    Обычный bulk_create ставит текущее время в поля auto_now_add,
+    поэтому все даты, включая Post.updated, задаются у объектов.
+    """
+    return _AsIsQuerySet(model).bulk_create(objects, **kwargs)
+
+
+def _date(value):
+    return parse_datetime(value) if isinstance(value, str) else value
+
+
+def _id(value):
+    # В CSV все значения - строки.
+    return int(value) if value is not None else None
+
+
+def _build_group(row, users, groups, existing_posts):
+    return Group(slug=row['slug'], title=row['title'],
+                 description=row['description'] or '')
+
+
+def _build_post(row, users, groups, existing_posts):
+    return Post(id=_id(row.get('id')), author_id=users[row['author']],
+                group_id=groups.get(row.get('group')),
+                pub_date=_date(row['pub_date']), updated=timezone.now(),
+                text=row['text'], image=row.get('image') or '')
+
+
+def _build_comment(row, users, groups, existing_posts):
+    post_id = _id(row.get('post'))
+    if post_id is not None and post_id not in existing_posts:
+        return None
+    return Comment(id=_id(row.get('id')), post_id=post_id,
+                   author_id=users[row['author']],
+                   created=_date(row['created']), text=row['text'])
+
+
+def _build_follow(row, users, groups, existing_posts):
+    if row['user'] == row['author']:
+        return None
+    return Follow(user_id=users[row['user']],
+                  author_id=users[row['author']])
+
+
+BUILDERS = {
+    'group': _build_group,
+    'post': _build_post,
+    'comment': _build_comment,
+    'follow': _build_follow,
+}
+
+# Поля, по которым строка с тем же id считается той же записью.
+IDENTITY = {
+    'post': ('author_id', 'pub_date', 'text'),
+    'comment': ('post_id', 'author_id', 'created', 'text'),
+}
+
+
+def _check_conflicts(kind_name, objects):
+    """Строка с уже занятым id должна совпадать с записью в базе.
+
+    Совпадающие строки - повторная загрузка, их пропускает
+    ignore_conflicts. Несовпадающие остановят импорт, иначе чужой
+    пост или комментарий был бы молча потерян.
+    """
+    fields = IDENTITY.get(kind_name)
+    ids = {obj.pk: obj for obj in objects if obj.pk is not None}
+    if not fields or not ids:
+        return
+    model = KINDS[kind_name].model
+    clashes = [
+        pk for pk, *values in _in_batches(
+            model.objects.order_by().values_list('pk', *fields), 'pk', ids)
+        if tuple(values) != tuple(getattr(ids[pk], field)
+                                  for field in fields)
+    ]
+    if clashes:
+        raise ImportConflict(
+            f'{model._meta.verbose_name}: id {sorted(clashes)[:10]} '
+            f'уже заняты другими записями'
+        )
+
+
+class Touched:
+    """Что изменил импорт: по этому обновляются производные данные."""
+
+    def __init__(self):
+        self.last_post = Post.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+        self.posts = set()
+        self.commented = set()
+        self.users = set()
+        self.authors = set()
+        self.readers = set()
+        self.tags = set()
+
+    def add(self, kind_name, rows, created):
+        if kind_name == 'post':
+            self.posts.update(obj.pk for obj in created if obj.pk)
+            self.users.update(obj.author_id for obj in created)
+            self.authors.update(obj.author_id for obj in created)
+            self.tags.add('index')
+            for row in rows:
+                self.tags.add(f'author:{row["author"]}')
+                if row.get('group'):
+                    self.tags.add(f'group:{row["group"]}')
+        elif kind_name == 'comment':
+            commented = {obj.post_id for obj in created if obj.post_id}
+            self.commented.update(commented)
+            self.tags.update(f'post:{post_id}' for post_id in commented)
+        elif kind_name == 'follow':
+            for obj in created:
+                self.users.update((obj.user_id, obj.author_id))
+                self.readers.add(obj.user_id)
+            for row in rows:
+                self.tags.update((f'author:{row["user"]}',
+                                  f'author:{row["author"]}'))
+
+
+def import_chunk(kind_name, rows, cache, touched=None):
+    """Сохраняет порцию записей в одной транзакции.
+
+    Возвращает (обработано, пропущено): пропускаются комментарии
+    к отсутствующим постам и подписки на самого себя. Уже
+    существующие строки (тот же slug, пара подписки или id
+    с теми же данными) не перезаписываются; id, занятый другой
+    записью, вызывает ImportConflict.
+    """
+    with transaction.atomic():
+        users = cache['user'].resolve(
+            [row.get(field) for row in rows
+             for field in ('author', 'user') if field in row]
+        )
+        groups = cache['group'].resolve([row.get('group') for row in rows])
+        existing_posts = set()
+        if kind_name == 'comment':
+            existing_posts = set(_in_batches(
+                Post.objects.values_list('pk', flat=True), 'pk',
+                {_id(row['post']) for row in rows
+                 if row.get('post') is not None},
+            ))
+        objects = [BUILDERS[kind_name](row, users, groups, existing_posts)
+                   for row in rows]
+        created = [obj for obj in objects if obj is not None]
+        _check_conflicts(kind_name, created)
+        bulk_create_as_is(KINDS[kind_name].model, created,
+                          ignore_conflicts=True)
+        if touched is not None:
+            touched.add(kind_name, rows, created)
+    return len(rows), len(objects) - len(created)
+
+
+def _batches(values):
+    values = sorted(values)
+    for start in range(0, len(values), IN_BATCH):
+        yield values[start:start + IN_BATCH]
+
+
+def refresh_touched(touched, log=None):
+    """Обновляет счетчики, ленты, поиск и кэш только для того,
+    что изменил импорт, вместо полной пересборки refresh_derived.
+    """
+    log = log or (lambda message: None)
+    # Посты без id в выгрузке получили новые id после last_post.
+    posts = touched.posts | set(Post.objects.filter(
+        pk__gt=touched.last_post).values_list('pk', flat=True))
+    fixed = 0
+    for ids in _batches(posts | touched.commented):
+        fixed += counters.recount(posts=ids)
+    for ids in _batches(touched.users):
+        fixed += counters.recount(users=ids)
+    log(f'Исправлено счетчиков: {fixed}')
+    readers = set(touched.readers)
+    for ids in _batches(touched.authors):
+        readers.update(Follow.objects.filter(
+            author_id__in=ids).values_list('user_id', flat=True))
+    for ids in _batches(readers):
+        timeline.rebuild_all(ids)
+    log(f'Лент пересобрано: {len(readers)}')
+    for ids in _batches(posts):
+        search.index_posts(ids)
+    log(f'Постов проиндексировано: {len(posts)}')
+    bump_generation()
+    page_cache.purge(*touched.tags)
+
+
+class Progress:
+    """Счетчик записей и скорость с момента запуска."""
+
+    def __init__(self, done=0):
+        self.started = time.monotonic()
+        self.initial = done
+        self.done = done
+
+    def add(self, count):
+        self.done += count
+
+    def __str__(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        rate = (self.done - self.initial) / elapsed
+        return f'{self.done} записей, {rate:.0f} в секунду'
+
+
+def load_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path) as checkpoint:
+        return json.load(checkpoint)
+
+
+def save_checkpoint(path, **state):
+    """Атомарно записывает смещение: файл не останется обрезанным."""
+    if not path:
+        return
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as checkpoint:
+        json.dump(state, checkpoint)
+    os.replace(temporary, path)
+
+
+def guess_format(path, fmt=None):
+    if fmt:
+        return fmt
+    return 'csv' if path and path.endswith('.csv') else 'jsonl'
@@ -1,26 +1,38 @@
-from django.urls import path
+from django.urls import path, register_converter
 from django.conf import settings
 from django.conf.urls.static import static
 
-from . import views
+from . import converters, views
+
+register_converter(converters.FeedFormatConverter, 'feed')
 
 app_name = 'posts'
 
 urlpatterns = [
     path('', views.index,
          name='index'),
+    path('feed/<feed:feed_format>/', views.index_feed,
+         name='index_feed'),
     path('group/<slug:slug_name>/', views.group_posts,
          name='group_list'),
+    path('group/<slug:slug_name>/feed/<feed:feed_format>/',
+         views.group_feed, name='group_feed'),
     path('profile/<str:username>/', views.profile,
          name='profile'),
+    path('profile/<str:username>/feed/<feed:feed_format>/',
+         views.profile_feed, name='profile_feed'),
     path('posts/<int:post_id>/', views.post_detail,
          name='post_detail'),
+    path('posts/<int:post_id>/comments/', views.post_comments,
+         name='post_comments'),
     path('create/', views.post_create,
          name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit,
          name='post_edit'),
     path('posts/<int:post_id>/comment/', views.add_comment,
          name='add_comment'),
+    path('search/', views.search,
+         name='search'),
     path('follow/', views.follow_index,
          name='follow_index'),
     path('profile/<str:username>/follow/', views.profile_follow,
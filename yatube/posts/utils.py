@@ -1,10 +1,120 @@
-from django.core.paginator import Paginator
+from django.core.paginator import Page, Paginator
 from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
 
+NEXT = 'n'
+PREVIOUS = 'p'
 
-def get_page(request, post_list,):
 
-    paginator = Paginator(post_list, settings.NUMBER_POSTS_ON_FIRST_PAGE)
+def encode_cursor(direction, obj, ordering):
+    """Упаковывает значения полей сортировки в непрозрачный токен."""
+    values = [getattr(obj, field) for field in ordering]
+    raw = '|'.join([direction, values[0].isoformat(), str(values[1])])
+    return urlsafe_base64_encode(raw.encode())
+
+
+def decode_cursor(cursor):
+    """Возвращает (направление, дата, id) или None для битого токена."""
+    try:
+        direction, moment, pk = (
+            urlsafe_base64_decode(cursor).decode().split('|')
+        )
+        moment = parse_datetime(moment)
+        pk = int(pk)
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return None
+    if direction not in (NEXT, PREVIOUS) or moment is None:
+        return None
+    return direction, moment, pk
+
+
+class CursorPage(Page):
+    """Страница keyset-пагинации: без номера и без общего количества."""
+
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, cursor=None,
+                 next_cursor=None, previous_cursor=None):
+        super().__init__(object_list, None, paginator)
+        self.cursor = cursor
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage {self.cursor or "first"}>'
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинация по паре полей (дата, id), по убыванию.
+
+    Страница выбирается условием WHERE по последней увиденной записи,
+    поэтому глубина страницы не влияет на стоимость запроса,
+    а COUNT(*) не выполняется вовсе.
+    """
+
+    def __init__(self, object_list, per_page, ordering=('pub_date', 'pk')):
+        super().__init__(object_list, per_page)
+        self.ordering = ordering
+
+    def _after(self, moment, pk, direction):
+        date_field, pk_field = self.ordering
+        lookup = 'lt' if direction == NEXT else 'gt'
+        return (Q(**{f'{date_field}__{lookup}': moment})
+                | Q(**{date_field: moment, f'{pk_field}__{lookup}': pk}))
+
+    def get_cursor_page(self, cursor):
+        date_field, pk_field = self.ordering
+        descending = (f'-{date_field}', f'-{pk_field}')
+        ascending = (date_field, pk_field)
+        decoded = decode_cursor(cursor) if cursor else None
+        queryset = self.object_list
+        if decoded is None:
+            cursor = None
+            direction = NEXT
+            queryset = queryset.order_by(*descending)
+        else:
+            direction, moment, pk = decoded
+            queryset = queryset.filter(self._after(moment, pk, direction))
+            queryset = queryset.order_by(
+                *(descending if direction == NEXT else ascending)
+            )
+        # Лишняя запись показывает, есть ли что-то дальше.
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == PREVIOUS:
+            rows.reverse()
+        has_next = has_more if direction == NEXT else True
+        has_previous = cursor is not None and (
+            direction == NEXT or has_more
+        )
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = encode_cursor(NEXT, rows[-1], self.ordering)
+        if rows and has_previous:
+            previous_cursor = encode_cursor(PREVIOUS, rows[0], self.ordering)
+        return CursorPage(rows, self, cursor, next_cursor, previous_cursor)
+
+
+def get_page(request, post_list, ordering=('pub_date', 'pk')):
+    """Страница списка постов.
+
+    С параметром ?page= работает классический Paginator с номерами
+    страниц, иначе курсорная пагинация по ?cursor=.
+    """
     page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return page_obj
+    if page_number is not None:
+        paginator = Paginator(post_list, settings.NUMBER_POSTS_ON_FIRST_PAGE)
+        return paginator.get_page(page_number)
+    paginator = CursorPaginator(
+        post_list, settings.NUMBER_POSTS_ON_FIRST_PAGE, ordering
+    )
+    return paginator.get_cursor_page(request.GET.get('cursor'))
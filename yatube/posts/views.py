@@ -1,13 +1,80 @@
+from urllib.parse import urlencode
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.db.models import Count, Max
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.utils.functional import SimpleLazyObject
+
+from core import page_cache, routers, thumbnails
+from core.cache import get_generation
+from core.db import retry_on_locked
 
+from . import feeds
+from .conditional import (last_removal, latest, latest_modified,
+                          metadata_condition, posts_condition,
+                          posts_metadata)
 from .models import Comment, Follow, Group, Post, User
+from .counters import get_counters
 from .forms import CommentForm, PostForm
-from .utils import get_page
+from .search import SearchResults
+from .timeline import FEED_ORDERING, feed_posts, posts_for
+from .utils import CursorPaginator, get_page
+
+
+def _all_posts(**kwargs):
+    return Post.objects.all()
+
+
+def _group_posts(slug_name, **kwargs):
+    return Post.objects.filter(group__slug=slug_name)
+
+
+def _author_posts(username, **kwargs):
+    return Post.objects.filter(author__username=username)
+
+
+def _profile_metadata(request, username):
+    # Подписки не меняют поколение данных, поэтому счетчики
+    # и кнопка подписки входят в метаданные явно.
+    meta = User.objects.filter(username=username).values(
+        'counters__posts', 'counters__followers', 'counters__following'
+    ).annotate(latest=Max('posts__updated')).first() or {}
+    meta['latest'] = latest(meta.get('latest'), last_removal('posts'))
+    if request.user.is_authenticated:
+        meta['following'] = Follow.objects.filter(
+            user=request.user, author__username=username
+        ).exists()
+    return meta
 
 
+def _follow_metadata(request):
+    meta = posts_metadata(feed_posts(request.user))
+    # Отписка убирает посты из ленты, не трогая ни поколение,
+    # ни обязательно дату самого нового поста.
+    meta.update(User.objects.filter(pk=request.user.pk).aggregate(
+        follows=Count('follower'), last_follow=Max('follower__pk')
+    ))
+    return meta
+
+
+def _post_metadata(request, post_id):
+    meta = Post.objects.filter(pk=post_id).aggregate(
+        comments=Max('comments_count'), latest=Max('Comments__created')
+    )
+    meta['latest'] = latest(meta['latest'],
+                            last_removal(f'comments:{post_id}'))
+    return meta
+
+
+@page_cache.cache_anonymous_page
+@posts_condition(_all_posts, 'index', per_viewer=True)
 def index(request):
-    post_list = Post.objects.all()
+    page_cache.tag(request, 'index')
+    post_list = Post.objects.for_listing()
 
     context = {
         'page_obj': get_page(request, post_list),
@@ -15,10 +82,13 @@ def index(request):
     return render(request, 'posts/index.html', context)
 
 
+@page_cache.cache_anonymous_page
+@posts_condition(_group_posts, 'group', per_viewer=True)
 def group_posts(request, slug_name):
+    page_cache.tag(request, f'group:{slug_name}')
     group = get_object_or_404(Group, slug=slug_name)
     template = 'posts/group_list.html'
-    post_list = group.posts.all()
+    post_list = group.posts.for_listing()
 
     context = {
         'page_obj': get_page(request, post_list),
@@ -27,10 +97,12 @@ def group_posts(request, slug_name):
     return render(request, template, context)
 
 
+@page_cache.cache_anonymous_page
+@metadata_condition(_profile_metadata, 'profile', per_viewer=True)
 def profile(request, username):
+    page_cache.tag(request, f'author:{username}')
     author = get_object_or_404(User, username=username)
-    posts = Post.objects.select_related('group',
-                                        ).filter(author__username=username)
+    posts = author.posts.for_listing()
     following = False
     if (request.user != author
             and request.user.is_authenticated
@@ -41,18 +113,91 @@ def profile(request, username):
     context = {
         'page_obj': get_page(request, posts),
         'author': author,
+        'counters': get_counters(author),
         'following': following
     }
     return render(request, 'posts/profile.html', context)
 
 
+def _feed(request, feed_format, title, link, posts):
+    generator = feeds.GENERATORS[feed_format]
+    return StreamingHttpResponse(
+        generator(request, title, request.build_absolute_uri(link),
+                  posts, latest_modified(request)),
+        content_type=feeds.CONTENT_TYPES[feed_format],
+    )
+
+
+@posts_condition(_all_posts, 'index')
+def index_feed(request, feed_format):
+    return _feed(request, feed_format, 'Yatube: последние посты',
+                 reverse('posts:index'), Post.objects.for_listing())
+
+
+@posts_condition(_group_posts, 'group')
+def group_feed(request, slug_name, feed_format):
+    group = get_object_or_404(Group, slug=slug_name)
+    return _feed(request, feed_format, f'Yatube: {group.title}',
+                 reverse('posts:group_list', args=[slug_name]),
+                 group.posts.for_listing())
+
+
+@posts_condition(_author_posts, 'profile')
+def profile_feed(request, username, feed_format):
+    author = get_object_or_404(User, username=username)
+    return _feed(request, feed_format,
+                 f'Yatube: {author.get_full_name() or author.username}',
+                 reverse('posts:profile', args=[username]),
+                 author.posts.for_listing())
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    paginator = Paginator(
+        SearchResults(query), settings.NUMBER_POSTS_ON_FIRST_PAGE
+    )
+    context = {
+        'page_obj': paginator.get_page(request.GET.get('page')),
+        'query': query,
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
+def comment_page(post_id, cursor=None):
+    """Страница комментариев поста, от новых к старым."""
+    comments = Comment.objects.select_related('author').filter(
+        post_id=post_id
+    ).only('text', 'created', 'post', 'author', 'author__username')
+    paginator = CursorPaginator(
+        comments, settings.COMMENTS_PER_PAGE, ordering=('created', 'pk')
+    )
+    return paginator.get_cursor_page(cursor)
+
+
+def comments_version(post_id):
+    """Версия первой страницы комментариев в кэше фрагментов: меняется
+    с комментариями этого поста и с правками пользователей.
+    """
+    return (f'{get_generation(f"comments:{post_id}")}.'
+            f'{get_generation("users")}')
+
+
+@page_cache.cache_anonymous_page
+@metadata_condition(_post_metadata, 'post', per_viewer=True)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    post_count = Post.objects.select_related('author').filter(
-        author=post.author
-    ).count()
+    post = get_object_or_404(Post.objects.for_listing(), pk=post_id)
+    # Страница выводит и число постов автора.
+    page_cache.tag(request, f'post:{post.pk}',
+                   f'author:{post.author.username}')
+    post_count = get_counters(post.author).posts
     title = 'Пост'
-    comments = Comment.objects.select_related('author').filter(post=post)
+    cursor = request.GET.get('cursor')
+    if cursor:
+        comments = comment_page(post.pk, cursor)
+    else:
+        # Первая страница выбирается, только если ее нет в кэше.
+        comments = SimpleLazyObject(lambda: comment_page(post.pk))
     form = CommentForm()
     context = {
         'post_count': post_count,
@@ -60,10 +205,39 @@ def post_detail(request, post_id):
         'title': title,
         'form': form,
         'comments': comments,
+        'comments_cursor': cursor,
+        'comments_version': comments_version(post.pk),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@metadata_condition(_post_metadata, 'comments')
+def post_comments(request, post_id):
+    """Следующие страницы комментариев: HTML-фрагмент или JSON."""
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    comments = comment_page(post_id, request.GET.get('cursor'))
+    if request.GET.get('format') != 'json':
+        return render(request, 'posts/includes/comments.html',
+                      {'comments': comments, 'post_id': post_id})
+    next_url = None
+    if comments.has_next():
+        next_url = (f'{reverse("posts:post_comments", args=[post_id])}'
+                    f'?format=json&cursor={comments.next_cursor}')
+    return JsonResponse({
+        'comments': [
+            {
+                'id': comment.pk,
+                'author': comment.author.username,
+                'text': comment.text,
+                'created': comment.created.isoformat(),
+            }
+            for comment in comments
+        ],
+        'next': next_url,
+    })
+
+
 @login_required
 def post_create(request):
     is_edit = False
@@ -79,7 +253,8 @@ def post_create(request):
         return render(request, 'posts/create_post.html', context)
     post = form.save(commit=False)
     post.author = request.user
-    post.save()
+    retry_on_locked(post.save)()
+    thumbnails.schedule(post.image)
     return redirect('posts:profile', post.author.username)
 
 
@@ -87,14 +262,16 @@ def post_create(request):
 def post_edit(request, post_id):
     is_edit = True
     post = get_object_or_404(Post, pk=post_id)
-    if post.author == request.user:
+    if post.author_id == request.user.pk:
         form = PostForm(
             request.POST or None,
             files=request.FILES or None,
             instance=post
         )
         if form.is_valid():
-            form.save()
+            retry_on_locked(form.save)()
+            if 'image' in form.changed_data:
+                thumbnails.schedule(post.image)
             return redirect('posts:post_detail', post_id=post_id)
         context = {'form': form, 'is_edit': is_edit, 'post_id': post_id}
         return render(request, 'posts/create_post.html', context)
@@ -109,15 +286,15 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        retry_on_locked(comment.save)()
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
+@metadata_condition(_follow_metadata, 'follow', per_viewer=True)
 def follow_index(request):
-    posts = Post.objects.select_related(
-        'author').filter(author__following__user=request.user)
-    context = {'page_obj': get_page(request, posts)}
+    posts = posts_for(request.user).for_listing()
+    context = {'page_obj': get_page(request, posts, FEED_ORDERING)}
     return render(request, 'posts/follow.html', context)
 
 
@@ -125,12 +302,16 @@ def follow_index(request):
 def profile_follow(request, username):
     if username != request.user.username:
         author = get_object_or_404(User, username=username)
-        Follow.objects.get_or_create(user=request.user, author=author)
+        retry_on_locked(Follow.objects.get_or_create)(
+            user=request.user, author=author)
+        routers.pin(request)
     return redirect('posts:profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
-    get_object_or_404(
-        Follow, author__username=username, user=request.user).delete()
+    follow = get_object_or_404(
+        Follow, author__username=username, user=request.user)
+    retry_on_locked(follow.delete)()
+    routers.pin(request)
     return redirect('posts:profile', username=username)
@@ -0,0 +1,19 @@
+"""
+ASGI config for yatube project.
+
+В Django 2.2 нет get_asgi_application: обычный WSGI-обработчик
+оборачивается core.asgi.PooledWsgiToAsgi, запросы выполняются в пуле
+из ASGI_THREADS потоков. Запуск: uvicorn yatube.asgi:application.
+"""
+
+import os
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+from core.asgi import PooledWsgiToAsgi
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+application = PooledWsgiToAsgi(get_wsgi_application(),
+                               settings.ASGI_THREADS)
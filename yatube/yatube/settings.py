@@ -45,8 +45,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
+    'core.middleware.QueryDetectorMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'core.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -55,6 +58,9 @@ MIDDLEWARE = [
 ]
 
 ROOT_URLCONF = 'yatube.urls'
+# Под ASGI (yatube.asgi) запросы выполняются в пуле из стольких
+# потоков; столько же самое большее и соединений с базой.
+ASGI_THREADS = int(os.environ.get('YATUBE_ASGI_THREADS', 8))
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
@@ -68,11 +74,16 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.cache_generation.cache_generation',
             ],
         },
     },
 ]
 
+# Компиляция всех шаблонов при запуске (core.template_profile.warm_up);
+# имеет смысл с кэширующим загрузчиком из yatube.settings_production.
+TEMPLATE_WARMUP = False
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
@@ -85,6 +96,30 @@ DATABASES = {
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
     }
 }
+# Реплики только для чтения: файлы через запятую в YATUBE_DB_REPLICAS.
+# Копирование данных с основной базы - забота окружения, в тестах
+# реплики смотрят в тестовую основную базу.
+for number, name in enumerate(
+        filter(None, os.environ.get('YATUBE_DB_REPLICAS', '').split(',')),
+        start=1):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# Чтения идут на одну из реплик, пока пользователь не записал что-то
+# сам: после записи его запросы REPLICA_PIN_SECONDS секунд (запас
+# на отставание репликации) читают основную базу.
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+REPLICA_PIN_COOKIE = 'primary_until'
+REPLICA_PIN_SECONDS = 10
+# PRAGMA для каждого нового соединения с SQLite (core.db), включаются
+# в yatube.settings_production. Запись в представлениях повторяется
+# до DB_WRITE_RETRIES раз, если база заблокирована другим писателем.
+SQLITE_PRAGMAS = {}
+DB_WRITE_RETRIES = 3
+DB_WRITE_RETRY_DELAY = 0.05
 
 
 # Password validation
@@ -134,11 +169,51 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
-CACHES = {
-    'default': {
+# Кэш выбирается переменной окружения YATUBE_CACHE. locmem у каждого
+# воркера свой и годится только для разработки и тестов; file
+# и memcached общие для всех воркеров сервера (yatube.settings_production
+# по умолчанию берет memcached и не запускается с locmem).
+# Поддерживаются только эти три бэкенда. Поколения данных (core.cache)
+# не опираются на атомарность incr; add у file не атомарен, поэтому
+# блокировка пересчета в get_or_compute на нем лишь сокращает, но не
+# исключает повторный пересчет. memcached требует python-memcached.
+CACHE_BACKENDS = {
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')),
+    },
+    'memcached': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_CACHE_LOCATION', '127.0.0.1:11211'),
+    },
+}
+CACHES = {
+    'default': CACHE_BACKENDS[os.environ.get('YATUBE_CACHE', 'locmem')],
+}
+# Хранилище сессий выбирается переменной окружения YATUBE_SESSIONS.
+# cached_db читает сессию из кэша и пишет в кэш и базу; signed_cookies
+# хранит ее в подписанной cookie без базы, но сессию нельзя отозвать
+# до истечения срока.
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
 }
+SESSION_ENGINE = SESSION_ENGINES[
+    os.environ.get('YATUBE_SESSIONS', 'cached_db')
+]
+# Сообщения в cookie: не пишут в сессию
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+# Защита от stampede в core.cache.get_or_compute
+CACHE_LOCK_TIMEOUT = 5
+CACHE_EARLY_EXPIRY_BETA = 1.0
 
 WORDS_OUTPUT_LIMIT = 15
 TEST_NUM = 1
@@ -146,10 +221,58 @@ FIRST_OBJECT = 0
 NUMBER_OF_POSTS = 15
 NUMBER_POSTS_ON_FIRST_PAGE = 10
 NUMBER_POSTS_ON_SECOND_PAGE = 5
+# Комментарии под постом показываются страницами по курсору
+COMMENTS_PER_PAGE = 20
 ONE_POST = 1
-CACHE_SAVE_TIME = 4.1
 NOTING_IN_FOLLOW_INDEX = 0
+# Фрагменты живут долго: их ключи меняются вместе с поколением данных
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+# Выключает {% fragment_cache %}: фрагменты рендерятся на каждый запрос
+FRAGMENT_CACHE_ENABLED = True
+# Страницы для гостей целиком (core.page_cache); устаревают раньше
+# срока по суррогатным ключам, срок только ограничивает размер кэша.
+PAGE_CACHE_ENABLED = True
+PAGE_CACHE_TIMEOUT = 60 * 10
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Миниатюры картинок постов создаются фоновым пулом при загрузке,
+# шаблоны до этого показывают заглушку.
+POST_THUMBNAIL = {
+    'geometry': '960x339',
+    'crop': 'center',
+    'upscale': True,
+}
+THUMBNAIL_WORKERS = 2
+# Варианты картинок для srcset: ширины, пропорция кадра 960x339,
+# качество сжатия и атрибут sizes тега <img>.
+IMAGE_RENDITION_WIDTHS = (480, 960)
+IMAGE_RENDITION_RATIO = 960 / 339
+IMAGE_RENDITION_QUALITY = 80
+IMAGE_RENDITION_SIZES = '(max-width: 960px) 100vw, 960px'
+
+# Лента подписок: авторам с большим числом подписчиков посты не
+# раскладываются по лентам при публикации, а дочитываются при показе.
+TIMELINE_FANOUT_LIMIT = 1000
+# Вся история автора копируется в ленты пачками такого размера.
+TIMELINE_BATCH_SIZE = 1000
+
+# Ленты RSS/Atom/JSON: сколько последних постов отдавать и по сколько
+# читать из базы за раз при потоковой отдаче.
+FEED_MAX_ITEMS = 1000
+FEED_CHUNK_SIZE = 200
+
+# Метрики запросов (core.middleware.PerformanceMiddleware): заголовок
+# Server-Timing для всех, а не только для staff, и границы корзин
+# гистограммы времени ответа в миллисекундах.
+PERFORMANCE_SERVER_TIMING = DEBUG
+PERFORMANCE_HISTOGRAM_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+# Поиск N+1 (core.middleware.QueryDetectorMiddleware): один и тот же
+# запрос больше QUERY_N_PLUS_ONE_THRESHOLD раз за страницу или запрос
+# дольше QUERY_SLOW_MS миллисекунд пишутся в лог core.queries.
+QUERY_DETECTOR_ENABLED = DEBUG
+QUERY_N_PLUS_ONE_THRESHOLD = 3
+QUERY_SLOW_MS = 100
@@ -0,0 +1,73 @@
+"""
+Настройки для небольшого продакшена на SQLite.
+
+DJANGO_SETTINGS_MODULE=yatube.settings_production: WAL вместо журнала
+отката (читатели не мешают писателю), транзакции, сразу берущие
+блокировку записи (core.sqlite), ожидание блокировки вместо мгновенной
+ошибки и постоянные соединения, чтобы PRAGMA и открытие
+файла не повторялись на каждый запрос. Шаблоны кэшируются
+и компилируются при запуске. Кэш общий для всех воркеров.
+"""
+
+import copy
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .settings import *  # noqa: F401,F403
+from .settings import (ALLOWED_HOSTS, CACHE_BACKENDS, DATABASES, SECRET_KEY,
+                       TEMPLATES)
+
+SECRET_KEY = os.environ.get('YATUBE_SECRET_KEY', SECRET_KEY)
+
+DEBUG = False
+
+ALLOWED_HOSTS = os.environ.get(
+    'YATUBE_ALLOWED_HOSTS', ','.join(ALLOWED_HOSTS)).split(',')
+
+# Копия: словарь общий с yatube.settings, если импортированы оба модуля.
+DATABASES = copy.deepcopy(DATABASES)
+for database in DATABASES.values():
+    database['CONN_MAX_AGE'] = 600
+    if database['ENGINE'] == 'django.db.backends.sqlite3':
+        database['ENGINE'] = 'core.sqlite'
+        database.setdefault('OPTIONS', {})['transaction_mode'] = 'IMMEDIATE'
+
+# На кэше держатся поколения данных, суррогатные ключи страниц и
+# блокировки пересчета: сброс в locmem дошел бы только до воркера,
+# обработавшего запись, а остальные отдавали бы старые страницы
+# до истечения срока (фрагменты - сутки).
+CACHES = {
+    'default': CACHE_BACKENDS[os.environ.get('YATUBE_CACHE', 'memcached')],
+}
+if CACHES['default'] == CACHE_BACKENDS['locmem']:
+    raise ImproperlyConfigured(
+        'YATUBE_CACHE=locmem не годится для продакшена: кэш должен быть '
+        'общим для всех воркеров (memcached или file)'
+    )
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    # В режиме WAL NORMAL не теряет целостность, только последние
+    # транзакции при отключении питания.
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение - размер в КиБ, а не в страницах.
+    'cache_size': -64 * 1024,
+}
+
+# Шаблоны читаются и компилируются один раз на процесс, сразу
+# при запуске, а не на первом запросе к каждой странице.
+TEMPLATES = copy.deepcopy(TEMPLATES)
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+TEMPLATE_WARMUP = True
+
+PERFORMANCE_SERVER_TIMING = False
+QUERY_DETECTOR_ENABLED = False
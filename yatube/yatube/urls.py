@@ -23,6 +23,7 @@ urlpatterns = [
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('perf/', include('core.urls', namespace='core')),
 ]
 
 handler404 = 'core.views.page_not_found'
\ No newline at end of file